@@ -0,0 +1,127 @@
+# ********************************* Imports ************************************
+from __future__ import annotations
+
+"Standard Library :"
+import importlib.util
+import os
+
+from itertools import islice
+from threading import Lock
+#To annotate :
+from types import CodeType, FrameType
+
+"Local Library :"
+from callable_template import GeneratedDeclaration, _stripFactoryQualname
+
+
+# ******************************** Constants ***********************************
+
+__all__ = ("generatedDeclaration", "generatedFormat", "generatedPath")
+
+# 'mod.py' -> 'mod_templates.py'
+GENERATED_SUFFIX = "_templates"
+
+# First line of the generated modules : a module merely named like one isn't
+# run. The format changes with the factories compiled by 'CallableTemplate',
+# the modules generated in an older format are ignored.
+GENERATED_MARKER = "# Generated by 'python -m aot', do not edit. Format : "
+GENERATED_FORMAT = 2
+
+# 'module file -> (source stamp, {(start_line, end_line): declaration})'
+_GENERATED: dict[str, tuple[tuple[int, int] | None, dict]] = {}
+_LOCK = Lock()
+
+
+# ******************************** Functions ***********************************
+
+def sourceStamp(module_file: str) -> tuple[int, int] | None :
+    # As the default invalidation of '.pyc' files.
+    try :
+        stat = os.stat(module_file)
+    except (OSError, ValueError) :
+        return None
+    return int(stat.st_mtime), stat.st_size
+
+def generatedPath(module_file: str | os.PathLike) -> str :
+    """Path of the module generated for 'module_file' ('mod.py' -> 'mod_templates.py')."""
+    stem, _ = os.path.splitext(os.fspath(module_file))
+    return f"{stem}{GENERATED_SUFFIX}.py"
+
+def generatedFormat(path: str | os.PathLike) -> int | None :
+    """
+    Format of the module generated at 'path' (see 'GENERATED_MARKER'), or
+    'None' if it wasn't generated by 'python -m aot'.
+    """
+    try :
+        with open(path, encoding="utf-8") as file :
+            first_line = file.readline().rstrip("\n")
+    except (OSError, UnicodeDecodeError) :
+        return None
+    if not first_line.startswith(GENERATED_MARKER) :
+        return None
+    try :
+        return int(first_line.removeprefix(GENERATED_MARKER))
+    except ValueError :
+        return None
+
+def _load(module_file: str) -> dict[tuple[int, int], GeneratedDeclaration] :
+    path = generatedPath(module_file)
+    if generatedFormat(path) != GENERATED_FORMAT :
+        # Missing, written by hand, or generated by an older version.
+        return {}
+
+    module_name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    source_stamp = getattr(module, "SOURCE_STAMP", None)
+    declarations = getattr(module, "DECLARATIONS", None)
+    if not isinstance(declarations, dict) :
+        return {}
+    stamp = sourceStamp(module_file)
+    if stamp is not None and (source_stamp is None or tuple(source_stamp) != stamp) :
+        # Generated from another version of the source.
+        return {}
+
+    def code(factory) -> CodeType :
+        return _stripFactoryQualname(factory.__code__)
+
+    return {
+        lines : GeneratedDeclaration(
+            name,
+            declaration,
+            code(factory),
+            {
+                arg_reprs : code(instantiation_factory)
+                for arg_reprs, instantiation_factory in instantiations.items()
+            },
+        )
+        for lines, (name, declaration, factory, instantiations)
+        in declarations.items()
+    }
+
+def generatedDeclaration(frame: FrameType) -> GeneratedDeclaration | None :
+    """
+    Declaration generated ahead of time for the with block that 'frame' is
+    entering, if any. Only the positions of the code of 'frame' are used : the
+    source isn't read.
+    """
+
+    module_file = frame.f_globals.get("__file__")
+    if not module_file or frame.f_code.co_filename != module_file :
+        # Not declared in the source of a module (but by 'exec', ...).
+        return None
+
+    stamp = sourceStamp(module_file)
+    with _LOCK :
+        entry = _GENERATED.get(module_file)
+    if entry is None or entry[0] != stamp :
+        entry = (stamp, _load(module_file))
+        with _LOCK :
+            _GENERATED[module_file] = entry
+
+    start_line, end_line, *_ = next(islice(
+        frame.f_code.co_positions(), frame.f_lasti // 2, None
+    ))
+    return entry[1].get((start_line, end_line))
@@ -0,0 +1,78 @@
+"""
+Ahead-of-time instantiation of the templates declared with the 'with' form.
+
+>>> python -m aot generate <package or module> [--instantiations manifest.json]
+Writes, next to each module declaring templates ('mod.py'), a plain module
+('mod_templates.py') holding the factories of its declarations, and of the
+specialized instantiations listed by the manifest. While it is up to date,
+declaring those templates neither reads the source of 'mod.py' nor compiles
+anything : it's compiled (and cached in '__pycache__') as any other module.
+Its first line marks it as generated : a module of that name written by hand
+is neither run nor overwritten.
+
+>>> python -m aot record [-o manifest.json] <script> [args ...]
+Runs 'script' and adds the instantiations it built to the manifest.
+
+The manifest maps each template ('<module>:<qualname>') to instantiations,
+given either as the key of 'tmpl[...]' (evaluated in the declaring module)
+or as the stable representations of the template arguments (as recorded) :
+{"pkg.mod:Scope.convert": ["5, int", "'T': str, 'N': 3", ["7", "<builtins.float>"]]}
+
+Run from the 'template' directory.
+"""
+
+
+# ********************************* Imports ************************************
+from __future__ import annotations
+
+"Standard Library :"
+import argparse
+import json
+
+from pathlib import Path
+
+"Local Library :"
+from aot.generation import generate, record
+
+
+# ********************************** Main **************************************
+
+def main(argv: list[str] | None = None) -> None :
+    parser = argparse.ArgumentParser(
+        prog="python -m aot",
+        description="Instantiates templates ahead of time.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser(
+        "generate", help="generates the modules of the declared templates",
+    )
+    generate_parser.add_argument("paths", nargs="+")
+    generate_parser.add_argument("-i", "--instantiations", metavar="MANIFEST")
+
+    record_parser = commands.add_parser(
+        "record", help="records the instantiations built by a script",
+    )
+    record_parser.add_argument("script")
+    record_parser.add_argument("args", nargs=argparse.REMAINDER)
+    record_parser.add_argument(
+        "-o", "--output", metavar="MANIFEST", default="instantiations.json",
+    )
+
+    options = parser.parse_args(argv)
+    if options.command == "generate" :
+        manifest = None
+        if options.instantiations :
+            manifest = json.loads(Path(options.instantiations).read_text())
+        for path in generate(options.paths, manifest) :
+            print(f"Generated '{path}'")
+    else :
+        output = Path(options.output)
+        manifest = json.loads(output.read_text()) if output.is_file() else {}
+        record(options.script, options.args, manifest)
+        output.write_text(json.dumps(manifest, indent=4) + "\n")
+        print(f"Recorded {sum(map(len, manifest.values()))} instantiations in '{output}'")
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,290 @@
+# ********************************* Imports ************************************
+from __future__ import annotations
+
+"Standard Library :"
+import ast
+import importlib
+import os
+import runpy
+import sys
+import tokenize
+
+from pathlib import Path
+from textwrap import dedent
+#To annotate :
+from typing import Any, Iterator
+
+"Local Library :"
+from aot import (
+    GENERATED_FORMAT, GENERATED_MARKER, GENERATED_SUFFIX,
+    generatedFormat, generatedPath, sourceStamp,
+)
+from callable_template import CallableTemplate, _BY_IDENTITY, _FACTORY_NAME, _UNBOUND
+from code_cache import stableRepr
+from specialization import specialize as specialize_tree
+
+
+# ******************************** Constants ***********************************
+
+__all__ = ("generate", "record")
+
+_HEADER = '''{marker}
+"""
+Templates declared in '{source}', instantiated ahead of time.
+"""
+
+
+# '(mtime, size)' of the source when generated, the module is ignored once the
+# source changed.
+SOURCE_STAMP = {stamp!r}
+'''
+
+
+# ********************************** Utils *************************************
+
+class _Key :
+    """'_Key[5, 'T': int]' is the key given to 'tmpl[...]'."""
+
+    def __class_getitem__(cls, key) :
+        return key
+
+
+def _isTemplateWith(node: ast.AST) -> bool :
+    if not isinstance(node, ast.With) or len(node.items) != 1 :
+        return False
+    expr = node.items[0].context_expr
+    if isinstance(expr, ast.Call) :
+        expr = expr.func
+    return (
+        isinstance(expr, ast.Subscript)
+        and isinstance(expr.value, ast.Name)
+        and expr.value.id == "template"
+    )
+
+def _fromStableRepr(arg_repr: str) -> Any :
+    if not (arg_repr.startswith("<") and arg_repr.endswith(">")) :
+        return ast.literal_eval(arg_repr)
+
+    # '<module.qualname>' : the longest importable prefix is the module.
+    parts = arg_repr[1:-1].split(".")
+    for i in range(len(parts) - 1, 0, -1) :
+        try :
+            value = importlib.import_module(".".join(parts[:i]))
+        except ImportError :
+            continue
+        for attr in parts[i:] :
+            value = getattr(value, attr)
+        return value
+    raise ValueError(f"Can't import '{arg_repr}'.")
+
+
+# ******************************** Functions ***********************************
+
+def _declarations(
+    body: list[ast.stmt],
+    qualname: str = "",
+) -> Iterator[tuple[str, ast.With]] :
+    # Templates declared in the module or in its classes.
+    for stmt in body :
+        if _isTemplateWith(stmt) :
+            yield qualname, stmt
+        elif isinstance(stmt, ast.ClassDef) :
+            yield from _declarations(stmt.body, f"{qualname}{stmt.name}.")
+
+def _moduleName(module_file: Path) -> tuple[str, Path] :
+    # Name of the module, and the directory it's imported from.
+    parts = [module_file.stem]
+    directory = module_file.parent
+    while (directory / "__init__.py").is_file() :
+        parts.insert(0, directory.name)
+        directory = directory.parent
+    return ".".join(parts), directory
+
+def _manifestKeys(
+    cb_template: CallableTemplate,
+    entries: list[str | list[str]],
+) -> Iterator[tuple] :
+    for entry in entries :
+        if isinstance(entry, str) :
+            key = eval(f"_Key[{entry}]", cb_template._globals, {"_Key": _Key})
+        else :
+            key = tuple(map(_fromStableRepr, entry))
+        build_args = cb_template._computeBuildArgs(key)
+        if any(arg is _UNBOUND for arg in build_args) :
+            raise ValueError(f"'{entry}' doesn't bind every template parameter.")
+        yield build_args
+
+def _generateModule(
+    module_file: Path,
+    manifest: dict[str, list[str | list[str]]],
+) -> str | None :
+    with tokenize.open(module_file) as file :
+        lines = file.readlines()
+    declarations = list(_declarations(ast.parse("".join(lines)).body))
+    if not declarations :
+        return None
+
+    module_name, import_dir = _moduleName(module_file)
+    if str(import_dir) not in sys.path :
+        sys.path.insert(0, str(import_dir))
+    module_globals = vars(importlib.import_module(module_name))
+
+    factory_defs = []
+    entries = []
+    for i, (qualname, with_stmt) in enumerate(declarations) :
+        with_block = dedent("".join(lines[with_stmt.lineno : with_stmt.end_lineno]))
+        cb_template = module_globals
+        try :
+            for attr in f"{qualname}{with_stmt.body[0].name}".split(".") :
+                cb_template = (
+                    cb_template[attr] if isinstance(cb_template, dict)
+                    else getattr(cb_template, attr)
+                )
+        except (AttributeError, KeyError) :
+            cb_template = None
+        if isinstance(cb_template, CallableTemplate) :
+            # Declared lazily.
+            cb_template._ensureDeclared()
+        if (
+            not isinstance(cb_template, CallableTemplate)
+            or cb_template._declaration != with_block
+        ) :
+            # Not bound to its name once the module is imported (declared in
+            # a branch not taken, ...).
+            continue
+
+        factory_name = f"{_FACTORY_NAME}{i}"
+        factory_defs.append(cb_template._factoryDef(cb_template._getTree(), factory_name))
+
+        instantiations = {}
+        template_name = f"{module_name}:{qualname}{cb_template._name}"
+        if cb_template._specialize :
+            for j, build_args in enumerate(
+                _manifestKeys(cb_template, manifest.get(template_name, []))
+            ) :
+                arg_reprs = tuple(map(stableRepr, build_args))
+                if None in arg_reprs :
+                    raise ValueError(
+                        f"{template_name}{list(build_args)} : a template argument "
+                        f"has no stable representation."
+                    )
+                template_scope = dict(zip(cb_template._param_names, build_args))
+                instantiation_name = f"{factory_name}_{j}"
+                factory_defs.append(cb_template._factoryDef(
+                    specialize_tree(cb_template._getTree(), template_scope, module_globals),
+                    instantiation_name,
+                ))
+                instantiations[arg_reprs] = instantiation_name
+
+        entries.append(
+            f"    {(with_stmt.lineno, with_stmt.end_lineno)!r}: (\n"
+            f"        {cb_template._name!r},\n"
+            f"        {with_block!r},\n"
+            f"        {factory_name},\n"
+            "        {"
+            + "".join(
+                f"\n            {arg_reprs!r}: {instantiation_name},"
+                for arg_reprs, instantiation_name in instantiations.items()
+            )
+            + ("\n        },\n" if instantiations else "},\n")
+            + "    ),\n"
+        )
+
+    source = _HEADER.format(
+        marker=f"{GENERATED_MARKER}{GENERATED_FORMAT}",
+        source=module_file.name,
+        stamp=sourceStamp(module_file),
+    )
+    source += "".join(
+        f"\n\n{ast.unparse(ast.fix_missing_locations(factory_def))}\n"
+        for factory_def in factory_defs
+    )
+    source += "\n\nDECLARATIONS = {\n" + "".join(entries) + "}\n"
+    return source
+
+
+def generate(
+    paths: list[str | os.PathLike],
+    manifest: dict[str, list[str | list[str]]] | None = None,
+) -> list[Path] :
+    """
+    Generates the module of the templates declared by each module of 'paths'
+    (packages are walked), with the specialized instantiations listed by
+    'manifest'. Returns the paths of the generated modules.
+    """
+
+    manifest = manifest or {}
+    module_files = []
+    for path in map(Path, paths) :
+        module_files += sorted(path.rglob("*.py")) if path.is_dir() else [path]
+
+    generated = []
+    for module_file in module_files :
+        module_file = module_file.resolve()
+        if (
+            module_file.stem.endswith(GENERATED_SUFFIX)
+            and generatedFormat(module_file) is not None
+        ) or "template[" not in module_file.read_text(errors="replace") :
+            continue
+        source = _generateModule(module_file, manifest)
+        if source is None :
+            continue
+        path = Path(generatedPath(module_file))
+        if path.exists() and generatedFormat(path) is None :
+            raise FileExistsError(
+                f"'{path}' wasn't generated by 'python -m aot', thus isn't "
+                "overwritten."
+            )
+        # Checked before being written.
+        compile(source, str(path), "exec")
+        path.write_text(source)
+        generated.append(path)
+    return generated
+
+def _templates(namespace: Any, prefix: str = "") -> Iterator[tuple[str, CallableTemplate]] :
+    for name, value in list(vars(namespace).items()) :
+        if isinstance(value, CallableTemplate) and value._root is value :
+            yield f"{prefix}{name}", value
+        elif (
+            isinstance(value, type)
+            and value.__qualname__ == f"{prefix}{name}"
+            and value.__module__ == getattr(namespace, "__module__", namespace.__name__)
+        ) :
+            yield from _templates(value, f"{prefix}{name}.")
+
+def record(
+    script: str | os.PathLike,
+    args: list[str] = (),
+    manifest: dict[str, list[str | list[str]]] | None = None,
+) -> dict[str, list[str | list[str]]] :
+    """
+    Runs 'script' (as '__main__') and adds the instantiations memoized by the
+    templates of the imported modules to 'manifest'.
+    """
+
+    manifest = manifest if manifest is not None else {}
+    argv = sys.argv
+    sys.argv = [str(script), *args]
+    try :
+        runpy.run_path(str(script), run_name="__main__")
+    finally :
+        sys.argv = argv
+
+    for module_name, module in list(sys.modules.items()) :
+        if module_name == "__main__" or not getattr(module, "__file__", None) :
+            continue
+        for qualname, cb_template in _templates(module) :
+            entries = manifest.setdefault(f"{module_name}:{qualname}", [])
+            for key in list(cb_template._cache) :
+                if any(
+                    isinstance(arg, tuple) and arg[:1] == (_BY_IDENTITY,)
+                    for arg in key
+                ) :
+                    # Memoized by the identity of an argument.
+                    continue
+                arg_reprs = list(map(stableRepr, key))
+                if None not in arg_reprs and arg_reprs not in entries :
+                    entries.append(arg_reprs)
+            if not entries :
+                del manifest[f"{module_name}:{qualname}"]
+    return manifest
@@ -0,0 +1,181 @@
+"""
+Runs the benchmarks ('bench_*.py'), saves their results as JSON, and flags
+the results that regressed against a baseline (results saved by an earlier
+run, on the same machine).
+
+Run from the 'template' directory :
+>>> python -m benchmarks                                   # Every benchmark
+>>> python -m benchmarks cold_build warm_lookup            # Some of them
+>>> python -m benchmarks --save-baseline                   # Stores the baseline
+>>> python -m benchmarks -o results.json --tolerance 0.3
+
+Exits with status 1 when a result regressed (or a benchmark failed).
+
+The results ('results.json') and the baseline ('baseline.json') are written
+next to the benchmarks, and ignored by git : timings only compare on the
+machine they were measured on, thus the baseline isn't committed.
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+import argparse
+import importlib
+import json
+import platform
+import sys
+import traceback
+
+from datetime import datetime, timezone
+from pathlib import Path
+#To annotate :
+from typing import Any
+
+
+# ******************************** Constants ***********************************
+
+BENCHMARKS_DIR = Path(__file__).parent
+DEFAULT_BASELINE = BENCHMARKS_DIR / "baseline.json"
+DEFAULT_OUTPUT = BENCHMARKS_DIR / "results.json"
+
+# Relative slowdown tolerated before a result is flagged, as the timings of
+# two runs vary (more for the ones spawning processes or importing modules).
+DEFAULT_TOLERANCE = 0.2
+
+
+# ********************************* Utils **************************************
+
+def benchmarkNames() -> list[str] :
+    return sorted(
+        path.stem.removeprefix("bench_")
+        for path in BENCHMARKS_DIR.glob("bench_*.py")
+    )
+
+def _numbers(value: Any) -> list[float] :
+    # Some results are tuples of measures (see 'bench_declaration').
+    if isinstance(value, (list, tuple)) :
+        return [number for item in value for number in _numbers(item)]
+    if isinstance(value, (int, float)) :
+        return [float(value)]
+    return []
+
+
+# ******************************** Functions ***********************************
+
+def run(names: list[str]) -> dict[str, dict] :
+    """
+    Results of the benchmarks 'names', with the names of the results for
+    which higher is better (the others are times or sizes).
+    """
+
+    results = {}
+    for name in names :
+        print(f"---- {name}", flush=True)
+        module = importlib.import_module(f"benchmarks.bench_{name}")
+        entry = {"higher_is_better": list(getattr(module, "HIGHER_IS_BETTER", ()))}
+        try :
+            entry["results"] = module.main()
+        except Exception :
+            # A benchmark asserting a bound on its results failed.
+            entry["error"] = traceback.format_exc(limit=1)
+            print(entry["error"], file=sys.stderr)
+        results[name] = entry
+    return results
+
+def regressions(
+    results: dict[str, dict],
+    baseline: dict[str, dict],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> list[str] :
+    """Descriptions of the results worse than the baseline beyond 'tolerance'."""
+
+    found = []
+    for name, entry in results.items() :
+        if "error" in entry :
+            found.append(f"{name} : failed")
+            continue
+        baseline_results = baseline.get(name, {}).get("results", {})
+        for result_name, value in entry["results"].items() :
+            if result_name not in baseline_results :
+                continue
+            higher_is_better = result_name in entry["higher_is_better"]
+            for new, old in zip(
+                _numbers(value), _numbers(baseline_results[result_name])
+            ) :
+                if old <= 0 :
+                    continue
+                change = (old / new if higher_is_better else new / old) - 1
+                if change > tolerance :
+                    found.append(
+                        f"{name} / {result_name} : {old:.4g} -> {new:.4g} "
+                        f"({change:+.0%})"
+                    )
+    return found
+
+def _save(path: Path, results: dict[str, dict]) -> None :
+    path.write_text(json.dumps(
+        {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "benchmarks": results,
+        },
+        indent=2,
+    ))
+
+
+def main(argv: list[str] | None = None) -> int :
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "names", nargs="*", metavar="NAME",
+        help=f"benchmarks to run (default : all of {', '.join(benchmarkNames())})",
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, default=DEFAULT_OUTPUT,
+        help=f"JSON file the results are saved to (default : {DEFAULT_OUTPUT.name})",
+    )
+    parser.add_argument(
+        "-b", "--baseline", type=Path, default=DEFAULT_BASELINE,
+        help=f"JSON file of the baseline results (default : {DEFAULT_BASELINE.name})",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true",
+        help="saves the results as the baseline as well",
+    )
+    parser.add_argument(
+        "-t", "--tolerance", type=float, default=DEFAULT_TOLERANCE,
+        help=f"relative slowdown tolerated (default : {DEFAULT_TOLERANCE})",
+    )
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(benchmarkNames())
+    if unknown :
+        parser.error(f"unknown benchmark(s) : {', '.join(sorted(unknown))}")
+
+    results = run(args.names or benchmarkNames())
+    _save(args.output, results)
+    print(f"\nResults saved to {args.output}")
+
+    found = []
+    if args.baseline.exists() :
+        baseline = json.loads(args.baseline.read_text())["benchmarks"]
+        found = regressions(results, baseline, args.tolerance)
+        print(f"Compared with {args.baseline} : {len(found)} regression(s)")
+        for regression in found :
+            print(f"    {regression}")
+    else :
+        found = [f"{name} : failed" for name, entry in results.items() if "error" in entry]
+        print(f"No baseline ({args.baseline}), use '--save-baseline' to store one.")
+
+    if args.save_baseline :
+        _save(args.baseline, results)
+        print(f"Baseline saved to {args.baseline}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__" :
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Import time of a module declaring 'TEMPLATES' templates (specialized), and
+instantiating each of them once :
+- 'untemplated' : the same module with plain functions, for reference.
+- 'with form' : the source of the with blocks is read, and the declarations
+  specialized and compiled at runtime.
+- 'ahead of time' : with the module generated by 'python -m aot'.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_aot
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+import importlib
+import sys
+import tempfile
+
+from pathlib import Path
+from time import perf_counter
+
+"Local Library :"
+import aot
+from aot import generation
+from utils import source_index
+
+
+# ******************************** Constants ***********************************
+
+TEMPLATES = 100
+
+_DECLARATION = '''
+class Scope{i} :
+    with template['N': int, 'T': type](specialize=True) :
+        def convert(values) :
+            return [T(value) * N + {i} for value in values]
+Scope{i}.convert[3, int]
+'''
+
+_UNTEMPLATED_DECLARATION = '''
+class Scope{i} :
+    def convert(values) :
+        return [int(value) * 3 + {i} for value in values]
+'''
+
+
+# ******************************** Benchmark ***********************************
+
+def _import(module: str) -> float :
+    sys.modules.pop(module, None)
+    source_index.clear()
+    aot._GENERATED.clear()
+    start = perf_counter()
+    importlib.import_module(module)
+    return (perf_counter() - start) * 1e3
+
+
+def main(rounds: int = 5) -> dict[str, float] :
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp :
+        modules = {
+            "untemplated": ("untemplated_declarations", _UNTEMPLATED_DECLARATION),
+            "with form": ("declarations", _DECLARATION),
+        }
+        for module, declaration in modules.values() :
+            source = ["from template import template"]
+            source += [declaration.format(i=i) for i in range(TEMPLATES)]
+            (Path(tmp) / f"{module}.py").write_text("\n".join(source))
+
+        sys.path.insert(0, tmp)
+        # As deployed : the modules (and the generated one) are compiled once,
+        # then loaded from '__pycache__'.
+        dont_write_bytecode = sys.dont_write_bytecode
+        sys.dont_write_bytecode = False
+        try :
+            for name, (module, _) in modules.items() :
+                results[name] = min(_import(module) for _ in range(rounds))
+
+            manifest = {
+                f"declarations:Scope{i}.convert": ["3, int"]
+                for i in range(TEMPLATES)
+            }
+            generation.generate([Path(tmp) / "declarations.py"], manifest)
+            results["ahead of time"] = min(
+                _import("declarations") for _ in range(rounds)
+            )
+        finally :
+            sys.dont_write_bytecode = dont_write_bytecode
+            sys.path.remove(tmp)
+            for module, _ in modules.values() :
+                sys.modules.pop(module, None)
+
+    for name, import_time in results.items() :
+        print(f"{name:>14} : {import_time:8.2f} ms")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,112 @@
+"""
+Longest stall of an asyncio event loop while instantiations of a specialized
+template are built, with 'tmpl[...]' (on the event loop) and with
+'await tmpl.build_async(...)' (on the default executor of the event loop).
+
+Built on another thread, the specialization of the declaration is preempted
+by the event loop ; compiling it still holds the GIL.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_async_build
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+import asyncio
+import importlib
+import sys
+import tempfile
+
+from pathlib import Path
+from time import perf_counter
+
+
+# ******************************** Constants ***********************************
+
+INSTANTIATIONS = 30
+
+# A declaration large enough for its specialization to take a while.
+BRANCHES = 40
+
+_DECLARATION = '''
+from template import template
+
+with template['N': int, 'T': type](specialize=True) :
+    def convert(values) :
+{branches}
+        return values
+'''
+
+_BRANCH = '''
+        if N == {i} :
+            values = [T(value) + {i} for value in values if value is not None]
+        elif N > {i} and isinstance(T, type) :
+            values = [T(value) * {i} for value in values]
+'''
+
+
+# ******************************** Benchmark ***********************************
+
+async def _longestStall(builds) -> float :
+    """Longest time (in ms) the event loop didn't run while 'builds' ran."""
+
+    longest = 0.0
+    done = False
+
+    async def tick() :
+        nonlocal longest
+        last = perf_counter()
+        while not done :
+            await asyncio.sleep(0)
+            now = perf_counter()
+            longest = max(longest, now - last)
+            last = now
+
+    ticker = asyncio.ensure_future(tick())
+    await asyncio.sleep(0)
+    await builds()
+    done = True
+    await ticker
+    return longest * 1e3
+
+
+def _declare(tmp: str) :
+    module = "async_declarations"
+    branches = "".join(_BRANCH.format(i=i) for i in range(BRANCHES))
+    (Path(tmp) / f"{module}.py").write_text(_DECLARATION.format(branches=branches))
+    sys.path.insert(0, tmp)
+    try :
+        return importlib.import_module(module).convert
+    finally :
+        sys.path.remove(tmp)
+        sys.modules.pop(module, None)
+
+
+def main(rounds: int = 3) -> dict[str, float] :
+    with tempfile.TemporaryDirectory() as tmp :
+        convert = _declare(tmp)
+
+        async def syncBuilds() :
+            for n in range(INSTANTIATIONS) :
+                convert[n, int]
+                await asyncio.sleep(0)
+
+        async def asyncBuilds() :
+            for n in range(INSTANTIATIONS) :
+                await convert.build_async((n, int))
+
+        results = {}
+        for name, builds in (("tmpl[...]", syncBuilds), ("build_async", asyncBuilds)) :
+            stalls = []
+            for _ in range(rounds) :
+                convert.cache_clear()
+                stalls.append(asyncio.run(_longestStall(builds)))
+            results[name] = min(stalls)
+            print(f"{name:>12} : {results[name]:8.2f} ms longest stall")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
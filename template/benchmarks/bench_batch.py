@@ -0,0 +1,69 @@
+"""
+Time to build 'INSTANTIATIONS' instantiations of a specialized template :
+- one by one ('tmpl[n, int]'), each specialized declaration being compiled
+  on its own.
+- with 'tmpl.instantiate_batch', all the specialized declarations being
+  compiled together, as a single module.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_batch
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+from time import perf_counter
+
+"Local Library :"
+from template import template
+from instantiation_cache import UnboundedCache
+
+
+# ******************************** Constants ***********************************
+
+INSTANTIATIONS = 200
+
+
+# ******************************** Templates ***********************************
+
+class GlobScope :
+    with template['N': int, 'T': type](specialize=True, cache=UnboundedCache()) :
+        def scale(values) :
+            if N == 0 :
+                return [T() for _ in values]
+            return [T(value) * N for value in values]
+
+scale = GlobScope.scale
+
+
+# ******************************** Benchmark ***********************************
+
+def _oneByOne() -> None :
+    for n in range(INSTANTIATIONS) :
+        scale[n, int]
+
+def _batched() -> None :
+    scale.instantiate_batch([(n, int) for n in range(INSTANTIATIONS)])
+
+
+def main(rounds: int = 5) -> dict[str, float] :
+    results = {}
+    for name, build in (("one by one", _oneByOne), ("batch", _batched)) :
+        times = []
+        for _ in range(rounds) :
+            scale.cache_clear()
+            start = perf_counter()
+            build()
+            times.append(perf_counter() - start)
+        assert scale[7, int]([1, 2]) == [7, 14]
+        results[name] = min(times) * 1e3
+        print(f"{name:>10} : {results[name]:8.2f} ms ({INSTANTIATIONS} builds)")
+
+    speedup = results["one by one"] / results["batch"]
+    print(f"{'speedup':>10} : {speedup:8.2f}x")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,63 @@
+"""
+Call overhead of instantiations compared with the equivalent hand-written
+function.
+
+With the with form, the template arguments are closure variables of the
+instantiation ; specialized, they are constants of its code ; with the
+decorator form, they are constants of a copy of the decorated code.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_call_overhead
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+from timeit import repeat
+
+"Local Library :"
+from template import template
+
+
+# ******************************** Templates ***********************************
+
+def scale(x) :
+    return x * 5 + 1
+
+class GlobScope :
+    with template['N': int] :
+        def scale(x) :
+            return x * N + 1
+
+    with template['N': int](specialize=True) :
+        def specialized_scale(x) :
+            return x * N + 1
+
+@template['N': int]
+def decorated_scale(x) :
+    return x * N + 1
+
+
+# ******************************** Benchmark ***********************************
+
+def main(number: int = 200_000, rounds: int = 7) -> dict[str, float] :
+    results = {}
+    for name, func in (
+        ("hand-written", scale),
+        ("with form", GlobScope.scale[5]),
+        ("specialized", GlobScope.specialized_scale[5]),
+        ("decorator form", decorated_scale[5]),
+    ) :
+        assert func(2) == 11
+        best = min(repeat(lambda : func(2), number=number, repeat=rounds))
+        results[name] = best / number * 1e9
+
+    for name, call_time in results.items() :
+        overhead = call_time / results["hand-written"]
+        print(f"{name:>16} : {call_time:8.1f} ns/call ({overhead:5.2f}x)")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
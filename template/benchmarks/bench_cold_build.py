@@ -0,0 +1,77 @@
+"""
+Cold-build cost of a callable template : building an instantiation that isn't
+memoized yet.
+
+Compares re-compiling the declaration for each build (previous behaviour) with
+executing the code object compiled once when the template is created.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_cold_build
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+from textwrap import dedent
+from timeit import repeat
+
+"Local Library :"
+from template import template
+
+
+# ******************************** Templates ***********************************
+
+class GlobScope :
+    with template['N': int, 'T': type] :
+        def convert(values) :
+            result = []
+            for value in values :
+                if isinstance(value, T) :
+                    result.append(value)
+                elif value is None :
+                    result.append(T())
+                else :
+                    result.append(T(value))
+            while len(result) < N :
+                result.append(T())
+            return result[:N]
+
+convert = GlobScope.convert
+
+
+# ******************************** Benchmark ***********************************
+
+def _recompiling_build(cb_template, build_args: tuple) :
+    template_scope = dict(zip(cb_template._param_names, build_args))
+    template_scope |= cb_template._globals
+    exec(dedent(cb_template._declaration), template_scope)
+    return template_scope[cb_template._name]
+
+def _cached_code_build(cb_template, build_args: tuple) :
+    return cb_template._notCached_build(build_args)
+
+
+def main(number: int = 2_000, rounds: int = 5) -> dict[str, float] :
+    build_args = (5, int)
+
+    results = {}
+    for name, build in (
+        ("recompiling build", _recompiling_build),
+        ("cached code build", _cached_code_build),
+    ) :
+        best = min(repeat(
+            lambda : build(convert, build_args),
+            number=number,
+            repeat=rounds,
+        ))
+        results[name] = best / number * 1e6
+        print(f"{name:>20} : {results[name]:8.2f} µs/build")
+
+    speedup = results["recompiling build"] / results["cached code build"]
+    print(f"{'speedup':>20} : {speedup:8.2f}x")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
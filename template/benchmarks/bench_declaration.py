@@ -0,0 +1,140 @@
+"""
+Import time of a module declaring 'TEMPLATES' templates, with the source of
+the with blocks looked up through the shared source index, and through
+'inspect.findsource' (the previous lookup) for comparison. The time spent
+looking up the with blocks is reported apart, as compiling the declarations
+dominates the import time.
+The same module, declaring its templates with the decorator form (which
+neither looks up nor compiles any source), is measured as well.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_declaration
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+import importlib
+import inspect
+import linecache
+import sys
+import tempfile
+
+from itertools import islice
+from pathlib import Path
+from textwrap import dedent
+from time import perf_counter
+
+"Local Library :"
+from template import template
+from utils import source_index
+
+
+# ******************************** Constants ***********************************
+
+TEMPLATES = 100
+
+_DECLARATION = '''
+class Scope{i} :
+    with template['N': int, 'T': type] :
+        def convert(values) :
+            return [T(value) * N + {i} for value in values]
+'''
+
+_DECORATED_DECLARATION = '''
+@template['N': int, 'T': type]
+def convert{i}(values) :
+    return [T(value) * N + {i} for value in values]
+'''
+
+
+# ******************************** Benchmark ***********************************
+
+def _findsource_WithBlock(self) -> str :
+    with_block_start, with_block_end, *_ = next(islice(
+        self._frame.f_code.co_positions(),
+        self._frame.f_lasti // 2,
+        None,
+    ))
+    return dedent("".join(
+        inspect.findsource(self._frame)[0][
+            with_block_start : with_block_end
+        ]
+    ))
+
+def _import(module: str, get_WithBlock) -> tuple[float, float] :
+    lookup_time = 0.0
+
+    def timed_get_WithBlock(self) -> str :
+        nonlocal lookup_time
+        start = perf_counter()
+        with_block = get_WithBlock(self)
+        lookup_time += perf_counter() - start
+        return with_block
+
+    sys.modules.pop(module, None)
+    source_index.clear()
+    linecache.clearcache()
+    template._get_WithBlock = timed_get_WithBlock
+    try :
+        start = perf_counter()
+        importlib.import_module(module)
+        import_time = perf_counter() - start
+    finally :
+        template._get_WithBlock = get_WithBlock
+    return import_time * 1e3, lookup_time * 1e3
+
+
+def main(rounds: int = 5) -> dict[str, tuple[float, float]] :
+    results = {}
+    reads = 0
+
+    def counted_read(*args) :
+        nonlocal reads
+        reads += 1
+        return read(*args)
+
+    with tempfile.TemporaryDirectory() as tmp :
+        module = "declarations"
+        decorated_module = "decorated_declarations"
+        for module_name, declaration in (
+            (module, _DECLARATION),
+            (decorated_module, _DECORATED_DECLARATION),
+        ) :
+            source = ["from template import template"]
+            source += [declaration.format(i=i) for i in range(TEMPLATES)]
+            (Path(tmp) / f"{module_name}.py").write_text("\n".join(source))
+
+        sys.path.insert(0, tmp)
+        read = source_index._read
+        source_index._read = counted_read
+        try :
+            for name, get_WithBlock in (
+                ("source index", template._get_WithBlock),
+                ("findsource", _findsource_WithBlock),
+            ) :
+                results[name] = min(
+                    _import(module, get_WithBlock) for _ in range(rounds)
+                )
+            results["decorator"] = min(
+                _import(decorated_module, template._get_WithBlock)
+                for _ in range(rounds)
+            )
+        finally :
+            source_index._read = read
+            sys.path.remove(tmp)
+            sys.modules.pop(module, None)
+            sys.modules.pop(decorated_module, None)
+
+    print(f"{TEMPLATES} templates, import time (of which with block lookup) :")
+    for name, (import_time, lookup_time) in results.items() :
+        print(f"{name:>12} : {import_time:8.2f} ms ({lookup_time:6.2f} ms)")
+    print(f"{'file reads':>12} : {reads // rounds:8d} (source index)")
+    speedup = results["findsource"][1] / results["source index"][1]
+    print(f"{'speedup':>12} : {speedup:8.2f}x (with block lookup)")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
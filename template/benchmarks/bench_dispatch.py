@@ -0,0 +1,104 @@
+"""
+Cost of calling the implementation matching the type of an argument, over a
+mix of argument types :
+- 'tmpl[type(x)](x)' : lookup of the instantiation on every call.
+- 'tmpl.dispatcher()' : per-type dispatch table of the callable template.
+- 'functools.singledispatch' : for reference.
+- A hand-written 'isinstance' chain : the baseline.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_dispatch
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+from functools import singledispatch
+from timeit import repeat
+
+"Local Library :"
+from template import template
+
+
+# ******************************** Constants ***********************************
+
+# The steady-state overhead of the dispatcher must be comparable to the one
+# of 'functools.singledispatch'.
+MAX_SLOWDOWN = 1.5
+
+VALUES = [1, 2.0, "3", b"4"] * 25
+
+
+# ******************************** Templates ***********************************
+
+class GlobScope :
+    with template['T': type] :
+        def describe(x) :
+            return T.__name__
+
+describe = GlobScope.describe
+dispatch = describe.dispatcher()
+
+
+@singledispatch
+def single_dispatched(x) :
+    raise NotImplementedError
+
+@single_dispatched.register
+def _(x: int) :
+    return "int"
+
+@single_dispatched.register
+def _(x: float) :
+    return "float"
+
+@single_dispatched.register
+def _(x: str) :
+    return "str"
+
+@single_dispatched.register
+def _(x: bytes) :
+    return "bytes"
+
+
+def isinstance_chain(x) :
+    if isinstance(x, int) :
+        return "int"
+    if isinstance(x, float) :
+        return "float"
+    if isinstance(x, str) :
+        return "str"
+    if isinstance(x, bytes) :
+        return "bytes"
+    raise NotImplementedError
+
+
+# ******************************** Benchmark ***********************************
+
+def main(number: int = 2_000, rounds: int = 7) -> dict[str, float] :
+    results = {}
+    for name, call in (
+        ("isinstance chain", isinstance_chain),
+        ("singledispatch", single_dispatched),
+        ("dispatcher", dispatch),
+        ("tmpl[type(x)](x)", lambda x : describe[type(x)](x)),
+    ) :
+        assert [call(x) for x in VALUES] == [type(x).__name__ for x in VALUES]
+        best = min(repeat(
+            lambda : [call(x) for x in VALUES], number=number, repeat=rounds,
+        ))
+        results[name] = best / (number * len(VALUES)) * 1e9
+        print(f"{name:>18} : {results[name]:8.0f} ns/call")
+
+    slowdown = results["dispatcher"] / results["singledispatch"]
+    print(f"{'slowdown':>18} : {slowdown:8.2f}x (dispatcher vs singledispatch)")
+    assert slowdown <= MAX_SLOWDOWN, (
+        f"The dispatcher is {slowdown:.2f}x slower than singledispatch "
+        f"(expected at most {MAX_SLOWDOWN}x)."
+    )
+    return results
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,110 @@
+"""
+Import time of a module declaring 'TEMPLATES' templates of which only 'USED'
+are instantiated, with eager declarations and with lazy ones ('lazy=True').
+Each import runs in a new interpreter (the modules being already compiled in
+'__pycache__'), so that the import of 'template' itself, and of 'ast' when
+needed, are measured too. For reference, the same module without templates,
+and a module only importing 'template', are measured as well.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_lazy_declaration
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+import os
+import subprocess
+import sys
+import tempfile
+
+from pathlib import Path
+
+
+# ******************************** Constants ***********************************
+
+TEMPLATES = 50
+USED = 2
+
+_DECLARATION = '''
+class Scope{i} :
+    with template['N': int, 'T': type]{options} :
+        def convert(values) :
+            return [T(value) * N + {i} for value in values]
+'''
+
+_UNTEMPLATED_DECLARATION = '''
+class Scope{i} :
+    def convert(values) :
+        return [int(value) * 3 + {i} for value in values]
+'''
+
+_USE = "Scope{i}.convert[3, int]([1, 2])\n"
+
+_TIMED_IMPORT = '''
+import sys
+from time import perf_counter
+start = perf_counter()
+import {module}
+print(perf_counter() - start, "ast" in sys.modules)
+'''
+
+
+# ******************************** Benchmark ***********************************
+
+def _write(directory: str, module: str, declaration: str, options: str = "") -> None :
+    source = [declaration.format(i=i, options=options) for i in range(TEMPLATES)]
+    if declaration is not _UNTEMPLATED_DECLARATION :
+        source.insert(0, "from template import template")
+        source += [_USE.format(i=i) for i in range(USED)]
+    (Path(directory) / f"{module}.py").write_text("\n".join(source))
+
+def _import(directory: str, module: str) -> tuple[float, bool] :
+    env = os.environ | {"PYTHONPATH": os.pathsep.join([directory, os.getcwd()])}
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    output = subprocess.run(
+        [sys.executable, "-c", _TIMED_IMPORT.format(module=module)],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return float(output[0]) * 1e3, output[1] == "True"
+
+
+def main(rounds: int = 15) -> dict[str, float] :
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp :
+        modules = {
+            "untemplated": "untemplated_declarations",
+            "no template": "no_declarations",
+            "eager": "eager_declarations",
+            "lazy": "lazy_declarations",
+        }
+        _write(tmp, modules["untemplated"], _UNTEMPLATED_DECLARATION)
+        (Path(tmp) / f"{modules['no template']}.py").write_text(
+            "from template import template\n"
+        )
+        _write(tmp, modules["eager"], _DECLARATION)
+        _write(tmp, modules["lazy"], _DECLARATION, "(lazy=True)")
+
+        for name, module in modules.items() :
+            # The first import compiles the modules into '__pycache__'.
+            _import(tmp, module)
+            timings = [_import(tmp, module) for _ in range(rounds)]
+            results[name] = min(import_time for import_time, _ in timings)
+            print(
+                f"{name:>12} : {results[name]:8.2f} ms "
+                f"('ast' imported : {timings[0][1]})"
+            )
+
+    print(f"({TEMPLATES} templates declared, {USED} instantiated)")
+    # Time spent declaring (and instantiating) the templates.
+    speedup = (
+        (results["eager"] - results["no template"])
+        / (results["lazy"] - results["no template"])
+    )
+    print(f"{'speedup':>12} : {speedup:8.2f}x (lazy vs eager, declarations only)")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,63 @@
+"""
+Cost of calling a function declaring a template and building one of its
+instantiations :
+- with the declarations cached per location (after the first call).
+- without (the cache cleared before each call), as before.
+- a function defining a plain nested function, for reference.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_local_declaration
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+from timeit import repeat
+
+"Local Library :"
+import template as template_module
+from template import template
+
+
+# ******************************** Functions ***********************************
+
+def declaring(n: int) :
+    with template['N': int] :
+        def cb(x) :
+            return x * N
+
+    return cb[n]
+
+def uncached_declaring(n: int) :
+    template_module._LOCAL_DECLARATIONS.clear()
+    return declaring(n)
+
+def plain(n: int) :
+    def cb(x) :
+        return x * n
+
+    return cb
+
+
+# ******************************** Benchmark ***********************************
+
+def main(number: int = 2_000, rounds: int = 5) -> dict[str, float] :
+    results = {}
+    for name, call in (
+        ("plain", plain),
+        ("cached", declaring),
+        ("not cached", uncached_declaring),
+    ) :
+        assert call(3)(2) == 6
+        best = min(repeat(lambda : call(3), number=number, repeat=rounds))
+        results[name] = best / number * 1e6
+        print(f"{name:>10} : {results[name]:8.2f} us/call")
+
+    speedup = results["not cached"] / results["cached"]
+    print(f"{'speedup':>10} : {speedup:8.2f}x (cached vs not cached)")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,94 @@
+"""
+Memory held by each instantiation of a callable template, measured with
+'tracemalloc', for a small module and for a module with many globals.
+
+Instantiations share the namespace of the declaring module, thus their size
+doesn't depend on the size of the module. Each one has its own code object,
+named after its template arguments (about 430 bytes of the total). For
+comparison, the previous build (executing the declaration in a copy of the
+module globals) is measured too.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_memory
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+import gc
+import linecache
+import tracemalloc
+
+"Local Library :"
+from template import template
+from instantiation_cache import UnboundedCache
+
+
+# ******************************** Constants ***********************************
+
+INSTANTIATIONS = 1_000
+
+_DECLARATION = '''
+with template['N': int, 'T': type](cache=UnboundedCache()) :
+    def convert(values) :
+        return [T(value) * N for value in values]
+'''
+
+
+# ******************************** Benchmark ***********************************
+
+def _declare(module_globals: int) -> dict :
+    namespace = {
+        "__name__": f"module_{module_globals}",
+        "template": template,
+        "UnboundedCache": UnboundedCache,
+    }
+    namespace |= {f"global_{i}": i for i in range(module_globals)}
+
+    # The source of the with block must be available.
+    filename = f"<bench_memory {module_globals}>"
+    lines = _DECLARATION.splitlines(keepends=True)
+    linecache.cache[filename] = (len(_DECLARATION), None, lines, filename)
+    exec(compile(_DECLARATION, filename, "exec"), namespace)
+    return namespace
+
+def _copying_build(cb_template, code, build_args: tuple) :
+    template_scope = dict(zip(cb_template._param_names, build_args))
+    template_scope |= cb_template._globals
+    exec(code, template_scope)
+    return template_scope[cb_template._name]
+
+def _bytesPerInstantiation(build) -> float :
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    instantiations = [build(n) for n in range(INSTANTIATIONS)]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del instantiations
+    return size / INSTANTIATIONS
+
+
+def main() -> dict[str, float] :
+    results = {}
+    for module_globals in (10, 1_000) :
+        namespace = _declare(module_globals)
+        convert = namespace["convert"]
+        code = compile(convert._declaration, "<string>", "exec")
+
+        results[f"shared, {module_globals} globals"] = _bytesPerInstantiation(
+            # Not memoized, as the copying build.
+            lambda n : convert._notCached_build((n, int))
+        )
+        results[f"copied, {module_globals} globals"] = _bytesPerInstantiation(
+            lambda n : _copying_build(convert, code, (n, int))
+        )
+
+    for name, size in results.items() :
+        print(f"{name:>22} : {size:10.0f} bytes/instantiation")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
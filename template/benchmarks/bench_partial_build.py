@@ -0,0 +1,61 @@
+"""
+Partial builds ('tmpl[5][int]') compared with full builds ('tmpl[5, int]'),
+for instantiations already memoized (warm) and not memoized yet (cold).
+
+A partial build is a view of the template, thus 'tmpl[5][int]' pays for a
+second lookup, but builds (and memoizes) the same instantiation.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_partial_build
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+from timeit import repeat
+
+"Local Library :"
+from template import template
+
+
+# ******************************** Templates ***********************************
+
+class GlobScope :
+    with template['N': int, 'T': type] :
+        def convert(values) :
+            return [T(value) * N for value in values]
+
+convert = GlobScope.convert
+
+
+# ******************************** Benchmark ***********************************
+
+def _coldFull() :
+    convert.cache_clear()
+    return convert[5, int]
+
+def _coldPartial() :
+    convert.cache_clear()
+    return convert[5][int]
+
+
+def main(number: int = 2_000, rounds: int = 5) -> dict[str, float] :
+    assert convert[5][int] is convert[5, int]
+
+    results = {}
+    for name, build, build_number in (
+        ("warm full", lambda : convert[5, int], number * 50),
+        ("warm partial", lambda : convert[5][int], number * 50),
+        ("cold full", _coldFull, number),
+        ("cold partial", _coldPartial, number),
+    ) :
+        convert[5, int]
+        best = min(repeat(build, number=build_number, repeat=rounds))
+        results[name] = best / build_number * 1e9
+        print(f"{name:>14} : {results[name]:10.0f} ns/build")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,112 @@
+"""
+Start-up cost of a process declaring and instantiating templates, with an
+empty persistent cache (cold start) and with a populated one (warm start).
+
+Each start is measured in a new interpreter, running a generated module which
+declares 'TEMPLATES' specialized templates and builds 'INSTANTIATIONS' of each.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_persistent_cache
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+import os
+import subprocess
+import sys
+import tempfile
+
+from pathlib import Path
+from textwrap import dedent
+
+
+# ******************************** Constants ***********************************
+
+TEMPLATES = 50
+INSTANTIATIONS = 10
+
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent
+
+_DECLARATION = '''
+class Scope{i} :
+    with template['N': int, 'T': type](specialize=True, persistent_cache=CACHE) :
+        def convert(values) :
+            result = []
+            for value in values :
+                if isinstance(value, T) :
+                    result.append(value)
+                elif value is None :
+                    result.append(T())
+                else :
+                    result.append(T(value))
+            for _ in range(N) :
+                result.append(T({i}))
+            return result
+'''
+
+_MAIN = '''
+import time
+start = time.perf_counter()
+import {module}
+for scope in {module}.SCOPES :
+    for n in range({instantiations}) :
+        scope.convert[n, int]
+print(time.perf_counter() - start)
+'''
+
+
+# ******************************** Benchmark ***********************************
+
+def _writeModule(directory: Path, module: str, use_cache: bool) -> None :
+    source = [
+        "from template import template",
+        "from code_cache import PersistentCodeCache",
+        f"CACHE = PersistentCodeCache({str(directory / 'cache')!r})"
+        if use_cache else "CACHE = False",
+    ]
+    source += [_DECLARATION.format(i=i) for i in range(TEMPLATES)]
+    source.append(
+        f"SCOPES = [{', '.join(f'Scope{i}' for i in range(TEMPLATES))}]"
+    )
+    (directory / f"{module}.py").write_text("\n".join(source))
+
+def _startUp(directory: Path, module: str) -> float :
+    env = os.environ | {
+        "PYTHONPATH": os.pathsep.join((str(TEMPLATE_DIR), str(directory))),
+        "PYTHONDONTWRITEBYTECODE": "1",
+    }
+    output = subprocess.run(
+        [sys.executable, "-c", dedent(_MAIN.format(
+            module=module, instantiations=INSTANTIATIONS,
+        ))],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return float(output) * 1e3
+
+
+def main(rounds: int = 3) -> dict[str, float] :
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp :
+        directory = Path(tmp)
+        _writeModule(directory, "without_cache", use_cache=False)
+        _writeModule(directory, "with_cache", use_cache=True)
+
+        results["no cache"] = min(
+            _startUp(directory, "without_cache") for _ in range(rounds)
+        )
+        results["cold start"] = _startUp(directory, "with_cache")
+        results["warm start"] = min(
+            _startUp(directory, "with_cache") for _ in range(rounds)
+        )
+
+    for name, duration in results.items() :
+        print(f"{name:>10} : {duration:8.1f} ms")
+    speedup = results["cold start"] / results["warm start"]
+    print(f"{'speedup':>10} : {speedup:8.2f}x (warm vs cold start)")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,78 @@
+"""
+Cost of profiling the calls of instantiations ('profiling').
+
+Calls of ordinary functions must be as fast while profiling as before : only
+the code objects of the instantiations are monitored. The calls of a profiled
+instantiation pay for the monitoring callbacks.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_profiling
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+from timeit import repeat
+
+"Local Library :"
+import profiling
+
+from template import template
+
+
+# ******************************** Constants ***********************************
+
+# Ordinary calls while profiling can't be slower than that, relatively to before.
+MAX_SLOWDOWN = 1.2
+
+
+# ******************************** Benchmark ***********************************
+
+def fib(n: int) -> int :
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+
+class GlobScope :
+    with template['N': int] :
+        def cb(x) :
+            return x + N
+
+
+def _bestTime(stmt, number: int, rounds: int) -> float :
+    return min(repeat(stmt, number=number, repeat=rounds)) / number
+
+
+def _measure(number: int, rounds: int) -> dict[str, float] :
+    instantiation = GlobScope.cb[1]
+    return {
+        # 'fib(15)' makes 1973 calls.
+        "ordinary call" : _bestTime(lambda : fib(15), number // 100, rounds) / 1973,
+        "instantiation call" : _bestTime(lambda : instantiation(1), number, rounds),
+    }
+
+
+def main(number: int = 100_000, rounds: int = 7) -> dict[str, float] :
+    results = {}
+    for name, time in _measure(number, rounds).items() :
+        results[f"{name} (not profiled)"] = time
+    profiling.enable()
+    try :
+        for name, time in _measure(number, rounds).items() :
+            results[f"{name} (profiled)"] = time
+    finally :
+        profiling.disable()
+        profiling.reset()
+
+    for name, time in results.items() :
+        print(f"{name:>30} : {time * 1e9:8.1f} ns")
+    slowdown = results["ordinary call (profiled)"] / results["ordinary call (not profiled)"]
+    print(f"{'ordinary calls slowdown':>30} : {slowdown:8.2f}x")
+    assert slowdown <= MAX_SLOWDOWN, (
+        f"Ordinary calls are {slowdown:.2f}x slower while profiling."
+    )
+    return results
+
+
+if __name__ == "__main__" :
+    main()
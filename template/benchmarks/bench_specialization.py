@@ -0,0 +1,60 @@
+"""
+Call cost of an instantiation whose template arguments are looked up as
+globals, compared with the same instantiation specialized at build time
+('template[...](specialize=True)').
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_specialization
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+from timeit import repeat
+
+"Local Library :"
+from template import template
+
+
+# ******************************** Templates ***********************************
+
+class GlobScope :
+    with template['N': int, 'T': type] :
+        def generic(x) :
+            acc = T()
+            for _ in range(N) :
+                acc += x
+            if T is int :
+                return -acc
+            return acc
+
+    with template['N': int, 'T': type](specialize=True) :
+        def specialized(x) :
+            acc = T()
+            for _ in range(N) :
+                acc += x
+            if T is int :
+                return -acc
+            return acc
+
+
+# ******************************** Benchmark ***********************************
+
+def main(number: int = 200_000, rounds: int = 5) -> dict[str, float] :
+    results = {}
+    for name, cb in (
+        ("generic", GlobScope.generic[4, int]),
+        ("specialized", GlobScope.specialized[4, int]),
+    ) :
+        best = min(repeat(lambda : cb(3), number=number, repeat=rounds))
+        results[name] = best / number * 1e9
+        print(f"{name:>12} : {results[name]:8.0f} ns/call")
+
+    speedup = results["generic"] / results["specialized"]
+    print(f"{'speedup':>12} : {speedup:8.2f}x")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
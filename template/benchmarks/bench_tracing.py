@@ -0,0 +1,61 @@
+"""
+Throughput of ordinary function calls before and after declaring a template.
+
+Declaring a template must not leave a trace function installed, which would
+slow down every later call of the thread : this is asserted. The slowdown is
+only reported, as the timings of two runs vary too much to bound it.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_tracing
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+import sys
+
+from timeit import repeat
+
+"Local Library :"
+from template import template
+
+
+# ******************************** Constants ***********************************
+
+# Results which are throughputs (see 'python -m benchmarks').
+HIGHER_IS_BETTER = ("before", "after")
+
+
+# ******************************** Benchmark ***********************************
+
+def fib(n: int) -> int :
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+
+def _callsPerSecond(number: int, rounds: int) -> float :
+    best = min(repeat(lambda : fib(15), number=number, repeat=rounds))
+    # 'fib(15)' makes 1973 calls.
+    return number * 1973 / best
+
+
+def main(number: int = 20, rounds: int = 7) -> dict[str, float] :
+    results = {"before" : _callsPerSecond(number, rounds)}
+
+    class GlobScope :
+        with template['N': int] :
+            def cb() :
+                ...
+
+    assert sys.gettrace() is None, "A trace function was left installed."
+    results["after"] = _callsPerSecond(number, rounds)
+
+    for name, throughput in results.items() :
+        print(f"{name:>8} : {throughput / 1e6:8.2f} M calls/s")
+    slowdown = results["before"] / results["after"]
+    print(f"{'slowdown':>8} : {slowdown:8.2f}x")
+    return results
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,55 @@
+"""
+Getting instantiations for unhashable template arguments (a dict here).
+
+Without 'identity_cache', such instantiations aren't memoized : each lookup
+builds one. With 'identity_cache', they are memoized by the identity of the
+arguments. A lookup with hashable arguments is measured for comparison.
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_unhashable
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+from timeit import repeat
+
+"Local Library :"
+from template import template
+
+
+# ******************************** Templates ***********************************
+
+class GlobScope :
+    with template['TABLE': object] :
+        def lookup(key) :
+            return TABLE[key]
+
+    with template['TABLE': object](identity_cache=True) :
+        def identity_lookup(key) :
+            return TABLE[key]
+
+
+# ******************************** Benchmark ***********************************
+
+def main(number: int = 20_000, rounds: int = 5) -> dict[str, float] :
+    table = {"a": 1, "b": 2}
+    hashable_table = tuple(table.items())
+
+    results = {}
+    for name, build in (
+        ("hashable", lambda : GlobScope.lookup[hashable_table,]),
+        ("unhashable, not memoized", lambda : GlobScope.lookup[table]),
+        ("unhashable, identity cache", lambda : GlobScope.identity_lookup[table]),
+    ) :
+        build()
+        best = min(repeat(build, number=number, repeat=rounds))
+        results[name] = best / number * 1e9
+        print(f"{name:>26} : {results[name]:10.0f} ns/lookup")
+    assert GlobScope.identity_lookup[table]("b") == 2
+    return results
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,71 @@
+"""
+Cost of getting an already built instantiation of a callable template
+('tmpl[N, T]' on a memoized instantiation).
+
+The warm lookup goes through the alias table of the template, whereas the
+reference path canonicalises the template arguments before looking up the
+cache (which is what every lookup used to do).
+
+Run from the 'template' directory :
+>>> python -m benchmarks.bench_warm_lookup
+"""
+
+
+# ********************************* Imports ************************************
+
+"Standard Library :"
+from timeit import repeat
+
+"Local Library :"
+from template import template
+
+
+# ******************************** Constants ***********************************
+
+# The warm lookup must be at least that many times faster than canonicalising
+# the template arguments.
+MIN_SPEEDUP = 2.
+
+
+# ******************************** Templates ***********************************
+
+class GlobScope :
+    with template['N': int, 'T': type] :
+        def cb() :
+            ...
+
+cb = GlobScope.cb
+
+
+# ******************************** Benchmark ***********************************
+
+def _canonicalising_lookup(key) :
+    return cb._build(cb._computeBuildArgs(key))
+
+
+def main(number: int = 100_000, rounds: int = 7) -> dict[str, float] :
+    positional_key = (5, int)
+    keyword_key = (slice('N', 5), slice('T', int))
+    cb[positional_key]; cb[keyword_key]
+
+    results = {}
+    for name, lookup in (
+        ("canonicalising", lambda : _canonicalising_lookup(positional_key)),
+        ("warm positional", lambda : cb[5, int]),
+        ("warm keyword", lambda : cb['N': 5, 'T': int]),
+    ) :
+        best = min(repeat(lookup, number=number, repeat=rounds))
+        results[name] = best / number * 1e9
+        print(f"{name:>16} : {results[name]:8.0f} ns/lookup")
+
+    speedup = results["canonicalising"] / results["warm positional"]
+    print(f"{'speedup':>16} : {speedup:8.2f}x")
+    assert speedup >= MIN_SPEEDUP, (
+        f"Warm lookup is only {speedup:.2f}x faster than canonicalising "
+        f"(expected at least {MIN_SPEEDUP}x)."
+    )
+    return results
+
+
+if __name__ == "__main__" :
+    main()
@@ -2,35 +2,521 @@
 from __future__ import annotations
 
 "Standard Library :"
+import builtins
+import linecache
+import re
+
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from numbers import Number
 from textwrap import dedent
-from functools import lru_cache
+from threading import Lock, get_ident
+from time import perf_counter
+from types import (
+    BuiltinFunctionType, CellType, FunctionType,
+    MemberDescriptorType, GetSetDescriptorType,
+)
+from weakref import WeakSet
 #To annotate :
-from collections.abc import Sequence, Callable
-from typing import overload, Any
+from collections.abc import Sequence, Callable, Iterable, Iterator
+from types import CodeType
+from typing import overload, Any, NamedTuple
 
 "Local Library :"
-from utils.frozendict import frozendict
+from code_cache import PersistentCodeCache, definitionStamp, stableRepr
+from utils import source_index
+from instantiation_cache import CacheInfo, InstantiationCache, LRUCache
 #To annotate :
 from utils.types import (
     TemplateArg, isTemplateArg,
     TemplateKwarg, isTemplateKwarg,
 )
 
+# 'ast', 'specialization' and 'utils.bytecode' are imported once needed, as
+# most of the templates declared by a module may never be instantiated (see
+# the lazy declarations).
+
+
+# ******************************** Constants ***********************************
+
+# Marks the template parameters without argument in a partial build.
+_UNBOUND = type("_UNBOUND", (), {"__repr__": lambda self : "<unbound>"})()
+
+# Marks the template arguments memoized by identity, in the key
+# '(_BY_IDENTITY, id(arg))' (see '_identityCached_build').
+_BY_IDENTITY = type("_BY_IDENTITY", (), {"__repr__": lambda self : "<by identity>"})()
+
+# Name of the function wrapping the declaration (see '_compileFactory').
+_FACTORY_NAME = "__template_factory__"
+# Qualified name prefix of the definitions of a factory, numbered when several
+# are compiled together ('__template_factory__3_1.<locals>.').
+_FACTORY_PREFIX = re.compile(rf"^{_FACTORY_NAME}\d*(_\d+)?\.<locals>\.")
+
+# Number of specialized codes a declaration shares with the next templates
+# declared at the same location, when their caches aren't bounded (see
+# 'GeneratedDeclaration').
+_MAX_SHARED_CODES = 128
+
+# Number of types (or combinations of types) a dispatcher memoizes : beyond,
+# its table is emptied, so that it doesn't hold every class it was called with
+# (see 'CallableTemplate.dispatcher').
+_MAX_DISPATCHED = 128
+
+
+# ********************************** Utils *************************************
+
+class _TypedArgs(tuple) :
+
+    """
+    Template arguments of which some are numbers that can be equal to numbers
+    of other types ('1 == 1.0 == True') : their types are compared as well, so
+    that those are keys of different instantiations.
+    """
+
+    __slots__ = ()
+
+    def __hash__(self) :
+        return hash((tuple(self), tuple(map(type, self))))
+
+    def __eq__(self, other) :
+        if not isinstance(other, tuple) :
+            return NotImplemented
+        return (
+            tuple.__eq__(self, other)
+            and tuple(map(type, self)) == tuple(map(type, other))
+        )
+
+    def __ne__(self, other) :
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+
+def _typedArgs(build_args: tuple) -> tuple :
+    """'build_args' as a '_TypedArgs' if some of them are ambiguous numbers."""
+
+    for arg in build_args :
+        if arg.__class__ is not int and isinstance(arg, Number) :
+            return _TypedArgs(build_args)
+    return build_args
+
+
+def _ids(key) -> tuple[int, ...] | int :
+    """Identity of the template arguments given by 'key'."""
+    if key.__class__ is tuple :
+        return tuple(map(id, key))
+    return id(key)
+
+
+def _leafTypes(key) -> tuple | type :
+    """Types of the template arguments given by 'key'."""
+
+    if key.__class__ is tuple :
+        types = tuple(map(type, key))
+        if slice not in types :
+            return types
+        return tuple([
+            k.stop.__class__ if k.__class__ is slice else k.__class__
+            for k in key
+        ])
+    return key.stop.__class__ if key.__class__ is slice else key.__class__
+
+
+class _TemplateNamespace(dict) :
+
+    """
+    Globals of an instantiation whose code couldn't be rewritten : holds the
+    template arguments, and resolves the other globals in the (live)
+    namespace of the module.
+    """
+
+    __slots__ = ("_module_globals",)
+
+    def __init__(self, template_args: dict[str, Any], module_globals: dict[str, Any]) -> None :
+        super().__init__(template_args)
+        self._module_globals = module_globals
+
+    def __missing__(self, key: str) -> Any :
+        return self._module_globals[key]
+
+
+def _rebindFunction(
+    func: FunctionType,
+    template_args: dict[str, Any],
+    owner: type | None = None,
+) -> FunctionType :
+    """
+    New function sharing the globals of 'func', whose code loads the template
+    arguments as constants. When 'func' is a method using 'super()' (or
+    '__class__'), its '__class__' cell refers to 'owner' instead.
+    """
+
+    from utils.bytecode import bindGlobals
+
+    code = bindGlobals(func.__code__, template_args)
+    func_globals = func.__globals__
+    if code is None :
+        code = func.__code__
+        func_globals = _TemplateNamespace(template_args, func_globals)
+
+    closure = func.__closure__
+    if owner is not None and "__class__" in code.co_freevars :
+        closure = tuple(
+            CellType(owner) if free_name == "__class__" else cell
+            for free_name, cell in zip(code.co_freevars, closure)
+        )
+
+    rebound = FunctionType(
+        code, func_globals, func.__name__, func.__defaults__, closure
+    )
+    rebound.__kwdefaults__ = func.__kwdefaults__
+    rebound.__qualname__ = func.__qualname__
+    rebound.__module__ = func.__module__
+    rebound.__doc__ = func.__doc__
+    rebound.__annotations__ = func.__annotations__
+    rebound.__type_params__ = func.__type_params__
+    rebound.__dict__.update(func.__dict__)
+    return rebound
+
+def _rebindMember(member: Any, template_args: dict[str, Any], owner: type) -> Any :
+    if isinstance(member, FunctionType) :
+        return _rebindFunction(member, template_args, owner)
+    if isinstance(member, (staticmethod, classmethod)) :
+        return type(member)(_rebindMember(member.__func__, template_args, owner))
+    if isinstance(member, property) :
+        return type(member)(
+            *(
+                _rebindMember(accessor, template_args, owner)
+                for accessor in (member.fget, member.fset, member.fdel)
+            ),
+            member.__doc__,
+        )
+    return member
+
+def _rebind(prototype: Callable, template_args: dict[str, Any]) -> Callable :
+    """
+    Copy of the function (or class) 'prototype' for 'template_args'.
+    Nothing is compiled : the code objects of 'prototype' are copied with the
+    template arguments as constants.
+    """
+
+    if isinstance(prototype, FunctionType) :
+        return _rebindFunction(prototype, template_args)
+
+    # The class body was already executed, thus only its methods are rebound.
+    class_namespace = {
+        attr: value
+        for attr, value in vars(prototype).items()
+        if attr not in ("__dict__", "__weakref__")
+        # Created again from '__slots__'.
+        and not isinstance(value, (MemberDescriptorType, GetSetDescriptorType))
+    }
+    class_namespace["__qualname__"] = prototype.__qualname__
+    rebound = type(prototype)(
+        prototype.__name__, prototype.__bases__, class_namespace
+    )
+    for attr, value in class_namespace.items() :
+        rebound_value = _rebindMember(value, template_args, rebound)
+        if rebound_value is not value :
+            setattr(rebound, attr, rebound_value)
+    return rebound
+
+
+def _stripFactoryQualname(code: CodeType) -> CodeType :
+    """
+    Qualified names of the code objects defined by a factory, as if they
+    were defined where the template was declared. A class body sets the
+    qualified name of its class from a constant : it is stripped as well.
+    The factories compiled together (see '_batched_build' and 'aot') may
+    share equal code objects, whatever their qualified names : the prefix of
+    any factory is stripped.
+    """
+
+    consts = tuple(
+        _stripFactoryQualname(const) if isinstance(const, CodeType)
+        else _FACTORY_PREFIX.sub("", const, count=1) if isinstance(const, str)
+        else const
+        for const in code.co_consts
+    )
+    return code.replace(
+        co_qualname=_FACTORY_PREFIX.sub("", code.co_qualname, count=1),
+        co_consts=consts,
+    )
+
+
+def _argRepr(arg: Any) -> str :
+    # 'int' rather than "<class 'int'>".
+    if isinstance(arg, (type, FunctionType, BuiltinFunctionType)) :
+        return arg.__qualname__
+    return repr(arg)
+
+def _classMembers(cls: type) -> Iterator[FunctionType | type] :
+    """Functions (methods and property accessors) and classes of 'cls'."""
+    for member in vars(cls).values() :
+        if isinstance(member, (staticmethod, classmethod)) :
+            member = member.__func__
+        accessors = (
+            (member.fget, member.fset, member.fdel)
+            if isinstance(member, property) else (member,)
+        )
+        for accessor in accessors :
+            if isinstance(accessor, (FunctionType, type)) :
+                yield accessor
+
+def _requalifyClass(cls: type, qualname: str, new_qualname: str) -> None :
+    # The functions and classes defined in the body of 'cls' (and not the
+    # ones it merely refers to) are qualified by 'cls'.
+    cls.__qualname__ = new_qualname
+    for member in _classMembers(cls) :
+        if member.__qualname__.startswith(qualname + ".") :
+            member_qualname = new_qualname + member.__qualname__.removeprefix(qualname)
+            if isinstance(member, type) :
+                _requalifyClass(member, member.__qualname__, member_qualname)
+            else :
+                member.__qualname__ = member_qualname
+
+def _qualify(instantiation: Callable, suffix: str) -> None :
+    """
+    Appends 'suffix' (the template arguments) to the qualified name of the
+    instantiation. The methods and the nested classes of a class are
+    qualified by the qualified name of the class.
+    """
+
+    if isinstance(instantiation, FunctionType) :
+        instantiation.__qualname__ += suffix
+    elif isinstance(instantiation, type) :
+        qualname = instantiation.__qualname__
+        if qualname.startswith(_FACTORY_NAME) :
+            # Defined by the factory (see '_stripFactoryQualname').
+            qualname = qualname.partition(".<locals>.")[2]
+        _requalifyClass(instantiation, qualname, qualname + suffix)
+
+def _namedCode(func: FunctionType) -> CodeType :
+    """
+    Copy of the code of 'func' named after the qualified name of 'func' : the
+    one of the instantiation is 'cb[N=5, T=int]' rather than 'cb'.
+    """
+    code = func.__code__
+    name = code.co_name
+    if func.__qualname__.startswith(code.co_qualname) :
+        name += func.__qualname__.removeprefix(code.co_qualname)
+    return code.replace(co_name=name, co_qualname=func.__qualname__)
+
+def _nameCodes(instantiation: Callable) -> None :
+    """
+    Gives the instantiation (and its methods) code objects of their own,
+    named after the template arguments : tracebacks and profilers (including
+    sampling ones, reading the code of the frames) name functions after their
+    code, and tell the instantiations apart.
+    """
+    if isinstance(instantiation, FunctionType) :
+        instantiation.__code__ = _namedCode(instantiation)
+    elif isinstance(instantiation, type) :
+        for member in _classMembers(instantiation) :
+            if member.__qualname__.startswith(instantiation.__qualname__ + ".") :
+                _nameCodes(member)
 
 # ********************************* Classes ************************************
 
+class _ExplicitSpecialization :
+
+    """
+    'tmpl.specialization[...]' : registers the decorated function (or class)
+    as the explicit specialization of 'tmpl' for the given template arguments.
+    """
+
+    __slots__ = ("_template",)
+
+    def __init__(self, cb_template: CallableTemplate) -> None :
+        self._template = cb_template
+
+    def __getitem__(self, key) -> Callable[[Callable], CallableTemplate] :
+        build_args = self._template._computeBuildArgs(key)
+
+        def register(specialization: Callable) -> CallableTemplate :
+            root = self._template._root
+            root._registerSpecialization(build_args, specialization)
+            # So that the specialization can be declared with the name of the
+            # template, as in C++.
+            return root
+
+        return register
+
+
+class BuildStats :
+
+    """
+    Time spent (in seconds) declaring a template, and parsing, compiling and
+    executing its declaration to build its instantiations (see 'registry').
+    """
+
+    __slots__ = ("declaration", "parse", "compile", "exec", "builds", "build_times")
+
+    def __init__(self) -> None :
+        self.declaration = 0.0
+        self.parse = 0.0
+        self.compile = 0.0
+        self.exec = 0.0
+        self.builds = 0
+        # Build time of each memoized instantiation, by key in the cache.
+        self.build_times: dict[tuple, BuildTime] = {}
+
+    def times(self) -> BuildTime :
+        return BuildTime(self.parse, self.compile, self.exec)
+
+
+class BuildTime(NamedTuple) :
+    parse: float
+    compile: float
+    exec: float
+
+
+class InstantiationRecord(NamedTuple) :
+    key: Any
+    instantiation: Callable | CallableTemplate
+    build_time: float  # In seconds
+
+
+class GeneratedDeclaration(NamedTuple) :
+    """
+    Declaration compiled ahead of time, by 'python -m aot' (or by a previous
+    call of the function declaring the template).
+    """
+
+    name: str
+    declaration: str
+    # 'None' when specializing.
+    factory: CodeType | None
+    # Code of the specialized factories, by the stable representations of
+    # their template arguments (see 'stableRepr').
+    instantiations: dict[tuple[str, ...], CodeType]
+
+
 class CallableTemplate :
+
+    # Called with each template, its template arguments and the instantiation
+    # built, while the instantiations are profiled (see 'profiling').
+    _on_built: Callable[[CallableTemplate, tuple, Callable], None] | None = None
+
     def __init__(
         self,
         name: str,
-        declaration: str,
+        declaration: str | None,
         template_params:dict[str, type],
-        globals: dict[str, Any]
+        globals: dict[str, Any],
+        free_vars: dict[str, Any] | None = None,
+        cache: InstantiationCache | None = None,
+        specialize: bool = False,
+        persistent_cache: PersistentCodeCache | None = None,
+        prototype: Callable | None = None,
+        identity_cache: bool = False,
+        generated: GeneratedDeclaration | None = None,
+        lazy_declaration: Callable[[], str] | None = None,
+        location: tuple[str, int] | None = None,
     ) -> None :
         self._name = name
-        self._declaration = declaration
         self._template_params = template_params
+        self._param_names = tuple(template_params)
+        # The module namespace is shared (and not copied) by the
+        # instantiations, which thus see its later changes.
         self._globals = globals
+        # Variables of the function declaring the template, used by the
+        # declaration : passed to the factory with the template arguments.
+        self._free_vars = free_vars or {}
+
+        # Partial builds are views of this template (see '_partialView').
+        self._root = self
+        self._stats = BuildStats()
+        # Canonical template arguments bound by a view, 'None' for the root.
+        self._bound = None
+
+        # Declared with the decorator form : the instantiations are copies of
+        # the decorated function (or class), sharing its globals.
+        self._prototype = prototype
+        if prototype is not None :
+            if specialize :
+                raise ValueError(
+                    "Specializing needs the source of the declaration, "
+                    "use the 'with' form instead."
+                )
+
+        # '(filename, line)' of the with statement declaring the template : the
+        # code compiled keeps the positions of the declaration in that file,
+        # for tracebacks and profilers.
+        self._location = location
+
+        # Compiled code can be reused by later processes.
+        self._persistent_cache = persistent_cache
+        self._persistent_key = None
+
+        # When specializing, the declaration is parsed once and each build
+        # compiles a version of it specialized for its template arguments.
+        # Otherwise, the declaration is parsed and compiled only once, when the
+        # template is declared. Each build then only calls the resulting
+        # factory.
+        self._specialize = specialize
+        self._tree = None
+        # Generated ahead of time : the factories were compiled with the
+        # generated module (see 'aot').
+        self._generated = generated
+        self._code = None
+        self._factory = None
+
+        # Declared lazily : the declaration is looked up (by calling
+        # 'lazy_declaration'), validated and compiled on the first build.
+        self._lazy_declaration = lazy_declaration
+        self._declaration_lock = Lock()
+        self._declaration = None
+        if lazy_declaration is None :
+            self._declare(declaration)
+
+        # Each template memoizes its own instantiations, so that one template
+        # can't evict the instantiations of another. Its partial builds share
+        # them.
+        if cache is None :
+            cache = LRUCache()
+        self._cache = cache
+        self._cache._on_evict = self._forget
+
+        # Instantiations for unhashable template arguments are memoized by the
+        # identity of those arguments. While memoized, the arguments are
+        # pinned, so that their ids can't be reused by other objects (the
+        # instantiation usually holds them anyway).
+        self._identity_cache = identity_cache
+        self._pinned = {}
+        # Subscripts already used to get those instantiations, by the ids of
+        # their items : '(subscript, key in the cache)', looked up before
+        # anything is hashed. One per instantiation, as the subscript is
+        # pinned as well.
+        self._identity_aliases = {} if identity_cache else None
+        self._identity_alias_of = {}
+
+        # Spellings of template arguments already resolved ('tmpl[5, int]',
+        # 'tmpl['N': 5, 'T': int]', ...), mapped to their canonical form.
+        # An alias lives as long as the instantiation it resolves to is cached.
+        self._aliases = {}
+        self._aliases_of = {}
+        self._aliases_lock = Lock()
+        # Dispatchers of the template and of its partial views, whose tables
+        # are emptied along with the cache (see 'dispatcher').
+        self._dispatchers = WeakSet()
+        # Numbers of different types can be equal ('1 == 1.0 == True') whereas
+        # only some of them are valid template arguments, and they build
+        # different instantiations (see '_TypedArgs'). Thus, the type of the
+        # template arguments must be part of the alias.
+        self._typed_aliases = any(
+            issubclass(param_type, Number) or issubclass(bool, param_type)
+            for param_type in template_params.values()
+        )
+
+        # Builds in progress, so that concurrent requests of the same
+        # instantiation wait for a single build instead of building it again.
+        self._in_flight: dict[tuple, Future] = {}
+        self._in_flight_lock = Lock()
+
+        # Explicit specializations, indexed by the positions of the template
+        # arguments they bind ('mask'), then by those arguments (and their
+        # types). The masks are ordered from the most to the least specialized.
+        self._specializations: dict[tuple[int, ...], dict[tuple, Callable]] = {}
+        self._specialization_masks: list[tuple[int, ...]] = []
 
 
     @overload
@@ -40,7 +526,7 @@ class CallableTemplate :
     def __getitem__(self, key: Sequence[TemplateArg | TemplateKwarg]) -> Callable : ...
 
     def _computeTemplateArg(self, template_arg: TemplateArg, pos: int) :
-        param_name = list(self._template_params.keys())[pos]
+        param_name = self._param_names[pos]
         param_type = self._template_params[param_name]
 
         if not isinstance(template_arg, param_type) :
@@ -60,7 +546,13 @@ class CallableTemplate :
             raise TypeError(f"'{param_name}' must be of type '{param_type}'.")
         return param_name, arg
 
-    def __getitem__(self, key) :
+    def _computeBuildArgs(self, key) -> tuple :
+        """
+        Canonical form of the template arguments given by 'key' : they are
+        ordered as the template parameters, whatever the way they were passed,
+        and missing ones are replaced by '_UNBOUND'.
+        """
+
         build_args = {}
 
         if isinstance(key, Sequence) :
@@ -78,47 +570,887 @@ class CallableTemplate :
                 raise SyntaxError(
                     "Keyword template argument precedes positional template argument"
                 )
-            return self._build(frozendict(build_args))
 
-        if isTemplateKwarg(key) :
+        elif isTemplateKwarg(key) :
             comp = self._computeTemplateKwarg(key)
             build_args[comp[0]] = comp[1]
-            return self._build(frozendict(build_args))
 
-        # 'key' is of type 'TemplateArg'
-        comp = self._computeTemplateArg(key, 0)
-        build_args[comp[0]] = comp[1]
-        return self._build(frozendict(build_args))
+        else :
+            # 'key' is of type 'TemplateArg'
+            comp = self._computeTemplateArg(key, 0)
+            build_args[comp[0]] = comp[1]
+
+        if self._bound is None :
+            return _typedArgs(tuple(
+                build_args.get(param_name, _UNBOUND)
+                for param_name in self._param_names
+            ))
+        # Completes the template arguments bound by the view.
+        return _typedArgs(tuple(
+            build_args.get(param_name, _UNBOUND) if bound_arg is _UNBOUND
+            else bound_arg
+            for param_name, bound_arg in zip(self._root._param_names, self._bound)
+        ))
 
+    def _aliasKey(self, key) :
+        if self._typed_aliases :
+            key = (key, _leafTypes(key))
+        if self._bound is not None :
+            # Views share the aliases of their root.
+            key = (self._bound, key)
+        return key
+
+    def __getitem__(self, key) :
+        if self._identity_aliases is not None :
+            # Fast path for unhashable template arguments.
+            entry = self._identity_aliases.get(_ids(key))
+            if entry is not None :
+                built = self._cache.get(entry[1])
+                if built is not None :
+                    return built
 
-    def _build(self, build_args: frozendict) -> Callable|CallableTemplate :
+        # Fast path : 'key' was already used to get a memoized instantiation.
+        try :
+            if self._bound is None :
+                alias = (key, _leafTypes(key)) if self._typed_aliases else key
+            else :
+                alias = self._aliasKey(key)
+            build_args = self._aliases[alias]
+        except (KeyError, TypeError) :
+            pass
+        else :
+            built = self._cache.get(build_args)
+            if built is not None :
+                return built
+
+        build_args = self._computeBuildArgs(key)
+        built = self._root._build(build_args)
+        self._addAlias(key, build_args)
+        return built
+
+
+    def _addAlias(self, key, build_args: tuple) -> None :
+        root = self._root
+        if root._cache.weak :
+            # Aliases would keep the template arguments alive.
+            return
+
+        try :
+            alias = self._aliasKey(key)
+            with root._aliases_lock :
+                root._aliases[alias] = build_args
+                root._aliases_of.setdefault(build_args, []).append(alias)
+        except TypeError :
+            # Unhashable template arguments are only memoized by identity.
+            if root._identity_cache and self._bound is None :
+                root._addIdentityAlias(key, build_args)
+            return
+
+        # Checked once the alias is registered, as the cache calls
+        # '_forgetAliases' (holding its lock) when it evicts an instantiation.
+        if build_args not in root._cache :
+            root._forgetAliases(build_args)
+
+    def _forget(self, key: tuple) -> None :
+        """Called with the key of each instantiation dropped by the cache."""
+        self._forgetAliases(key)
+        self._pinned.pop(key, None)
+        if self._identity_alias_of :
+            with self._aliases_lock :
+                ids = self._identity_alias_of.pop(key, None)
+                if ids is not None :
+                    self._identity_aliases.pop(ids, None)
+        self._stats.build_times.pop(key, None)
+
+    def _forgetAliases(self, build_args: tuple) -> None :
+        with self._aliases_lock :
+            for key in self._aliases_of.pop(build_args, ()) :
+                self._aliases.pop(key, None)
+
+
+    def _declare(self, declaration: str | None) -> None :
+        self._declaration = declaration
+        if self._persistent_cache is not None :
+            self._persistent_key = (
+                declaration,
+                ", ".join(
+                    f"{param_name}: {stableRepr(param_type)}"
+                    for param_name, param_type in self._template_params.items()
+                ),
+                ", ".join(self._free_vars),
+                repr(self._location),
+                "<factory binding its name>",
+            )
+
+        code = None
+        if self._generated is not None :
+            code = self._generated.factory
+        elif not self._specialize and self._prototype is None :
+            import ast
+
+            code = self._loadOrCompile(
+                lambda : self._compileFactory(self._parse(ast, declaration))
+            )
+        self._code = code
+        if code is not None :
+            self._factory = FunctionType(code, self._globals)
+
+    def _ensureDeclared(self) -> None :
+        if self._lazy_declaration is None :
+            return
+        with self._declaration_lock :
+            lazy_declaration = self._lazy_declaration
+            if lazy_declaration is not None :
+                self._declare(lazy_declaration())
+                # Cleared once declared, as it's checked without the lock.
+                self._lazy_declaration = None
+
+    def _getTree(self) -> ast.Module :
+        import ast
+
+        self._ensureDeclared()
+        if self._tree is None :
+            self._tree = self._parse(ast, self._declaration)
+        return self._tree
+
+    def _parse(self, ast, declaration: str) -> ast.Module :
+        start = perf_counter()
+        declaration = dedent(declaration)
+        tree = ast.parse(declaration)
+        if self._location is not None :
+            self._moveToLocation(ast, tree, declaration)
+        self._stats.parse += perf_counter() - start
+        return tree
+
+    def _moveToLocation(self, ast, tree: ast.Module, declaration: str) -> None :
+        """
+        Moves the nodes of the parsed declaration to their positions in the
+        declaring file.
+        """
+
+        filename, line = self._location
+        ast.increment_lineno(tree, line)
+
+        # The columns are shifted back by the indentation the declaration lost
+        # when dedented, if the source of the file was already read (it's not
+        # read only for that).
+        file_lines = source_index.indexedLines(filename)
+        if file_lines is None :
+            return
+        indent = 0
+        for i, decl_line in enumerate(declaration.splitlines()) :
+            if decl_line.strip() and line + i < len(file_lines) :
+                indent = len(file_lines[line + i].rstrip("\r\n")) - len(decl_line)
+                break
+        if indent <= 0 :
+            return
+        for node in ast.walk(tree) :
+            if getattr(node, "col_offset", None) is not None :
+                node.col_offset += indent
+            if getattr(node, "end_col_offset", None) is not None :
+                node.end_col_offset += indent
+
+    def _filename(self) -> str :
+        if self._location is None :
+            return "<string>"
+        filename = self._location[0]
+        if (
+            source_index.indexedLines(filename) is None
+            and not linecache.getlines(filename, self._globals)
+        ) :
+            # Not a file (nor known to the loader of the module) : the
+            # declaration is registered as its source, at the same lines.
+            lines = ["\n"] * self._location[1] + [
+                line if line.endswith("\n") else line + "\n"
+                for line in dedent(self._declaration).splitlines()
+            ]
+            linecache.cache[filename] = (None, None, lines, filename)
+        return filename
+
+    def _compileFactory(self, tree: ast.Module) -> CodeType :
+        """
+        Compiles the declaration 'tree' into the code of a factory :
+        >>> def __template_factory__(*, N, T) :
+        ...     <declaration>
+        ...     return <name>
+
+        Called with the template arguments, in the namespace of the module, it
+        returns an instantiation. Hence, the template arguments are closure
+        variables of the instantiation, whereas its globals are the module's.
+        """
+
+        import ast
+
+        start = perf_counter()
+        module = ast.fix_missing_locations(ast.Module([self._factoryDef(tree)], []))
+        code = compile(module, self._filename(), "exec")
+        self._stats.compile += perf_counter() - start
+        return _stripFactoryQualname(next(
+            const for const in code.co_consts if isinstance(const, CodeType)
+        ))
+
+    def _factoryDef(self, tree: ast.Module, factory_name: str = _FACTORY_NAME) -> ast.FunctionDef :
+        import ast
+
+        # The name of the definition is bound to the template until the
+        # definition runs : a class body can refer to its own template
+        # ('Fact[N - 1]').
+        param_names = (*self._param_names, *self._free_vars, self._name)
+        return ast.FunctionDef(
+            name=factory_name,
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[],
+                kwonlyargs=[ast.arg(param_name) for param_name in param_names],
+                kw_defaults=[None] * len(param_names),
+                defaults=[],
+            ),
+            body=[*tree.body, ast.Return(ast.Name(self._name, ast.Load()))],
+            decorator_list=[],
+            type_params=[],
+        )
+
+    def _loadOrCompile(self, compile_code, *key_parts: str | None) -> CodeType :
+        """
+        Loads the code identified by 'key_parts' from the persistent cache,
+        or compiles it (and stores it) with 'compile_code'.
+        """
+
+        cache = self._persistent_cache
+        if cache is None or None in key_parts :
+            # A part of the key has no stable representation : the code can't
+            # be identified from one process to another.
+            return compile_code()
+
+        key = cache.key(*self._persistent_key, *key_parts)
+        code = cache.load(key)
+        if not isinstance(code, CodeType) :
+            code = compile_code()
+            cache.store(key, code)
+        return code
+
+    def _specializedCode(self, template_scope: dict[str, Any]) -> CodeType :
+        arg_reprs = tuple(stableRepr(arg) for arg in template_scope.values())
+        if self._generated is not None :
+            code = self._generated.instantiations.get(arg_reprs)
+            if code is not None :
+                return code
+
+        def compile_code() :
+            from specialization import specialize as specialize_tree
+
+            tree = self._getTree()
+            start = perf_counter()
+            tree = specialize_tree(tree, template_scope, self._visibleGlobals())
+            self._stats.compile += perf_counter() - start
+            return self._compileFactory(tree)
+
+        code = self._loadOrCompile(
+            compile_code,
+            *arg_reprs,
+            # The folding depends on the definition of the arguments as well.
+            *(definitionStamp(arg) for arg in template_scope.values()),
+            # Builtins shadowed by the module aren't folded.
+            repr(sorted(self._visibleGlobals().keys() & vars(builtins).keys())),
+        )
+        generated = self._generated
+        if (
+            generated is not None and None not in arg_reprs
+            and len(generated.instantiations) < (self._cache.maxsize or _MAX_SHARED_CODES)
+        ) :
+            # Shared with the next templates declared at the same location, up
+            # to as many as the cache of a template holds.
+            generated.instantiations[arg_reprs] = code
+        return code
+
+
+    def _visibleGlobals(self) -> dict[str, Any] :
+        """Names the declaration sees besides the template parameters."""
+        if not self._free_vars :
+            return self._globals
+        return self._globals | self._free_vars
+
+    def _build(self, build_args: tuple) -> Callable|CallableTemplate :
         try :
             hash(build_args)
         except TypeError :
+            if self._identity_cache :
+                return self._identityCached_build(build_args)
             return self._notCached_build(build_args)
         else :
             return self._cached_build(build_args)
 
-    def _notCached_build(self, build_args: frozendict) -> Callable|CallableTemplate :
-        template_scope = build_args.unfreeze()
-
-        isBeingPartiallyBuild = len(self._template_params) > len(template_scope)
-        if isBeingPartiallyBuild :
-            return CallableTemplate(
-                self._name,
-                self._declaration,
-                {
-                    k:v
-                    for k,v in self._template_params.items()
-                    if k not in template_scope
-                },
-                self._globals | template_scope
+    def _identityKey(self, build_args: tuple) -> tuple[tuple, list] :
+        """
+        Key in the cache of the instantiation for 'build_args', where the
+        unhashable arguments are replaced by '(_BY_IDENTITY, id(arg))', and
+        those arguments.
+        """
+
+        key_parts = []
+        by_identity = []
+        for arg in build_args :
+            # Checked first, as most unhashable arguments are of an unhashable
+            # class : raising and catching a 'TypeError' costs more.
+            if arg.__class__.__hash__ is None :
+                by_identity.append(arg)
+                arg = (_BY_IDENTITY, id(arg))
+            else :
+                try :
+                    hash(arg)
+                except TypeError :
+                    # A tuple of unhashable items, for instance.
+                    by_identity.append(arg)
+                    arg = (_BY_IDENTITY, id(arg))
+            key_parts.append(arg)
+        return _typedArgs(tuple(key_parts)), by_identity
+
+    def _identityCached_build(self, build_args: tuple) -> Callable|CallableTemplate :
+        key, by_identity = self._identityKey(build_args)
+        built = self._cached_build(build_args, key)
+
+        if key not in self._pinned :
+            self._pinned[key] = by_identity
+            # Checked once pinned, as the instantiation might have been
+            # evicted meanwhile.
+            if self._cache.peek(key) is None :
+                self._pinned.pop(key, None)
+
+        return built
+
+    def _addIdentityAlias(self, key, build_args: tuple) -> None :
+        if key.__class__ is slice or (
+            key.__class__ is tuple and any(k.__class__ is slice for k in key)
+        ) :
+            # Slices are built on each subscript : their ids would never match.
+            return
+
+        cache_key = self._identityKey(build_args)[0]
+        ids = _ids(key)
+        with self._aliases_lock :
+            if cache_key not in self._pinned :
+                # Not memoized (anymore).
+                return
+            # Replaces the previous subscript of that instantiation, if any.
+            previous = self._identity_alias_of.get(cache_key)
+            if previous is not None :
+                self._identity_aliases.pop(previous, None)
+            # 'key' is kept with its ids, so that they can't be reused.
+            self._identity_aliases[ids] = (key, cache_key)
+            self._identity_alias_of[cache_key] = ids
+
+        # Checked once the alias is registered, as the cache calls '_forget'
+        # when it evicts an instantiation.
+        if cache_key not in self._cache :
+            self._forget(cache_key)
+
+    @property
+    def specialization(self) -> _ExplicitSpecialization :
+        """
+        Registers an explicit specialization, like 'template<>' in C++ :
+        >>> @tmpl.specialization['T': float]
+        ... def tmpl(values) :
+        ...     return math.fsum(values)
+
+        >>> @tmpl.specialization['N': 0]  # Partial specialization
+        ... def tmpl(values) :
+        ...     return 0
+
+        'tmpl[...]' then builds the most specialized registration matching
+        the template arguments (the one binding the most of them, the first
+        registered on a tie), or the declaration if none matches. As with the
+        decorator form, the specialization can use the template parameters.
+
+        Instantiations already memoized are forgotten (along with the ones
+        held by dispatchers), thus specializations are best registered before
+        instantiating the template.
+        """
+        return _ExplicitSpecialization(self)
+
+    def _registerSpecialization(self, build_args: tuple, specialization: Callable) -> None :
+        if not isinstance(specialization, (FunctionType, type)) :
+            raise TypeError("Can only specialize with class/function definition.")
+
+        mask = tuple(
+            pos for pos, arg in enumerate(build_args) if arg is not _UNBOUND
+        )
+        bound_args = tuple(build_args[pos] for pos in mask)
+        try :
+            hash(bound_args)
+        except TypeError :
+            raise TypeError("Explicit specializations need hashable template arguments.")
+
+        with self._in_flight_lock :
+            self._specializations.setdefault(mask, {})[
+                (bound_args, tuple(map(type, bound_args)))
+            ] = specialization
+            # Stable sort : ties are ordered by registration.
+            self._specialization_masks = sorted(
+                self._specializations, key=len, reverse=True
+            )
+        self.cache_clear()
+
+    def _matchSpecialization(self, build_args: tuple) -> Callable | None :
+        # A lookup per mask, whatever the number of specializations.
+        for mask in self._specialization_masks :
+            bound_args = tuple(build_args[pos] for pos in mask)
+            try :
+                specialization = self._specializations[mask].get(
+                    (bound_args, tuple(map(type, bound_args)))
+                )
+            except TypeError :
+                # Unhashable template argument.
+                continue
+            if specialization is not None :
+                return specialization
+        return None
+
+    def _argumentsSuffix(self, build_args: tuple) -> str :
+        """'[N=5, T=int]'"""
+        return "[" + ", ".join(
+            f"{param_name}={_argRepr(arg)}"
+            for param_name, arg in zip(self._param_names, build_args)
+        ) + "]"
+
+    def _partialView(self, build_args: tuple) -> CallableTemplate :
+        """
+        Partial build : a callable template whose template parameters are the
+        ones left unbound by 'build_args'.
+        The view only holds the bound template arguments : the declaration,
+        the compiled code and the instantiations are those of 'self'. Thus,
+        'tmpl[5][int]' and 'tmpl[5, int]' are the same instantiation.
+        """
+
+        view = object.__new__(CallableTemplate)
+        view._root = self
+        view._bound = build_args
+        view._name = self._name
+        view._template_params = {
+            param_name: param_type
+            for (param_name, param_type), arg
+            in zip(self._template_params.items(), build_args)
+            if arg is _UNBOUND
+        }
+        view._param_names = tuple(view._template_params)
+        view._typed_aliases = self._typed_aliases
+        view._cache = self._cache
+        view._identity_aliases = None
+        view._aliases = self._aliases
+        return view
+
+    def _notCached_build(self, build_args: tuple) -> Callable|CallableTemplate :
+        if any(arg is _UNBOUND for arg in build_args) :
+            return self._partialView(build_args)
+
+        template_scope = dict(zip(self._param_names, build_args))
+        specialization = self._matchSpecialization(build_args)
+        if specialization is None and self._prototype is None :
+            self._ensureDeclared()
+            factory = self._factory
+            if self._specialize :
+                factory = FunctionType(
+                    self._specializedCode(template_scope), self._globals
+                )
+
+        start = perf_counter()
+        if specialization is not None :
+            built = _rebind(specialization, template_scope)
+        elif self._prototype is not None :
+            built = _rebind(self._prototype, template_scope)
+        else :
+            built = factory(
+                **template_scope, **self._free_vars, **{self._name: self}
+            )
+        self._stats.exec += perf_counter() - start
+        self._stats.builds += 1
+        _qualify(built, self._argumentsSuffix(build_args))
+        _nameCodes(built)
+        if CallableTemplate._on_built is not None :
+            CallableTemplate._on_built(self, build_args, built)
+        return built
+
+    def _cached_build(self, build_args: tuple, key: tuple | None = None) -> Callable|CallableTemplate :
+        # Instantiations are memoized under 'key' (by default 'build_args').
+        if key is None :
+            key = build_args
+
+        built = self._cache.get(key)
+        if built is not None :
+            return built
+
+        built, future, is_builder = self._claimBuild(key)
+        if built is not None :
+            return built
+        if not is_builder :
+            if getattr(future, "builder_thread", None) == get_ident() and not future.done() :
+                # Needed by its own build, or by the build of a batch holding
+                # it (a recursive template) : built apart rather than waiting
+                # for itself.
+                return self._notCached_build(build_args)
+            return future.result()
+        return self._runBuild(build_args, key, future)
+
+    def _claimBuild(self, key: tuple) -> tuple[Callable | None, Future | None, bool] :
+        """
+        Instantiation memoized under 'key' meanwhile, or else the future of
+        its build, and whether the caller claimed that build (then, it must
+        run it with '_runBuild').
+        """
+
+        with self._in_flight_lock :
+            future = self._in_flight.get(key)
+            if future is not None :
+                return None, future, False
+            # Might have been built since the cache was looked up.
+            built = self._cache.peek(key)
+            if built is not None :
+                return built, None, False
+            future = self._in_flight[key] = Future()
+            return None, future, True
+
+    def _runBuild(self, build_args: tuple, key: tuple, future: Future) -> Callable|CallableTemplate :
+        future.builder_thread = get_ident()
+        try :
+            # Approximate when other instantiations are built concurrently.
+            start = self._stats.times()
+            built = self._notCached_build(build_args)
+            end = self._stats.times()
+        except BaseException as err :
+            future.set_exception(err)
+            raise
+        else :
+            # Recorded first, as the cache may evict the instantiation right away.
+            self._recordBuild(
+                key, BuildTime(*(e - s for s, e in zip(start, end)))
             )
+            self._cache.put(key, built)
+            future.set_result(built)
+            return built
+        finally :
+            # Removed once memoized : a late thread either waits for the future
+            # or finds the instantiation in the cache.
+            with self._in_flight_lock :
+                del self._in_flight[key]
+
+
+    async def build_async(self, key, *, executor: Executor | None = None) -> Callable|CallableTemplate :
+        """
+        Awaitable 'self[key]' : the instantiation is built on 'executor' (by
+        default, the one of the event loop), thus compiling it doesn't block
+        the event loop :
+        >>> cb = await tmpl.build_async((5, int))
+
+        Concurrent awaiters of the same instantiation (and threads getting it
+        with 'self[key]') share a single build, memoized in the same cache as
+        'self[key]'. Cancelling an awaiter doesn't cancel that build.
+        """
+
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        root = self._root
+        build_args = self._computeBuildArgs(key)
+        try :
+            hash(build_args)
+        except TypeError :
+            # Not memoized (or by identity) : built as by 'self[key]'.
+            return await loop.run_in_executor(executor, self.__getitem__, key)
+
+        built = root._cache.get(build_args)
+        if built is None :
+            built, future, is_builder = root._claimBuild(build_args)
+        if built is None :
+            if is_builder :
+                def build() -> None :
+                    try :
+                        root._runBuild(build_args, build_args, future)
+                    except BaseException :
+                        # Raised to the awaiters by 'future'.
+                        pass
+
+                try :
+                    loop.run_in_executor(executor, build)
+                except BaseException as err :
+                    # The executor was shut down, for instance.
+                    future.set_exception(err)
+                    with root._in_flight_lock :
+                        del root._in_flight[build_args]
+                    raise
+            built = await asyncio.shield(asyncio.wrap_future(future))
+
+        self._addAlias(key, build_args)
+        return built
+
+
+    def _recordBuild(self, key: tuple, build_time: BuildTime) -> None :
+        # Dropped with the instantiation (see '_forget'). Not recorded for weak
+        # caches, as the key would keep the template arguments alive.
+        if not self._cache.weak :
+            self._stats.build_times[key] = build_time
+
+    def instantiate(
+        self,
+        keys: Iterable,
+        *,
+        parallel: bool = False,
+        max_workers: int | None = None,
+    ) -> list[InstantiationRecord] :
+        """
+        Explicitly instantiates the template for each key of 'keys', like
+        'template class Foo<int>;' does in C++. A key is what would be given
+        to 'self[...]' :
+        >>> tmpl.instantiate([(5, int), (slice('N', 6), slice('T', str))])
+
+        The instantiations are memoized, and their build time is reported to
+        spot the expensive ones. With 'parallel', they are built by a pool of
+        'max_workers' threads.
+        """
+
+        keys = list(keys)
+        # Invalid keys are reported before anything is built.
+        all_build_args = [self._computeBuildArgs(key) for key in keys]
+
+        def build(key, build_args: tuple) -> InstantiationRecord :
+            start = perf_counter()
+            built = self._root._build(build_args)
+            build_time = perf_counter() - start
+            self._addAlias(key, build_args)
+            return InstantiationRecord(key, built, build_time)
+
+        if not parallel :
+            return list(map(build, keys, all_build_args))
+        with ThreadPoolExecutor(max_workers) as executor :
+            return list(executor.map(build, keys, all_build_args))
+
+
+    def instantiate_batch(self, keys: Iterable) -> dict[tuple, Callable | CallableTemplate] :
+        """
+        Instantiates the template for each key of 'keys' (as 'instantiate'),
+        and returns the instantiations by their canonical template arguments
+        (ordered as the template parameters) :
+        >>> tmpl.instantiate_batch([(n, int) for n in range(200)])
+        {(0, int): <function tmpl>, (1, int): <function tmpl>, ...}
+
+        For a specialized template, the specialized declarations of all the
+        instantiations not memoized yet are compiled together, as a single
+        module (each one in the namespace of its own factory). Otherwise, the
+        declaration is already compiled, and each instantiation is built as
+        usual.
+        """
+
+        keys = list(keys)
+        # Invalid keys are reported before anything is built.
+        all_build_args = [self._computeBuildArgs(key) for key in keys]
+        for build_args in all_build_args :
+            try :
+                hash(build_args)
+            except TypeError :
+                raise TypeError(
+                    "Batch instantiation needs hashable template arguments."
+                ) from None
+
+        root = self._root
+        built = {}
+        batched = {}
+        for build_args in dict.fromkeys(all_build_args) :
+            instantiation = root._cache.peek(build_args)
+            if instantiation is not None :
+                built[build_args] = instantiation
+            elif (
+                root._specialize
+                and not any(arg is _UNBOUND for arg in build_args)
+                and root._matchSpecialization(build_args) is None
+            ) :
+                with root._in_flight_lock :
+                    if build_args not in root._in_flight :
+                        future = batched[build_args] = root._in_flight[build_args] = Future()
+                        future.builder_thread = get_ident()
+
+        try :
+            if batched :
+                # Each instantiation is published once built : the next ones
+                # of the batch may use it.
+                for build_args, instantiation in zip(
+                    batched, root._batched_build(list(batched))
+                ) :
+                    root._cache.put(build_args, instantiation)
+                    batched[build_args].set_result(instantiation)
+                    built[build_args] = instantiation
+        except BaseException as err :
+            for future in batched.values() :
+                if not future.done() :
+                    future.set_exception(err)
+            raise
+        finally :
+            with root._in_flight_lock :
+                for build_args in batched :
+                    del root._in_flight[build_args]
+
+        for key, build_args in zip(keys, all_build_args) :
+            if build_args not in built :
+                # Not specialized, partial, or being built by another thread.
+                built[build_args] = root._build(build_args)
+            self._addAlias(key, build_args)
+        return built
+
+    def _batched_build(self, all_build_args: list[tuple]) -> Iterator[Callable] :
+        import ast
+        from specialization import specialize as specialize_tree
+
+        tree = self._getTree()
+        start = perf_counter()
+        factory_defs = []
+        for i, build_args in enumerate(all_build_args) :
+            template_scope = dict(zip(self._param_names, build_args))
+            factory_defs.append(self._factoryDef(
+                specialize_tree(tree, template_scope, self._visibleGlobals()),
+                f"{_FACTORY_NAME}{i}",
+            ))
+        module = ast.fix_missing_locations(ast.Module(factory_defs, []))
+        factory_codes = {
+            const.co_name : const
+            for const in compile(module, self._filename(), "exec").co_consts
+            if isinstance(const, CodeType)
+        }
+        compile_time = perf_counter() - start
+        self._stats.compile += compile_time
+
+        for i, build_args in enumerate(all_build_args) :
+            factory_name = f"{_FACTORY_NAME}{i}"
+            factory = FunctionType(
+                _stripFactoryQualname(factory_codes[factory_name]),
+                self._globals,
+            )
+            start = perf_counter()
+            built = factory(
+                **dict(zip(self._param_names, build_args)), **self._free_vars,
+                **{self._name: self},
+            )
+            exec_time = perf_counter() - start
+            self._stats.exec += exec_time
+            self._stats.builds += 1
+            _qualify(built, self._argumentsSuffix(build_args))
+            _nameCodes(built)
+            if CallableTemplate._on_built is not None :
+                CallableTemplate._on_built(self, build_args, built)
+            # The compilation is shared by the whole batch.
+            self._recordBuild(
+                build_args,
+                BuildTime(0.0, compile_time / len(all_build_args), exec_time),
+            )
+            yield built
+
+
+    def dispatcher(self, **sources: int | str) -> Callable :
+        """
+        Function calling the instantiation matching the types of its
+        arguments, for hot loops where 'tmpl[type(x)](x)' would be written :
+        >>> dispatch = tmpl.dispatcher(T=0, U="y")
+        >>> dispatch(5, y="a")  # Calls 'tmpl[int, str](5, y="a")'
+
+        Each template parameter is given the type of a call argument : an
+        index for a positional argument, a name for a keyword argument (which
+        must then be passed by keyword). By default, the template parameters
+        of type 'type' (or untyped) are given the types of the positional
+        arguments, in order. The other template parameters must be bound
+        beforehand ('tmpl[5].dispatcher()').
+
+        The instantiations are memoized in a table keyed by the types of the
+        arguments, of at most 128 entries. The table is emptied by
+        'dispatch.cache_clear()', and along with the cache of the template
+        ('tmpl.cache_clear()', the registration of a specialization).
+        """
+
+        if not sources :
+            sources = {
+                param_name: pos
+                for pos, param_name in enumerate(
+                    param_name
+                    for param_name, param_type in self._template_params.items()
+                    if param_type is object or issubclass(param_type, type)
+                )
+            }
+        for param_name, source in sources.items() :
+            if param_name not in self._template_params :
+                raise NameError(f"'{param_name}' isn't a template parameter.")
+            if isinstance(source, bool) or not isinstance(source, (int, str)) :
+                raise TypeError(
+                    f"The source of '{param_name}' must be the position (int) "
+                    f"or the name (str) of a call argument, not {source!r}."
+                )
+        if len(sources) != len(self._param_names) :
+            unbound = ", ".join(
+                f"'{param_name}'"
+                for param_name in self._param_names
+                if param_name not in sources
+            )
+            raise TypeError(f"{unbound} must be bound before dispatching.")
+
+        param_names = tuple(sources)
+        getters = [
+            f"args[{source}].__class__" if isinstance(source, int)
+            else f"kwargs[{source!r}].__class__"
+            for source in sources.values()
+        ]
+        table_key = getters[0] if len(getters) == 1 else f"({', '.join(getters)},)"
+
+        table = {}
+
+        def resolve(args: tuple, kwargs: dict) -> Callable :
+            try :
+                types = tuple(
+                    args[source] if isinstance(source, int) else kwargs[source]
+                    for source in sources.values()
+                )
+            except (IndexError, KeyError) :
+                raise TypeError(
+                    f"'{self._name}' dispatcher expects the arguments "
+                    f"{', '.join(map(repr, sources.values()))}."
+                ) from None
+            types = tuple(arg.__class__ for arg in types)
+
+            instantiation = self[tuple(
+                slice(param_name, arg_type)
+                for param_name, arg_type in zip(param_names, types)
+            )]
+            if len(table) >= _MAX_DISPATCHED :
+                table.clear()
+            table[types if len(types) > 1 else types[0]] = instantiation
+            return instantiation
+
+        # Compiled for the given sources, so that the steady state is a single
+        # lookup in the dispatch table.
+        namespace = {}
+        exec(dedent(f"""
+            def factory(table, resolve) :
+                def dispatch(*args, **kwargs) :
+                    try :
+                        instantiation = table[{table_key}]
+                    except (KeyError, IndexError) :
+                        instantiation = resolve(args, kwargs)
+                    return instantiation(*args, **kwargs)
+                return dispatch
+        """), namespace)
+        dispatch = namespace["factory"](table, resolve)
+        dispatch.__qualname__ = f"{self._name}.dispatch"
+        dispatch.cache_clear = table.clear
+        self._root._dispatchers.add(dispatch)
+        return dispatch
+
 
-        template_scope |= self._globals
-        exec(dedent(self._declaration), template_scope)
-        return template_scope[self._name]
+    def cache_info(self) -> CacheInfo :
+        """
+        Statistics of the cache memoizing the instantiations (shared by a
+        template and its partial builds).
+        """
+        return self._cache.info()
 
-    @lru_cache(50)
-    def _cached_build(self, build_args: frozendict) -> Callable|CallableTemplate :
-        return self._notCached_build(build_args)
+    def cache_clear(self) -> None :
+        """Forgets every memoized instantiation and resets the statistics."""
+        root = self._root
+        root._cache.clear()
+        with root._aliases_lock :
+            root._aliases.clear()
+            root._aliases_of.clear()
+        for dispatch in list(root._dispatchers) :
+            dispatch.cache_clear()
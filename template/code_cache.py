@@ -0,0 +1,160 @@
+# ********************************* Imports ************************************
+from __future__ import annotations
+
+"Standard Library :"
+import marshal
+import os
+import sys
+
+from hashlib import sha256
+from importlib.util import MAGIC_NUMBER
+from pathlib import Path
+#To annotate :
+from typing import Any
+
+
+# ******************************** Constants ***********************************
+
+__all__ = ("PersistentCodeCache", "stableRepr", "definitionStamp")
+
+# Mirrors '__pycache__', next to the module declaring the templates.
+DEFAULT_DIRNAME = os.path.join("__pycache__", "templates")
+
+_SUFFIX = ".tpyc"
+
+
+# ********************************** Utils *************************************
+
+def stableRepr(value: Any) -> str | None :
+    """
+    Representation of a template argument that is the same from one process
+    to another, or 'None' if there is none.
+    Literals are represented by their 'repr', classes and functions by their
+    qualified name.
+    """
+
+    value_type = type(value)
+    if value_type in (int, float, complex, str, bytes, bool, type(None)) :
+        return repr(value)
+    if value_type is tuple :
+        items = [stableRepr(v) for v in value]
+        if None in items :
+            return None
+        return f"({', '.join(items)},)"
+
+    module = getattr(value, "__module__", None)
+    qualname = getattr(value, "__qualname__", None)
+    if (
+        isinstance(module, str)
+        and isinstance(qualname, str)
+        and "<locals>" not in qualname
+    ) :
+        return f"<{module}.{qualname}>"
+    return None
+
+def definitionStamp(value: Any) -> str | None :
+    """
+    Stamp of the source files defining a template argument that isn't a
+    literal : the modules of a class and of its bases, the module of a
+    function. 'None' if one of them isn't found.
+    Specialization folds 'issubclass(T, int)', 'T is ...' with the argument
+    itself, whereas 'stableRepr' only names it : the stamp changes when its
+    definition may have.
+    """
+
+    if type(value) is tuple :
+        stamps = [definitionStamp(v) for v in value]
+        return None if None in stamps else "".join(stamps)
+    if type(value) in (int, float, complex, str, bytes, bool, type(None)) :
+        return ""
+
+    module_names = {
+        getattr(cls, "__module__", None)
+        for cls in (value.__mro__ if isinstance(value, type) else (value,))
+    }
+    stamps = []
+    for module_name in sorted(module_names, key=str) :
+        module = sys.modules.get(module_name)
+        if module is None :
+            return None
+        module_file = getattr(module, "__file__", None)
+        if module_file is None :
+            # Built in the interpreter, as the bytecode version of the key.
+            continue
+        try :
+            stat = os.stat(module_file)
+        except (OSError, ValueError) :
+            return None
+        stamps.append(f"{module_name}:{stat.st_mtime_ns}:{stat.st_size}")
+    return repr(stamps)
+
+
+# ********************************* Classes ************************************
+
+class PersistentCodeCache :
+
+    """
+    Stores compiled code on disk, so that a later process can skip parsing and
+    compiling the declarations of templates (and their specialized
+    instantiations).
+
+    The entries are keyed by a hash of everything the code depends on (the
+    declaration's source, the template parameters, the template arguments and
+    the bytecode version). Thus, when the source changes, the entry is simply
+    not found anymore and the code is compiled again.
+    """
+
+    def __init__(self, directory: str | os.PathLike) -> None :
+        self.directory = Path(directory)
+        self._has_directory = False
+
+    @classmethod
+    def nextTo(cls, module_file: str | None) -> PersistentCodeCache | None :
+        """
+        Cache stored in '__pycache__/templates', next to 'module_file'.
+        Returns 'None' when the module isn't a file.
+        """
+        if not module_file :
+            return None
+        return cls(Path(module_file).resolve().parent / DEFAULT_DIRNAME)
+
+    @staticmethod
+    def key(*parts: str) -> str :
+        digest = sha256(MAGIC_NUMBER)
+        for part in parts :
+            digest.update(b"\0")
+            digest.update(part.encode("utf-8", "surrogatepass"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path :
+        return self.directory / (key + _SUFFIX)
+
+    def load(self, key: str) -> Any :
+        """Returns the entry stored under 'key', or 'None'."""
+        try :
+            data = self._path(key).read_bytes()
+        except OSError :
+            return None
+        try :
+            return marshal.loads(data)
+        except (EOFError, ValueError, TypeError) :
+            # Corrupted entry : it will be overwritten.
+            return None
+
+    def store(self, key: str, value: Any) -> None :
+        """
+        Stores 'value' (anything 'marshal' supports) under 'key'.
+        As for '__pycache__', failing to write is silently ignored.
+        """
+        path = self._path(key)
+        try :
+            if not self._has_directory :
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._has_directory = True
+            # Written in a temporary file first, so that concurrent processes
+            # never read a partially written entry.
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(marshal.dumps(value))
+            os.replace(tmp_path, path)
+        except OSError :
+            pass
@@ -0,0 +1,479 @@
+# ********************************* Imports ************************************
+from __future__ import annotations
+
+"Standard Library :"
+import sys
+
+from collections import OrderedDict
+from threading import Lock, RLock
+from time import monotonic
+from weakref import finalize, ref
+#To annotate :
+from collections.abc import Hashable, Iterator
+from typing import Any, NamedTuple
+
+
+# ******************************** Constants ***********************************
+
+__all__ = (
+    "CacheInfo",
+    "InstantiationCache",
+    "UnboundedCache",
+    "LRUCache",
+    "TTLCache",
+    "MemoryBudget",
+    "MemoryBudgetCache",
+    "WeakCache",
+)
+
+_MISSING = object()
+
+
+# ********************************** Utils *************************************
+
+def approximate_size(obj: object) -> int :
+    """
+    Rough estimation, in bytes, of the memory held by an instantiation.
+    Only what is owned by the instantiation is accounted for : the object
+    itself, its qualified name, its attributes' namespace and, for functions,
+    their closure (where the template arguments are) and their code, named
+    after the instantiation. Module globals are shared, thus ignored.
+    """
+
+    size = sys.getsizeof(obj)
+
+    qualname = getattr(obj, "__qualname__", None)
+    if isinstance(qualname, str) :
+        size += sys.getsizeof(qualname)
+
+    code = getattr(obj, "__code__", None)
+    if code is not None and code.co_qualname == qualname :
+        size += sys.getsizeof(code)
+
+    namespace = getattr(obj, "__dict__", None)
+    if namespace is not None :
+        size += sys.getsizeof(namespace)
+
+    closure = getattr(obj, "__closure__", None)
+    if closure is not None :
+        size += sys.getsizeof(closure) + sum(map(sys.getsizeof, closure))
+
+    return size
+
+
+# ********************************* Classes ************************************
+
+class CacheInfo(NamedTuple) :
+    hits: int
+    misses: int
+    maxsize: int | None
+    currsize: int
+
+
+class InstantiationCache :
+
+    """
+    Base class of the caches memoizing the instantiations of a callable
+    template.
+
+    Each callable template owns its cache, so the policy (and the size) of the
+    cache can be chosen per template. Subclasses only have to implement
+    '_get', '_put', '_pop', '_clear', '__len__' and '__iter__', and to call
+    '_evicted' when they drop an entry by themselves; statistics and locking
+    are handled here.
+    """
+
+    maxsize: int | None = None
+    # Whether the cache holds the instantiations (and their template
+    # arguments) weakly : then, nothing else may hold them strongly.
+    weak: bool = False
+
+    def __init__(self) -> None :
+        self._hits = 0
+        self._misses = 0
+        self._lock = Lock()
+        # Called with the key of every entry dropped by the cache.
+        self._on_evict = None
+
+    # ---- Subclasses' interface :
+
+    def _get(self, key: Hashable, touch: bool = True) -> Any :
+        raise NotImplementedError
+
+    def _put(self, key: Hashable, value: Any) -> None :
+        raise NotImplementedError
+
+    def _pop(self, key: Hashable) -> Any :
+        raise NotImplementedError
+
+    def _clear(self) -> None :
+        raise NotImplementedError
+
+    def __len__(self) -> int :
+        raise NotImplementedError
+
+    def __iter__(self) -> Iterator[Hashable] :
+        raise NotImplementedError
+
+    def _evicted(self, key: Hashable) -> None :
+        if self._on_evict is not None :
+            self._on_evict(key)
+
+    # ---- Public interface :
+
+    def __contains__(self, key: Hashable) -> bool :
+        with self._lock :
+            return self._get(key, touch=False) is not _MISSING
+
+    def peek(self, key: Hashable, default: Any = None) -> Any :
+        """Like 'get', but neither the statistics nor the eviction order change."""
+        with self._lock :
+            value = self._get(key, touch=False)
+            return default if value is _MISSING else value
+
+    def get(self, key: Hashable, default: Any = None) -> Any :
+        with self._lock :
+            value = self._get(key)
+            if value is _MISSING :
+                self._misses += 1
+                return default
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None :
+        with self._lock :
+            self._put(key, value)
+
+    def discard(self, key: Hashable) -> None :
+        """Drops the instantiation memoized under 'key', if any."""
+        with self._lock :
+            if self._pop(key) is not _MISSING :
+                self._evicted(key)
+
+    def clear(self) -> None :
+        with self._lock :
+            for key in list(self) :
+                self._evicted(key)
+            self._clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self) -> CacheInfo :
+        with self._lock :
+            return CacheInfo(self._hits, self._misses, self.maxsize, len(self))
+
+
+class UnboundedCache(InstantiationCache) :
+
+    """Keeps every instantiation built."""
+
+    def __init__(self) -> None :
+        super().__init__()
+        self._entries = {}
+
+    def _get(self, key, touch=True) :
+        return self._entries.get(key, _MISSING)
+
+    def _put(self, key, value) :
+        self._entries[key] = value
+
+    def _pop(self, key) :
+        return self._entries.pop(key, _MISSING)
+
+    def _clear(self) :
+        self._entries.clear()
+
+    def __len__(self) :
+        return len(self._entries)
+
+    def __iter__(self) :
+        return iter(list(self._entries))
+
+
+class LRUCache(InstantiationCache) :
+
+    """Keeps the 'maxsize' most recently used instantiations."""
+
+    def __init__(self, maxsize: int = 128) -> None :
+        if maxsize < 1 :
+            raise ValueError("'maxsize' must be at least 1.")
+
+        super().__init__()
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None) :
+        # Inlined version of 'InstantiationCache.get', as it's on the fast path
+        # of 'CallableTemplate.__getitem__'.
+        with self._lock :
+            try :
+                value = self._entries[key]
+            except KeyError :
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def _get(self, key, touch=True) :
+        value = self._entries.get(key, _MISSING)
+        if touch and value is not _MISSING :
+            self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key, value) :
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize :
+            self._evicted(self._entries.popitem(last=False)[0])
+
+    def _pop(self, key) :
+        return self._entries.pop(key, _MISSING)
+
+    def _clear(self) :
+        self._entries.clear()
+
+    def __len__(self) :
+        return len(self._entries)
+
+    def __iter__(self) :
+        return iter(list(self._entries))
+
+
+class TTLCache(InstantiationCache) :
+
+    """
+    Keeps instantiations for 'ttl' seconds after they were built.
+    When 'maxsize' is given, the oldest instantiations are evicted first.
+    """
+
+    def __init__(self, ttl: float, maxsize: int | None = None) -> None :
+        if ttl <= 0 :
+            raise ValueError("'ttl' must be positive.")
+        if maxsize is not None and maxsize < 1 :
+            raise ValueError("'maxsize' must be at least 1.")
+
+        super().__init__()
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # Values are '(expiration_time, instantiation)', ordered by insertion,
+        # hence by expiration time.
+        self._entries = OrderedDict()
+
+    def _expire(self, now: float) -> None :
+        entries = self._entries
+        while entries :
+            expiration, _ = next(iter(entries.values()))
+            if expiration > now :
+                break
+            self._evicted(entries.popitem(last=False)[0])
+
+    def _get(self, key, touch=True) :
+        self._expire(monotonic())
+        entry = self._entries.get(key)
+        return _MISSING if entry is None else entry[1]
+
+    def _put(self, key, value) :
+        now = monotonic()
+        self._expire(now)
+        self._entries.pop(key, None)
+        self._entries[key] = (now + self.ttl, value)
+        if self.maxsize is not None and len(self._entries) > self.maxsize :
+            self._evicted(self._entries.popitem(last=False)[0])
+
+    def _pop(self, key) :
+        entry = self._entries.pop(key, None)
+        return _MISSING if entry is None else entry[1]
+
+    def _clear(self) :
+        self._entries.clear()
+
+    def __len__(self) :
+        self._expire(monotonic())
+        return len(self._entries)
+
+    def __iter__(self) :
+        self._expire(monotonic())
+        return iter(list(self._entries))
+
+
+class MemoryBudget :
+
+    """
+    Memory budget, in bytes, shared by every 'MemoryBudgetCache' created with
+    it. When the instantiations held by all those caches exceed the budget,
+    the least recently used ones are evicted, whatever template they belong to.
+    """
+
+    def __init__(self, budget: int) -> None :
+        if budget < 1 :
+            raise ValueError("'budget' must be at least 1 byte.")
+
+        self.budget = budget
+        self._used = 0
+        self._lock = RLock()
+        # '(cache_id, key) -> size', ordered from least to most recently used.
+        self._entries = OrderedDict()
+        self._caches = {}
+
+    @property
+    def used(self) -> int :
+        return self._used
+
+    def _register(self, cache: MemoryBudgetCache) -> None :
+        with self._lock :
+            self._caches[id(cache)] = ref(cache)
+        finalize(cache, self._release_cache, id(cache))
+
+    def _release_cache(self, cache_id: int) -> None :
+        with self._lock :
+            for entry in [e for e in self._entries if e[0] == cache_id] :
+                self._used -= self._entries.pop(entry)
+            self._caches.pop(cache_id, None)
+
+    def _touch(self, cache_id: int, key: Hashable) -> None :
+        with self._lock :
+            self._entries.move_to_end((cache_id, key))
+
+    def _charge(self, cache_id: int, key: Hashable, size: int) -> None :
+        with self._lock :
+            self._discharge(cache_id, key)
+            self._entries[(cache_id, key)] = size
+            self._used += size
+            while self._used > self.budget and len(self._entries) > 1 :
+                (evicted_id, evicted_key), evicted_size = (
+                    self._entries.popitem(last=False)
+                )
+                self._used -= evicted_size
+                evicted_cache = self._caches[evicted_id]()
+                if evicted_cache is not None :
+                    del evicted_cache._entries[evicted_key]
+                    evicted_cache._evicted(evicted_key)
+
+    def _discharge(self, cache_id: int, key: Hashable) -> None :
+        with self._lock :
+            self._used -= self._entries.pop((cache_id, key), 0)
+
+
+class MemoryBudgetCache(InstantiationCache) :
+
+    """Keeps instantiations as long as the shared 'MemoryBudget' allows it."""
+
+    def __init__(self, budget: MemoryBudget) -> None :
+        super().__init__()
+        self.budget = budget
+        self._entries = {}
+        # Evictions are decided by the budget, hence its lock must be shared.
+        self._lock = budget._lock
+        budget._register(self)
+
+    def _get(self, key, touch=True) :
+        value = self._entries.get(key, _MISSING)
+        if touch and value is not _MISSING :
+            self.budget._touch(id(self), key)
+        return value
+
+    def _put(self, key, value) :
+        self._entries[key] = value
+        self.budget._charge(id(self), key, approximate_size(value))
+
+    def _pop(self, key) :
+        value = self._entries.pop(key, _MISSING)
+        if value is not _MISSING :
+            self.budget._discharge(id(self), key)
+        return value
+
+    def _clear(self) :
+        for key in list(self._entries) :
+            self.budget._discharge(id(self), key)
+        self._entries.clear()
+
+    def __len__(self) :
+        return len(self._entries)
+
+    def __iter__(self) :
+        return iter(list(self._entries))
+
+
+class WeakCache(InstantiationCache) :
+
+    """
+    Keeps instantiations as long as they are used elsewhere, and as long as
+    their template arguments are alive.
+    Template arguments supporting weak references (classes, most objects) and
+    the instantiations are held weakly. Thus, a class created at runtime and
+    used as a template argument can be garbage collected once its
+    instantiations are released.
+    """
+
+    weak = True
+
+    def __init__(self) -> None :
+        super().__init__()
+        # 'weak_key -> ref(instantiation)'
+        self._entries = {}
+        # '(weak_key, ref(instantiation))' of the entries whose instantiation
+        # or template arguments died. They are dropped later, under the lock,
+        # as the garbage collector may run at any time.
+        self._pending = []
+
+    @staticmethod
+    def _weakKey(key: tuple, callback=None) -> tuple :
+        # Of the class of 'key', which might compare the types of the arguments.
+        return key.__class__(
+            ref(arg, callback) if type(arg).__weakrefoffset__ else arg
+            for arg in key
+        )
+
+    def _purge(self) -> None :
+        pending = self._pending
+        while pending :
+            weak_key, value_ref = pending.pop()
+            if self._entries.get(weak_key) is value_ref :
+                del self._entries[weak_key]
+                self._evicted(weak_key)
+
+    def _get(self, key, touch=True) :
+        self._purge()
+        value_ref = self._entries.get(self._weakKey(key))
+        if value_ref is None :
+            return _MISSING
+        value = value_ref()
+        return _MISSING if value is None else value
+
+    def _put(self, key, value) :
+        self._purge()
+        pending = self._pending
+        entry = []
+
+        def died(_) :
+            pending.append(tuple(entry))
+
+        weak_key = self._weakKey(key, died)
+        try :
+            value_ref = ref(value, died)
+        except TypeError :
+            # Held strongly.
+            value_ref = lambda : value
+        entry += (weak_key, value_ref)
+        self._entries[weak_key] = value_ref
+
+    def _pop(self, key) :
+        self._purge()
+        value_ref = self._entries.pop(self._weakKey(key), None)
+        if value_ref is None :
+            return _MISSING
+        value = value_ref()
+        return _MISSING if value is None else value
+
+    def _clear(self) :
+        self._entries.clear()
+        self._pending.clear()
+
+    def __len__(self) :
+        self._purge()
+        return len(self._entries)
+
+    def __iter__(self) :
+        self._purge()
+        return iter(list(self._entries))
@@ -0,0 +1,226 @@
+# ********************************* Imports ************************************
+from __future__ import annotations
+
+"Standard Library :"
+import sys
+
+from threading import Lock, local
+from time import perf_counter
+from types import FunctionType
+#To annotate :
+from types import CodeType
+from collections.abc import Callable, Iterator
+
+"Local Library :"
+import registry
+
+from callable_template import CallableTemplate, _classMembers, _namedCode
+
+
+# ******************************** Constants ***********************************
+
+__all__ = ("enable", "disable", "is_enabled", "reset", "top")
+
+# Tool identifiers tried in turn : the unassigned ones, as 'cProfile' uses
+# 'PROFILER_ID' (2) since 3.12 and fails if it is taken.
+_TOOL_IDS = (3, 4)
+_TOOL_NAME = "template-profiling"
+
+# 'id(code) -> profile' of the instantiations (and of the methods of the
+# class instantiations) profiled. Code objects are compared by value, thus by
+# identity here : the profiles keep them alive.
+_PROFILES: dict[int, _CallProfile] = {}
+# Start times of the calls running in each thread : the calls of the code
+# objects monitored start (or resume, or are thrown into) and stop (return,
+# yield or raise) in a last in, first out order.
+_running = local()
+_LOCK = Lock()
+_tool_id: int | None = None
+
+
+# ********************************* Classes ************************************
+
+class _CallProfile :
+
+    """
+    Calls of an instantiation (of the methods of a class instantiation), and
+    the wall time spent in them.
+    """
+
+    __slots__ = ("name", "declaration", "arguments", "codes", "calls", "time")
+
+    def __init__(self, cb_template: CallableTemplate, build_args: tuple) -> None :
+        self.name = cb_template._name
+        self.declaration = registry.declaration(cb_template)
+        self.arguments = registry._argsRepr(cb_template, build_args)
+        self.codes = []
+        self.calls = 0
+        self.time = 0.0
+
+
+# ******************************** Functions ***********************************
+
+def _functions(instantiation: Callable) -> Iterator[FunctionType] :
+    """Functions whose calls are the ones of 'instantiation'."""
+    if isinstance(instantiation, FunctionType) :
+        yield instantiation
+    elif isinstance(instantiation, type) :
+        for member in _classMembers(instantiation) :
+            if isinstance(member, FunctionType) :
+                yield member
+
+def _instrument(cb_template: CallableTemplate, build_args: tuple, instantiation: Callable) -> None :
+    events = sys.monitoring.events
+    local_events = (
+        events.PY_START | events.PY_RESUME | events.PY_RETURN | events.PY_YIELD
+    )
+    profile = None
+    for func in _functions(instantiation) :
+        if id(func.__code__) not in _PROFILES :
+            if profile is None :
+                profile = _CallProfile(cb_template, build_args)
+            # The instantiations of a template share their code objects : each
+            # one gets its own, so that their calls can be told apart, named
+            # after its template arguments for the other profilers.
+            func.__code__ = _namedCode(func)
+            profile.codes.append(func.__code__)
+            with _LOCK :
+                _PROFILES[id(func.__code__)] = profile
+        sys.monitoring.set_local_events(_tool_id, func.__code__, local_events)
+
+# ---- Callbacks of 'sys.monitoring' :
+
+def _startTimes() -> list[float] :
+    try :
+        return _running.starts
+    except AttributeError :
+        _running.starts = []
+        return _running.starts
+
+def _started(code: CodeType, instruction_offset: int) -> None :
+    _PROFILES[id(code)].calls += 1
+    _startTimes().append(perf_counter())
+
+def _resumed(code: CodeType, instruction_offset: int) -> None :
+    _startTimes().append(perf_counter())
+
+def _thrown(code: CodeType, instruction_offset: int, exception: BaseException) -> None :
+    # 'gen.throw()', 'gen.close()' and the cancellation of a coroutine resume
+    # it, without 'PY_RESUME'. 'PY_THROW' can only be monitored globally.
+    if id(code) in _PROFILES :
+        _startTimes().append(perf_counter())
+
+def _stopped(code: CodeType, instruction_offset: int, value: object) -> None :
+    # Returned, yielded or raised.
+    end = perf_counter()
+    starts = _startTimes()
+    if starts :
+        # Otherwise, the call started before profiling did.
+        _PROFILES[id(code)].time += end - starts.pop()
+
+def _unwound(code: CodeType, instruction_offset: int, exception: BaseException) -> None :
+    # 'PY_UNWIND' can only be monitored globally.
+    if id(code) in _PROFILES :
+        _stopped(code, instruction_offset, exception)
+
+# ---- Public interface :
+
+def enable() -> None :
+    """
+    Profiles the calls of the instantiations of callable templates, including
+    the ones already built : their number and the wall time spent in them,
+    per template and template arguments (see 'top').
+    Built on 'sys.monitoring' (PEP 669) : only the instantiations are
+    monitored, and nothing is left once disabled.
+    """
+
+    global _tool_id
+    if _tool_id is not None :
+        return
+    if not hasattr(sys, "monitoring") :
+        raise RuntimeError("Profiling needs 'sys.monitoring' (Python 3.12+).")
+
+    for tool_id in _TOOL_IDS :
+        if sys.monitoring.get_tool(tool_id) is None :
+            break
+    else :
+        raise RuntimeError("No 'sys.monitoring' tool identifier is free.")
+
+    events = sys.monitoring.events
+    sys.monitoring.use_tool_id(tool_id, _TOOL_NAME)
+    for event, callback in (
+        (events.PY_START, _started),
+        (events.PY_RESUME, _resumed),
+        (events.PY_RETURN, _stopped),
+        (events.PY_YIELD, _stopped),
+        (events.PY_UNWIND, _unwound),
+        (events.PY_THROW, _thrown),
+    ) :
+        sys.monitoring.register_callback(tool_id, event, callback)
+    sys.monitoring.set_events(tool_id, events.PY_UNWIND | events.PY_THROW)
+    _tool_id = tool_id
+
+    for cb_template in registry.templates() :
+        cache = cb_template._cache
+        for key in list(cache) :
+            instantiation = cache.peek(key)
+            if instantiation is not None and not isinstance(instantiation, CallableTemplate) :
+                _instrument(cb_template, key, instantiation)
+    CallableTemplate._on_built = _instrument
+
+def disable() -> None :
+    """Stops profiling. The profiles are kept until 'reset'."""
+
+    global _tool_id
+    if _tool_id is None :
+        return
+
+    CallableTemplate._on_built = None
+    with _LOCK :
+        profiles = dict.fromkeys(_PROFILES.values())
+    for profile in profiles :
+        for code in profile.codes :
+            sys.monitoring.set_local_events(_tool_id, code, 0)
+    sys.monitoring.set_events(_tool_id, 0)
+    sys.monitoring.free_tool_id(_tool_id)
+    _tool_id = None
+
+def is_enabled() -> bool :
+    return _tool_id is not None
+
+def reset() -> None :
+    """
+    Sets the calls and the time of the profiles back to zero. Once disabled,
+    forgets the profiles.
+    """
+    with _LOCK :
+        if _tool_id is None :
+            _PROFILES.clear()
+        else :
+            for profile in _PROFILES.values() :
+                profile.calls = 0
+                profile.time = 0.0
+
+def top(n: int | None = 10, sort_by: str = "time") -> list[dict] :
+    """
+    The 'n' instantiations called the most ('sort_by="calls"') or in which
+    the most time (in seconds) was spent ('sort_by="time"').
+    """
+
+    with _LOCK :
+        profiles = list(dict.fromkeys(_PROFILES.values()))
+    entries = [
+        {
+            "template": profile.name,
+            "module": getattr(profile.declaration, "module", None),
+            "line": getattr(profile.declaration, "line", None),
+            "arguments": profile.arguments,
+            "calls": profile.calls,
+            "time": profile.time,
+            "time_per_call": profile.time / profile.calls if profile.calls else 0.0,
+        }
+        for profile in profiles
+        if profile.calls
+    ]
+    entries.sort(key=lambda entry : entry[sort_by], reverse=True)
+    return entries[:n]
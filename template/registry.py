@@ -0,0 +1,111 @@
+# ********************************* Imports ************************************
+from __future__ import annotations
+
+"Standard Library :"
+import json
+
+from threading import Lock
+from weakref import WeakKeyDictionary
+#To annotate :
+from typing import Any, IO, NamedTuple
+
+"Local Library :"
+from instantiation_cache import approximate_size
+#To annotate :
+from callable_template import CallableTemplate
+
+
+# ******************************** Constants ***********************************
+
+__all__ = ("Declaration", "register", "declaration", "templates", "report", "dump")
+
+# 'callable template -> declaration', for every template declared (and still
+# alive) in the process.
+_TEMPLATES: WeakKeyDictionary[CallableTemplate, Declaration] = WeakKeyDictionary()
+_LOCK = Lock()
+
+
+# ********************************* Classes ************************************
+
+class Declaration(NamedTuple) :
+    """Where a callable template was declared."""
+    module: str | None
+    filename: str | None
+    line: int | None
+
+
+# ******************************** Functions ***********************************
+
+def register(cb_template: CallableTemplate, declaration: Declaration) -> None :
+    """Called by 'template' with each callable template it declares."""
+    with _LOCK :
+        _TEMPLATES[cb_template] = declaration
+
+def declaration(cb_template: CallableTemplate) -> Declaration | None :
+    """Where 'cb_template' was declared, if it was declared by 'template'."""
+    with _LOCK :
+        return _TEMPLATES.get(cb_template)
+
+def templates() -> dict[CallableTemplate, Declaration] :
+    """Callable templates declared so far, and where they were declared."""
+    with _LOCK :
+        return dict(_TEMPLATES)
+
+def _argsRepr(cb_template: CallableTemplate, key: Any) -> str :
+    if isinstance(key, tuple) and len(key) == len(cb_template._param_names) :
+        # As in the qualified names of the instantiations : "N=5, T=int".
+        return cb_template._argumentsSuffix(key)[1:-1]
+    return repr(key)
+
+def _templateReport(cb_template: CallableTemplate, declaration: Declaration) -> dict :
+    stats = cb_template._stats
+    cache = cb_template._cache
+    cache_info = cache.info()
+    keys = list(cache)
+    memory = sum(approximate_size(cache.peek(key)) for key in keys)
+
+    return {
+        "name": cb_template._name,
+        "module": declaration.module,
+        "filename": declaration.filename,
+        "line": declaration.line,
+        "parameters": list(cb_template._param_names),
+        "instantiations": len(keys),
+        "builds": stats.builds,
+        "hits": cache_info.hits,
+        "misses": cache_info.misses,
+        "memory": memory,
+        "declaration_time": stats.declaration,
+        "parse_time": stats.parse,
+        "compile_time": stats.compile,
+        "exec_time": stats.exec,
+        "build_times": {
+            _argsRepr(cb_template, key): build_time._asdict()
+            for key, build_time in list(stats.build_times.items())
+        },
+    }
+
+def report(sort_by: str | None = None) -> list[dict] :
+    """
+    One dict per callable template declared : where it was declared, how many
+    instantiations its cache holds and the approximate memory they hold (in
+    bytes), the cache statistics, and the time (in seconds) spent declaring
+    it, parsing, compiling and executing its declaration in total and per
+    memoized instantiation ('build_times').
+    Sorted by decreasing 'sort_by' (e.g. "compile_time"), if given.
+    """
+
+    entries = [
+        _templateReport(cb_template, declaration)
+        for cb_template, declaration in templates().items()
+    ]
+    if sort_by is not None :
+        entries.sort(key=lambda entry : entry[sort_by], reverse=True)
+    return entries
+
+def dump(file: IO[str] | None = None, sort_by: str | None = None) -> str :
+    """'report' as JSON, also written to 'file' if given."""
+    dumped = json.dumps(report(sort_by), indent=2)
+    if file is not None :
+        file.write(dumped)
+    return dumped
@@ -0,0 +1,637 @@
+# ********************************* Imports ************************************
+from __future__ import annotations
+
+"Standard Library :"
+import ast
+import builtins
+import operator
+#To annotate :
+from typing import Any
+
+
+# ******************************** Constants ***********************************
+
+__all__ = ("specialize")
+
+# 'for _ in range(N)' loops are unrolled up to that many iterations.
+MAX_UNROLL = 8
+
+# Builtins without side effects, which can be called at specialization time.
+_PURE_BUILTINS = frozenset((
+    abs, all, any, bool, callable, float, int, isinstance, issubclass,
+    max, min, tuple,
+))
+# Those iterate over their arguments : they are only called on literals.
+_ITERATING_BUILTINS = frozenset((all, any, max, min, tuple))
+
+_LITERAL_TYPES = (int, float, complex, str, bytes, bool, type(None))
+
+# Folding must not blow up the size of the code.
+_MAX_LITERAL_LEN = 256
+
+_MISSING = object()
+
+
+# ********************************** Utils *************************************
+
+def _isLiteral(value: Any) -> bool :
+    """Whether 'value' can be written as a constant in the code."""
+
+    value_type = type(value)
+    if value_type in (str, bytes) :
+        return len(value) <= _MAX_LITERAL_LEN
+    if value_type is int :
+        return value.bit_length() <= _MAX_LITERAL_LEN
+    if value_type in _LITERAL_TYPES :
+        return True
+    if value_type is tuple :
+        return len(value) <= _MAX_LITERAL_LEN and all(map(_isLiteral, value))
+    return False
+
+
+def _isBounded(op, left: Any, right: Any) -> bool :
+    """
+    Whether 'op(left, right)' is small enough to be folded, checked before
+    evaluating it (as CPython's AST optimizer does) : a multiplication, a
+    power or a shift of literals can take unbounded time and memory.
+    """
+
+    if op is operator.mul :
+        for sequence, count in ((left, right), (right, left)) :
+            if isinstance(sequence, (str, bytes, tuple, list)) and isinstance(count, int) :
+                return count <= 0 or len(sequence) * count <= _MAX_LITERAL_LEN
+        if isinstance(left, int) and isinstance(right, int) :
+            return left.bit_length() + right.bit_length() <= _MAX_LITERAL_LEN
+    elif op is operator.pow :
+        if isinstance(left, int) and isinstance(right, int) :
+            return right < 0 or left.bit_length() * right <= _MAX_LITERAL_LEN
+    elif op is operator.lshift :
+        if isinstance(left, int) and isinstance(right, int) :
+            return right < 0 or left.bit_length() + right <= _MAX_LITERAL_LEN
+    elif op is operator.mod :
+        # printf-style formatting ('"%*d" % (N, 0)').
+        return not isinstance(left, (str, bytes))
+    return True
+
+
+def _boundNames(scope: ast.AST, in_comprehensions: bool = True) -> set[str] :
+    """
+    Names bound in the local scope of 'scope' (a function, a lambda or a class
+    body), without looking into the nested scopes.
+    With 'in_comprehensions', the result is conservative : the targets of the
+    comprehensions are reported as bound as well.
+    """
+
+    bound = set()
+    declared_global = set()
+    # The targets of the comprehensions, when they are skipped.
+    skipped = set()
+
+    if isinstance(scope, ast.FunctionDef | ast.AsyncFunctionDef | ast.Lambda) :
+        args = scope.args
+        for arg in (
+            *args.posonlyargs, *args.args, *args.kwonlyargs,
+            args.vararg, args.kwarg,
+        ) :
+            if arg is not None :
+                bound.add(arg.arg)
+
+    body = scope.body if isinstance(scope.body, list) else [scope.body]
+    to_visit = list(body)
+    while to_visit :
+        node = to_visit.pop()
+
+        if isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef) :
+            # Only the name is bound in this scope, the rest belongs to the
+            # nested scope (except decorators, defaults, bases, ...).
+            bound.add(node.name)
+            to_visit.extend(node.decorator_list)
+            if isinstance(node, ast.ClassDef) :
+                to_visit.extend(node.bases)
+                to_visit.extend(node.keywords)
+            else :
+                to_visit.extend(node.args.defaults)
+                to_visit.extend(d for d in node.args.kw_defaults if d)
+            continue
+        if isinstance(node, ast.Lambda) :
+            to_visit.extend(node.args.defaults)
+            to_visit.extend(d for d in node.args.kw_defaults if d)
+            continue
+
+        if isinstance(node, ast.comprehension) and not in_comprehensions :
+            skipped.update(map(id, ast.walk(node.target)))
+        elif (
+            isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load)
+            and id(node) not in skipped
+        ) :
+            bound.add(node.id)
+        elif isinstance(node, ast.alias) :
+            bound.add((node.asname or node.name).partition('.')[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name :
+            bound.add(node.name)
+        elif isinstance(node, ast.MatchAs | ast.MatchStar) and node.name :
+            bound.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest :
+            bound.add(node.rest)
+        elif isinstance(node, ast.Global | ast.Nonlocal) :
+            declared_global.update(node.names)
+
+        to_visit.extend(ast.iter_child_nodes(node))
+
+    return bound - declared_global
+
+
+def _scopeSummary(scope: ast.AST) -> tuple[set[str], dict[str, type], bool] :
+    """
+    What removing statements from the local scope of 'scope' might change :
+    the names bound (outside comprehensions), the names declared 'global' or
+    'nonlocal' (with the type of their declaration), and whether it contains
+    a 'yield'.
+    """
+
+    declared = {}
+    yields = False
+
+    to_visit = list(scope.body) if isinstance(scope.body, list) else [scope.body]
+    while to_visit :
+        node = to_visit.pop()
+        if isinstance(node, (
+            ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda,
+        )) :
+            # 'yield' in decorators and defaults is an error in a function.
+            continue
+        if isinstance(node, ast.Global | ast.Nonlocal) :
+            declared.update(dict.fromkeys(node.names, type(node)))
+        elif isinstance(node, ast.Yield | ast.YieldFrom) :
+            yields = True
+        to_visit.extend(ast.iter_child_nodes(node))
+
+    return _boundNames(scope, in_comprehensions=False), declared, yields
+
+
+def _keepScope(
+    scope: ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef,
+    summary: tuple[set[str], dict[str, type], bool],
+) -> None :
+    """
+    Adds an unreachable block to 'scope' when removing dead code changed its
+    summary (see '_scopeSummary') : a function stays a generator, and its
+    names stay local (or global) even if they are bound only in dead code.
+    """
+
+    bound, declared, yields = _scopeSummary(scope)
+    stubs = []
+    for declaration in (ast.Global, ast.Nonlocal) :
+        names = sorted(
+            name for name, kind in summary[1].items()
+            if kind is declaration and name not in declared
+        )
+        if names :
+            stubs.append(declaration(names))
+    for name in sorted(summary[0] - bound) :
+        stubs.append(ast.Assign(
+            targets=[ast.Name(name, ast.Store())], value=ast.Constant(None),
+        ))
+    if summary[2] and not yields :
+        stubs.append(ast.Expr(ast.Yield()))
+    if not stubs :
+        return
+
+    # 'if False : ...' isn't compiled, but the compiler sees its names.
+    stub = ast.If(test=ast.Constant(False), body=stubs, orelse=[])
+    has_docstring = (
+        scope.body and isinstance(scope.body[0], ast.Expr)
+        and isinstance(scope.body[0].value, ast.Constant)
+        and isinstance(scope.body[0].value.value, str)
+    )
+    scope.body.insert(1 if has_docstring else 0, stub)
+
+
+def _breaksLoop(body: list[ast.stmt]) -> bool :
+    """Whether 'body' contains a 'break' or 'continue' of the current loop."""
+
+    to_visit = list(body)
+    while to_visit :
+        node = to_visit.pop()
+        if isinstance(node, ast.Break | ast.Continue) :
+            return True
+        if isinstance(node, (
+            ast.For, ast.AsyncFor, ast.While,
+            ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda,
+        )) :
+            # 'break'/'continue' in those belong to another loop (or none).
+            # However, the 'else' clause of a nested loop belongs to this one.
+            if isinstance(node, ast.For | ast.AsyncFor | ast.While) :
+                to_visit.extend(node.orelse)
+            continue
+        to_visit.extend(ast.iter_child_nodes(node))
+    return False
+
+
+def _copyTree(node: ast.AST) -> ast.AST :
+    """Faster 'copy.deepcopy' for ASTs."""
+
+    if isinstance(node, ast.AST) :
+        copy = node.__class__.__new__(node.__class__)
+        for name, value in node.__dict__.items() :
+            if isinstance(value, list) :
+                value = [_copyTree(v) for v in value]
+            elif isinstance(value, ast.AST) :
+                value = _copyTree(value)
+            setattr(copy, name, value)
+        return copy
+    return node
+
+
+def _fillEmptyBodies(tree: ast.AST) -> None :
+    """Removing dead branches might leave blocks without any statement."""
+
+    for node in ast.walk(tree) :
+        body = getattr(node, "body", None)
+        if isinstance(body, list) and not body :
+            node.body = [ast.Pass()]
+
+
+# ********************************* Classes ************************************
+
+class _Specializer(ast.NodeTransformer) :
+
+    """
+    Substitutes the template arguments that can be written as constants,
+    folds the constant expressions and removes the dead branches.
+
+    Template arguments that can't be written as constants (like types) are
+    still looked up at runtime, but their values are known while
+    specializing; thus, expressions like 'T is int' are folded as well.
+    """
+
+    def __init__(
+        self,
+        template_args: dict[str, Any],
+        module_globals: dict[str, Any],
+        max_unroll: int,
+    ) -> None :
+        self._max_unroll = max_unroll
+        # Template arguments visible in the current scope.
+        self._args = template_args
+        # Template arguments visible in the nearest function scope.
+        # (Class bodies don't enclose the methods they define.)
+        self._function_args = template_args
+        # Names that can't be resolved as builtins in the current scope.
+        self._shadowed = set(module_globals) | set(template_args)
+        self._function_shadowed = self._shadowed
+        # Number of times dead code was removed.
+        self._removals = 0
+
+    # ---- Values known at specialization time :
+
+    def _known(self, node: ast.AST) -> Any :
+        if isinstance(node, ast.Constant) :
+            return node.value
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) :
+            if node.id in self._args :
+                return self._args[node.id]
+            if node.id not in self._shadowed :
+                return getattr(builtins, node.id, _MISSING)
+        return _MISSING
+
+    def _fold(self, node: ast.expr, evaluate) -> ast.expr :
+        try :
+            value = evaluate()
+        except Exception :
+            return node
+        if value is _MISSING or not _isLiteral(value) :
+            return node
+        return ast.copy_location(ast.Constant(value), node)
+
+    # ---- Scopes :
+
+    def _visitScope(self, node: ast.AST, is_function: bool) -> ast.AST :
+        removals = self._removals
+        summary = _scopeSummary(node)
+        # Unreachable statements can't be added to a lambda : it is restored
+        # if removing dead code changes its summary.
+        original = _copyTree(node) if isinstance(node, ast.Lambda) else None
+
+        outer = (
+            self._args, self._function_args,
+            self._shadowed, self._function_shadowed,
+        )
+
+        bound = _boundNames(node)
+        if is_function :
+            # Methods don't see the class body, only the enclosing function.
+            args, shadowed = self._function_args, self._function_shadowed
+        else :
+            args, shadowed = self._args, self._shadowed
+        self._args = {k: v for k, v in args.items() if k not in bound}
+        self._shadowed = shadowed | bound
+        if is_function :
+            self._function_args = self._args
+            self._function_shadowed = self._shadowed
+
+        try :
+            if isinstance(node, ast.Lambda) :
+                node.body = self.visit(node.body)
+            else :
+                node.body = self._visitStatements(node.body)
+        finally :
+            (
+                self._args, self._function_args,
+                self._shadowed, self._function_shadowed,
+            ) = outer
+
+        if self._removals == removals :
+            return node
+        if original is not None :
+            return node if _scopeSummary(node) == summary else original
+        _keepScope(node, summary)
+        return node
+
+    def _visitStatements(self, stmts: list[ast.stmt]) -> list[ast.stmt] :
+        result = []
+        for stmt in stmts :
+            new = self.visit(stmt)
+            if new is None :
+                continue
+            if isinstance(new, list) :
+                result.extend(new)
+            else :
+                result.append(new)
+        return result
+
+    def _visitOutside(self, node: ast.AST, fields: tuple[str, ...]) -> None :
+        """Visits the parts of a definition evaluated in the enclosing scope."""
+        for field in fields :
+            value = getattr(node, field)
+            if isinstance(value, list) :
+                setattr(node, field, [
+                    self.visit(v) if v is not None else None for v in value
+                ])
+            elif value is not None :
+                setattr(node, field, self.visit(value))
+
+    def visit_FunctionDef(self, node) :
+        self._visitOutside(node, ("decorator_list", "returns"))
+        self._visitOutside(node.args, ("defaults", "kw_defaults"))
+        for arg in (
+            *node.args.posonlyargs, *node.args.args, *node.args.kwonlyargs,
+            node.args.vararg, node.args.kwarg,
+        ) :
+            if arg is not None :
+                self._visitOutside(arg, ("annotation",))
+        return self._visitScope(node, is_function=True)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node) :
+        self._visitOutside(node.args, ("defaults", "kw_defaults"))
+        return self._visitScope(node, is_function=True)
+
+    def visit_ClassDef(self, node) :
+        self._visitOutside(node, ("decorator_list", "bases", "keywords"))
+        return self._visitScope(node, is_function=False)
+
+    # ---- Substitution and folding :
+
+    def visit_Name(self, node) :
+        if isinstance(node.ctx, ast.Load) and node.id in self._args :
+            value = self._args[node.id]
+            if _isLiteral(value) :
+                return ast.copy_location(ast.Constant(value), node)
+        return node
+
+    def visit_UnaryOp(self, node) :
+        self.generic_visit(node)
+        operand = self._known(node.operand)
+        if operand is _MISSING :
+            return node
+        op = _UNARY_OPS[type(node.op)]
+        return self._fold(node, lambda : op(operand))
+
+    def visit_BinOp(self, node) :
+        self.generic_visit(node)
+        left, right = self._known(node.left), self._known(node.right)
+        if left is _MISSING or right is _MISSING :
+            return node
+        op = _BINARY_OPS[type(node.op)]
+        if not _isBounded(op, left, right) :
+            return node
+        return self._fold(node, lambda : op(left, right))
+
+    def visit_BoolOp(self, node) :
+        self.generic_visit(node)
+        is_and = isinstance(node.op, ast.And)
+
+        values = []
+        for value_node in node.values :
+            value = self._known(value_node)
+            if value is not _MISSING and not values :
+                if bool(value) is not is_and :
+                    # Short-circuits : the following operands are dead.
+                    self._removals += 1
+                    return self._fold(node, lambda : value)
+                # Doesn't determine the result : can be dropped.
+                continue
+            values.append(value_node)
+
+        if not values :
+            last = self._known(node.values[-1])
+            return self._fold(node, lambda : last)
+        if len(values) == 1 :
+            return values[0]
+        node.values = values
+        return node
+
+    def visit_Compare(self, node) :
+        self.generic_visit(node)
+        operands = [self._known(n) for n in (node.left, *node.comparators)]
+        if any(operand is _MISSING for operand in operands) :
+            return node
+
+        def evaluate() :
+            for op, left, right in zip(node.ops, operands, operands[1:]) :
+                if not _COMPARE_OPS[type(op)](left, right) :
+                    return False
+            return True
+
+        return self._fold(node, evaluate)
+
+    def visit_IfExp(self, node) :
+        self.generic_visit(node)
+        test = self._known(node.test)
+        if test is _MISSING :
+            return node
+        try :
+            branch = node.body if test else node.orelse
+        except Exception :
+            return node
+        self._removals += 1
+        return branch
+
+    def visit_Call(self, node) :
+        self.generic_visit(node)
+        func = self._known(node.func)
+        if func is _MISSING or node.keywords :
+            return node
+        try :
+            if func not in _PURE_BUILTINS :
+                return node
+        except TypeError :
+            return node
+        args = [self._known(a) for a in node.args]
+        if any(a is _MISSING for a in args) :
+            return node
+        if func in _ITERATING_BUILTINS and not all(map(_isLiteral, args)) :
+            return node
+        return self._fold(node, lambda : func(*args))
+
+    def visit_Subscript(self, node) :
+        self.generic_visit(node)
+        if not isinstance(node.ctx, ast.Load) :
+            return node
+        value, index = self._known(node.value), self._known(node.slice)
+        if value is _MISSING or index is _MISSING :
+            return node
+        return self._fold(node, lambda : value[index])
+
+    # ---- Dead branches and loops :
+
+    def visit_If(self, node) :
+        node.test = self.visit(node.test)
+        test = self._known(node.test)
+        if test is _MISSING :
+            node.body = self._visitStatements(node.body)
+            node.orelse = self._visitStatements(node.orelse)
+            return node
+        try :
+            branch = node.body if test else node.orelse
+        except Exception :
+            return node
+        self._removals += 1
+        return self._visitStatements(branch)
+
+    def visit_While(self, node) :
+        node.test = self.visit(node.test)
+        test = self._known(node.test)
+        try :
+            is_dead = test is not _MISSING and not test
+        except Exception :
+            is_dead = False
+        if is_dead :
+            self._removals += 1
+            return self._visitStatements(node.orelse)
+        node.body = self._visitStatements(node.body)
+        node.orelse = self._visitStatements(node.orelse)
+        return node
+
+    def visit_For(self, node) :
+        node.iter = self.visit(node.iter)
+        node.target = self.visit(node.target)
+        node.body = self._visitStatements(node.body)
+        node.orelse = self._visitStatements(node.orelse)
+
+        iterated = node.iter
+        if not (
+            isinstance(node.target, ast.Name)
+            and isinstance(iterated, ast.Call)
+            and self._known(iterated.func) is range
+            and not iterated.keywords
+        ) :
+            return node
+        range_args = [self._known(a) for a in iterated.args]
+        if any(type(a) is not int for a in range_args) :
+            return node
+        try :
+            iterations = range(*range_args)
+        except Exception :
+            return node
+        if len(iterations) > self._max_unroll or _breaksLoop(node.body) :
+            return node
+
+        # An empty range removes the body and the target.
+        self._removals += 1
+        unrolled = []
+        for i in iterations :
+            assign = ast.Assign(
+                targets=[ast.Name(node.target.id, ast.Store())],
+                value=ast.Constant(i),
+            )
+            unrolled.append(ast.copy_location(assign, node))
+            unrolled.extend(_copyTree(stmt) for stmt in node.body)
+        # Without 'break', the 'else' clause always runs.
+        unrolled.extend(node.orelse)
+        return unrolled
+
+
+# ****************************** Operators table *******************************
+
+_UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+    ast.Not: operator.not_,
+    ast.Invert: operator.invert,
+}
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+    ast.LShift: operator.lshift,
+    ast.RShift: operator.rshift,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+    ast.BitAnd: operator.and_,
+    ast.MatMult: operator.matmul,
+}
+
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+    ast.In: lambda a, b : a in b,
+    ast.NotIn: lambda a, b : a not in b,
+}
+
+
+# ******************************** Functions ***********************************
+
+def specialize(
+    tree: ast.Module,
+    template_args: dict[str, Any],
+    module_globals: dict[str, Any],
+    max_unroll: int = MAX_UNROLL,
+) -> ast.Module :
+    """
+    Returns a copy of 'tree' specialized for 'template_args' :
+      - Template arguments which can be written as literals (ints, strs,
+        floats, tuples, bools, None, ...) are substituted by constants.
+      - Constant expressions are folded; this includes comparisons with
+        template arguments that can't be written as literals ('T is int').
+      - Dead 'if'/'while' branches are removed. A function whose 'yield' or
+        local variables were only in dead code keeps them in an unreachable
+        'if False :' block : it stays a generator, its variables stay local.
+      - 'for _ in range(N)' loops are unrolled, when 'N <= max_unroll' and
+        the loop doesn't 'break' nor 'continue'.
+
+    Operations whose results would be too large to be constants aren't
+    evaluated.
+
+    Builtins are assumed not to be replaced once the template is built, unless
+    they are shadowed by 'module_globals' or by a local variable.
+    """
+
+    tree = _Specializer(template_args, module_globals, max_unroll).visit(
+        _copyTree(tree)
+    )
+    _fillEmptyBodies(tree)
+    return ast.fix_missing_locations(tree)
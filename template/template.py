@@ -5,18 +5,26 @@
 from __future__ import annotations
 
 "Standard Library :"
-import ast
-import inspect
+import opcode
 import sys
 
-from itertools import islice
+from collections import Counter
 from textwrap import dedent
+from time import perf_counter
+from types import CodeType, FunctionType
+from weakref import WeakKeyDictionary
 #To annotate
 from typing import overload
-from collections.abc import Sequence
+from collections.abc import Callable, Sequence
 
 "Local Library :"
-from callable_template import CallableTemplate
+import registry
+
+from aot import generatedDeclaration
+from callable_template import CallableTemplate, GeneratedDeclaration
+from code_cache import PersistentCodeCache
+from instantiation_cache import InstantiationCache
+from utils import source_index
 #To annotate
 from utils.types import TemplateParameter, isTemplateParameter
 
@@ -25,12 +33,162 @@ from utils.types import TemplateParameter, isTemplateParameter
 
 __all__ = ("template")
 
+# Flag of the code of functions, whose locals are fast locals.
+_CO_OPTIMIZED = 0x0001
+
+# Declarations of the templates declared in functions, by location (and
+# template parameters), so that calling a function declaring a template only
+# looks up, parses and compiles the declaration on the first call.
+# They are dropped with the code of the declaring function.
+_LOCAL_DECLARATIONS: WeakKeyDictionary[CodeType, dict[tuple, GeneratedDeclaration]] = (
+    WeakKeyDictionary()
+)
+
 
 # ********************************* Classes ************************************
 
+class _SkippedWithBlock(Exception) :
+    """Raised in place of the first statement of the with block."""
+
+
+def _noTrace(frame, event, arg) :
+    return None
+
+def _skipWithBlock(frame, event, arg) :
+    raise _SkippedWithBlock
+
+def _bindingSkipWithBlock(name: str, value: object) :
+    def skipWithBlock(frame, event, arg) :
+        # In a trace function, 'frame.f_locals' is written back to the fast
+        # locals of the frame when it returns (or raises).
+        frame.f_locals[name] = value
+        raise _SkippedWithBlock
+
+    return skipWithBlock
+
+
+# ******************************** Functions ***********************************
+
+def _withBlock(code: CodeType, lasti: int, module_globals: dict) -> str :
+    # The source files and the positions of their code objects are
+    # indexed once, and shared by all the declarations of a module.
+    with_block_start, with_block_end, *_ = source_index.getPosition(
+        code, lasti, module_globals
+    )
+    return dedent("".join(
+        source_index.getLines(code.co_filename, module_globals)[
+            with_block_start : with_block_end
+        ]
+    ))
+
+_STORE_NAME_OPS = {opcode.opmap["STORE_NAME"], opcode.opmap["STORE_GLOBAL"]}
+_STORE_LOCAL_OPS = {opcode.opmap["STORE_FAST"], opcode.opmap["STORE_DEREF"]}
+# Precedes the store of an assignment expression ('@deco(x := 1)').
+_COPY = opcode.opmap["COPY"]
+# Inlined comprehensions (PEP 709) save their variables with
+# 'LOAD_FAST_AND_CLEAR', and restore them with 'SWAP' then 'STORE_FAST's.
+_LOAD_FAST_AND_CLEAR = opcode.opmap["LOAD_FAST_AND_CLEAR"]
+_SWAP = opcode.opmap["SWAP"]
+_STORE_FAST = opcode.opmap["STORE_FAST"]
+
+def _declaredName(code: CodeType, lasti: int) -> str :
+    """
+    Name the with block entered at 'lasti' stores first : the one of the
+    definition it holds. It's read from the bytecode, without the source.
+    The stores running before the definition is stored (assignment
+    expressions and comprehension variables, in decorators, default
+    arguments, ...) are skipped.
+    """
+
+    co_code = code.co_code
+    extended_arg = 0
+    previous_op = None
+    # Comprehension variables saved, and not restored yet.
+    saved = Counter()
+    restoring = False
+    for offset in range(lasti + 2, len(co_code), 2) :
+        op, arg = co_code[offset], co_code[offset + 1] | extended_arg
+        extended_arg = arg << 8 if op == opcode.EXTENDED_ARG else 0
+        if op == _LOAD_FAST_AND_CLEAR :
+            saved[code.co_varnames[arg]] += 1
+        elif op == _STORE_FAST and saved[code.co_varnames[arg]] :
+            # Loop variable, or restored once the comprehension is done.
+            name = code.co_varnames[arg]
+            restoring = restoring or previous_op == _SWAP
+            if restoring :
+                saved[name] -= 1
+            previous_op = op
+            continue
+        elif previous_op != _COPY :
+            if op in _STORE_NAME_OPS :
+                return code.co_names[arg]
+            if op in _STORE_LOCAL_OPS :
+                # Fast locals, then cells and free variables.
+                return code._varname_from_oparg(arg)
+        restoring = False
+        previous_op = op
+    raise SyntaxError("Can only template class/function definition.")
+
+
+_LOAD_CONST = opcode.opmap["LOAD_CONST"]
+_LOAD_LOCAL_OPS = {
+    opcode.opmap[opname]
+    for opname in ("LOAD_FAST", "LOAD_FAST_CHECK", "LOAD_DEREF", "LOAD_FROM_DICT_OR_DEREF")
+}
+
+def _loadedLocals(code: CodeType, lasti: int, name: str) -> set[str] :
+    """
+    Variables of the declaring function (or class body) the with block
+    entered at 'lasti' loads before storing the definition 'name' : the ones
+    used by its decorators, default arguments, base classes, ...
+    """
+
+    co_code = code.co_code
+    extended_arg = 0
+    loaded = set()
+    # Bound by the with block itself (comprehensions, assignment expressions).
+    bound = set()
+    for offset in range(lasti + 2, len(co_code), 2) :
+        op, arg = co_code[offset], co_code[offset + 1] | extended_arg
+        extended_arg = arg << 8 if op == opcode.EXTENDED_ARG else 0
+        if op in _LOAD_LOCAL_OPS :
+            loaded.add(code._varname_from_oparg(arg))
+        elif op == _LOAD_FAST_AND_CLEAR :
+            bound.add(code._varname_from_oparg(arg))
+        elif op in _STORE_LOCAL_OPS or op in _STORE_NAME_OPS :
+            stored = (
+                code.co_names[arg] if op in _STORE_NAME_OPS
+                else code._varname_from_oparg(arg)
+            )
+            if stored == name :
+                break
+            bound.add(stored)
+    return loaded - bound
+
+def _definitionCode(code: CodeType, lasti: int, name: str) -> CodeType | None :
+    """
+    Code of the definition 'name' held by the with block entered at 'lasti'
+    (the code of the class body for a class), read from the bytecode.
+    """
+
+    co_code = code.co_code
+    extended_arg = 0
+    for offset in range(lasti + 2, len(co_code), 2) :
+        op, arg = co_code[offset], co_code[offset + 1] | extended_arg
+        extended_arg = arg << 8 if op == opcode.EXTENDED_ARG else 0
+        if op == _LOAD_CONST :
+            const = code.co_consts[arg]
+            if isinstance(const, CodeType) and const.co_name == name :
+                return const
+    return None
+
+
 class template :
     def __init__(self, template_params: dict[str, type]) -> None :
         self._template_params = template_params
+        self._options = {}
+        self._persistent_cache = False
+        self._lazy = False
 
         try :
             self._frame = sys._getframe(2)
@@ -72,25 +230,196 @@ class template :
         raise TypeError("Template is badly parameterized")
 
 
-    def _get_WithBlock(self) -> str :
-        with_block_start, with_block_end, *_ = next(islice(
-            self._frame.f_code.co_positions(),
-            self._frame.f_lasti // 2,
+    def __call__(
+        self,
+        declaration: Callable | None = None,
+        /,
+        *,
+        cache: InstantiationCache | None = None,
+        specialize: bool = False,
+        persistent_cache: bool | PersistentCodeCache = False,
+        identity_cache: bool = False,
+        lazy: bool = False,
+    ) -> template | CallableTemplate :
+        """
+        Configures the callable template that will be declared :
+        >>> with template['N': int](cache=LRUCache(512), specialize=True) :
+        ...     def cb() : ...
+
+        - 'cache' : Policy of the cache memoizing the instantiations.
+        - 'specialize' : Substitutes the template arguments as constants in
+          the code of each instantiation, folds constant expressions, removes
+          dead branches and unrolls small 'for _ in range(N)' loops.
+        - 'persistent_cache' : Stores the compiled code on disk (by default in
+          '__pycache__/templates', next to the declaring module), so that later
+          processes don't parse nor compile the declaration again.
+        - 'identity_cache' : Memoizes the instantiations for unhashable
+          template arguments (dicts, lists, ...) by the identity of those
+          arguments. Those are kept alive while the instantiation is
+          memoized, as their ids must not be reused : the entries are only
+          dropped by the cache policy (or 'cache_clear()').
+        - 'lazy' : Only the location of the with block is recorded when the
+          template is declared. The with block is looked up, validated and
+          compiled (and 'ast' imported) on the first build, thus a template
+          never instantiated costs almost nothing. Errors in the with block
+          are raised by that build.
+
+        Declared in a function, the definition can use the variables of that
+        function : their values are read when the template is declared (thus,
+        they must be bound by then) and passed to each build. Later
+        assignments of those variables aren't seen by the instantiations.
+
+        Used as a decorator, declares the decorated function (or class) as a
+        callable template :
+        >>> @template['N': int, 'T': type](cache=LRUCache(512))
+        ... def cb() : ...
+
+        The source isn't needed : each instantiation is a copy of the
+        decorated function sharing its code, whose globals include the
+        template arguments. Hence, the template parameters can't be used
+        where the decorated definition evaluates them right away (default
+        values, annotations, class attributes). Neither 'specialize' nor
+        'persistent_cache' are available in this form.
+        """
+        if declaration is not None :
+            return self._decorate(declaration)
+
+        self._options["cache"] = cache
+        self._options["specialize"] = specialize
+        self._options["identity_cache"] = identity_cache
+        self._persistent_cache = persistent_cache
+        self._lazy = lazy
+        return self
+
+    def _decorate(self, declaration: Callable) -> CallableTemplate :
+        if isinstance(declaration, FunctionType) :
+            module_globals = declaration.__globals__
+        elif isinstance(declaration, type) :
+            module = sys.modules.get(declaration.__module__)
+            module_globals = {} if module is None else vars(module)
+        else :
+            raise TypeError("Can only template class/function definition.")
+
+        if self._persistent_cache :
+            raise ValueError(
+                "Nothing is compiled with the decorator form, "
+                "thus there is nothing to store on disk."
+            )
+
+        cb_template = CallableTemplate(
+            declaration.__name__,
             None,
+            self._template_params,
+            module_globals,
+            prototype=declaration,
+            **self._options,
+        )
+        code = getattr(declaration, "__code__", None)
+        registry.register(cb_template, registry.Declaration(
+            declaration.__module__,
+            None if code is None else code.co_filename,
+            None if code is None else code.co_firstlineno,
         ))
-        return dedent("".join(
-            inspect.findsource(self._frame)[0][
-                with_block_start : with_block_end
-            ]
-        ))
+        return cb_template
 
-    def _silence_WithBlock(self) :
-        sys.settrace(lambda frame, event, arg : None)
-        self._frame.f_trace = lambda frame, event, arg : exec("raise Exception")
 
-    def __enter__(self) :
+    def _get_WithBlock(self) -> str :
+        return _withBlock(
+            self._frame.f_code, self._frame.f_lasti, self._frame.f_globals
+        )
+
+    def _lazy_WithBlock(self) -> tuple[str, Callable[[], str]] :
+        """
+        Name defined by the with block, and a function looking up and
+        validating the with block later. Only the location of the with block
+        is kept (and not the declaring frame).
+        """
+
+        code = self._frame.f_code
+        lasti = self._frame.f_lasti
+        module_globals = self._frame.f_globals
+        name = _declaredName(code, lasti)
+
+        def lazy_declaration() -> str :
+            with_block = _withBlock(code, lasti, module_globals)
+            if template._parse_WithBlock(with_block) != name :
+                raise SyntaxError(f"The with block doesn't define '{name}'.")
+            return with_block
+
+        return name, lazy_declaration
+
+    def _freeVariables(self, name: str) -> dict[str, object] :
+        """
+        Values of the variables of the declaring function used by the
+        definition 'name' (its free variables, read from the bytecode), or by
+        the expressions evaluated before it is defined (its decorators, ...).
+        The declaration is compiled apart from that function, thus they are
+        passed to its factory as the template arguments are.
+        """
+
+        code = self._frame.f_code
+        if not (code.co_flags & _CO_OPTIMIZED or code.co_freevars) :
+            return {}
+        lasti = self._frame.f_lasti
+        definition = _definitionCode(code, lasti, name)
+        free_names = dict.fromkeys(
+            (*(definition.co_freevars if definition is not None else ()),
+             *sorted(_loadedLocals(code, lasti, name)))
+        )
+
+        free_vars = {}
+        for free_name in free_names :
+            if (
+                free_name == name or free_name in self._template_params
+                # Methods calling 'super()' : not available to templates.
+                or free_name == "__class__"
+            ) :
+                continue
+            try :
+                free_vars[free_name] = self._variable(free_name)
+            except KeyError :
+                raise NameError(
+                    f"'{name}' uses '{free_name}', which must be bound before "
+                    "declaring the template."
+                ) from None
+        return free_vars
+
+    def _variable(self, var_name: str) -> object :
+        frame = self._frame
+        while True :
+            try :
+                return frame.f_locals[var_name]
+            except KeyError :
+                pass
+            if (
+                frame.f_code.co_flags & _CO_OPTIMIZED
+                or var_name not in frame.f_code.co_freevars
+                or frame.f_back is None
+            ) :
+                raise KeyError(var_name)
+            # A free variable of a class body isn't among its locals : it's
+            # a variable of the function running the class statement.
+            frame = frame.f_back
 
-        with_block = self._get_WithBlock()
+    def _silence_WithBlock(self) :
+        # The with block is skipped by raising an exception as soon as it
+        # starts running, from a trace function local to the declaring frame.
+        # Local trace functions are only called while a global one is set,
+        # thus one is installed until '__exit__', which restores the previous
+        # ones (a debugger's or a coverage tool's, for instance).
+        self._previous_trace = sys.gettrace()
+        self._previous_frame_trace = self._frame.f_trace
+        sys.settrace(_noTrace)
+        if self._binding is None :
+            self._frame.f_trace = _skipWithBlock
+        else :
+            self._frame.f_trace = _bindingSkipWithBlock(*self._binding)
+
+    @staticmethod
+    def _parse_WithBlock(with_block: str) -> str :
+        """Validates the with block and returns the name it defines."""
+
+        import ast
 
         stmts = ast.parse(with_block).body
 
@@ -107,26 +436,91 @@ class template :
             # Thus, the choice to forbid it.
             raise SyntaxError("Can only template class/function definition.")
 
+        return def_stmt.name
+
+    def __enter__(self) :
+        start = perf_counter()
+
+        persistent_cache = self._persistent_cache
+        if persistent_cache is True :
+            persistent_cache = PersistentCodeCache.nextTo(
+                self._frame.f_globals.get("__file__")
+            )
+        if not persistent_cache :
+            persistent_cache = None
+
+        # Generated ahead of time ('python -m aot') : the source isn't read,
+        # and the declaration was compiled with the generated module.
+        local_key = None
+        if self._frame.f_code.co_flags & _CO_OPTIMIZED :
+            # Declared in a function (never generated ahead of time).
+            local_key = (
+                self._frame.f_lasti,
+                tuple(self._template_params.items()),
+                self._options.get("specialize", False),
+            )
+            generated = _LOCAL_DECLARATIONS.get(self._frame.f_code, {}).get(local_key)
+        else :
+            generated = generatedDeclaration(self._frame)
+
+        lazy_declaration = None
+        if generated is not None :
+            with_block, name = generated.declaration, generated.name
+        elif self._lazy :
+            with_block = None
+            name, lazy_declaration = self._lazy_WithBlock()
+        elif persistent_cache :
+            with_block = self._get_WithBlock()
+            # The with block was already validated by a previous process.
+            key = persistent_cache.key(with_block, "<declaration>")
+            name = persistent_cache.load(key)
+            if not isinstance(name, str) :
+                name = self._parse_WithBlock(with_block)
+                persistent_cache.store(key, name)
+        else :
+            with_block = self._get_WithBlock()
+            name = self._parse_WithBlock(with_block)
+
         cb_template = CallableTemplate(
-            def_stmt.name,
+            name,
             with_block,
             self._template_params,
             self._frame.f_globals,
+            free_vars=self._freeVariables(name),
+            persistent_cache=persistent_cache,
+            generated=generated,
+            lazy_declaration=lazy_declaration,
+            location=(self._frame.f_code.co_filename, self._frame.f_lineno),
+            **self._options,
         )
 
-        self._frame.f_locals[def_stmt.name] = cb_template
-
-        if def_stmt.name not in self._frame.f_locals :
-            # Might not happen on all Python implementations.
-            # But, in CPython, function namespaces were changed for performance
-            # reason, making 'frame.f_locals' a dictionary created on the fly.
-            # Therefore any updates to 'frame.f_locals' may not happen.
-            # (See : https://peps.python.org/pep-0667/#rationale)
-            #
-            # Btw, PEP 667 might solve this problem in Python 3.13.
-            raise NotImplementedError("To be implemented.")
+        if local_key is not None and generated is None and lazy_declaration is None :
+            # Compiled once per location, as a declaration generated ahead of
+            # time.
+            cb_template._generated = _LOCAL_DECLARATIONS.setdefault(
+                self._frame.f_code, {}
+            )[local_key] = GeneratedDeclaration(name, with_block, cb_template._code, {})
+
+        self._binding = None
+        self._frame.f_locals[name] = cb_template
+        if name not in self._frame.f_locals :
+            # Before CPython 3.13 (PEP 667), 'frame.f_locals' of a function is
+            # a snapshot of its fast locals, thus updating it has no effect.
+            # Except from a trace function : the template is bound by the one
+            # skipping the with block.
+            self._binding = (name, cb_template)
+
+        cb_template._stats.declaration = perf_counter() - start
+        registry.register(cb_template, registry.Declaration(
+            self._frame.f_globals.get("__name__"),
+            self._frame.f_code.co_filename,
+            self._frame.f_lineno,
+        ))
 
         self._silence_WithBlock()
 
     def __exit__(self, exc_type, exc_value, traceback) :
-        return True
+        # CPython already disabled tracing, as the trace function raised.
+        sys.settrace(self._previous_trace)
+        self._frame.f_trace = self._previous_frame_trace
+        return exc_type is _SkippedWithBlock
@@ -0,0 +1,173 @@
+"""
+Tests of the ahead-of-time instantiation of templates ('python -m aot').
+"""
+
+
+import importlib
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import aot
+from aot import generation
+from utils import source_index
+
+
+# ********************************** Utils *************************************
+
+_MODULE = '''\
+from template import template
+
+class Scope :
+    with template['N': int, 'T': type](specialize=True) :
+        def convert(values) :
+            return [T(value) * N for value in values]
+
+with template['T': type] :
+    class Box :
+        def __init__(self, value) :
+            self.value = T(value)
+
+with template['TABLE': object, 'N': int](identity_cache=True) :
+    def lookup(key) :
+        return TABLE[key] * N
+'''
+
+_SCRIPT = '''\
+from aot_pkg.mod import Scope
+Scope.convert[7, float]
+'''
+
+
+# ********************************** Tests *************************************
+
+class Test_AOT(unittest.TestCase) :
+
+    def setUp(self) -> None :
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = Path(tmp_dir.name)
+
+        package = self.tmp_dir / "aot_pkg"
+        package.mkdir()
+        (package / "__init__.py").write_text("")
+        self.module_file = package / "mod.py"
+        self.module_file.write_text(_MODULE)
+        os.utime(self.module_file, (1_000_000, 1_000_000))
+
+        sys.path.insert(0, str(self.tmp_dir))
+        self.addCleanup(sys.path.remove, str(self.tmp_dir))
+        self.addCleanup(self.forgetModules)
+
+    def forgetModules(self) -> None :
+        for module_name in ("aot_pkg", "aot_pkg.mod") :
+            sys.modules.pop(module_name, None)
+        source_index.clear()
+        aot._GENERATED.clear()
+
+    def importModule(self) :
+        self.forgetModules()
+        return importlib.import_module("aot_pkg.mod")
+
+    # ---- ---- ---- ----
+
+    def test_generated_module(self) :
+        paths = generation.generate(
+            [self.tmp_dir / "aot_pkg"],
+            {"aot_pkg.mod:Scope.convert": ["3, int", ["2", "<builtins.float>"]]},
+        )
+
+        self.assertEqual(paths, [self.tmp_dir / "aot_pkg" / "mod_templates.py"])
+
+    def test_no_source_read_nor_compilation(self) :
+        generation.generate(
+            [self.module_file], {"aot_pkg.mod:Scope.convert": ["'T': int, 'N': 3"]},
+        )
+
+        with (
+            mock.patch.object(source_index, "_read", wraps=source_index._read) as read,
+            mock.patch("callable_template.compile", create=True, wraps=compile) as compile_,
+        ) :
+            mod = self.importModule()
+            convert = mod.Scope.convert
+
+            self.assertEqual(convert[3, int](["1", "2"]), [3, 6])
+            self.assertEqual(mod.Box[str](5).value, "5")
+            self.assertEqual(read.call_count, 0)
+            self.assertEqual(compile_.call_count, 0)
+
+            # Not generated : specialized from the generated declaration.
+            self.assertEqual(convert[2, int](["1"]), [2])
+            self.assertEqual(read.call_count, 0)
+            self.assertEqual(compile_.call_count, 1)
+
+        self.assertEqual(convert[3, int].__qualname__, "convert[N=3, T=int]")
+
+    def test_stale_generated_module_is_ignored(self) :
+        generation.generate([self.module_file])
+        self.module_file.write_text(_MODULE.replace("T(value) * N", "T(value) * -N"))
+        os.utime(self.module_file, (2_000_000, 2_000_000))
+
+        mod = self.importModule()
+
+        self.assertIsNone(mod.Scope.convert._generated)
+        self.assertEqual(mod.Scope.convert[3, int](["1"]), [-3])
+
+    def test_hand_written_module_is_ignored(self) :
+        generated_file = self.tmp_dir / "aot_pkg" / "mod_templates.py"
+        generated_file.write_text("raise AssertionError('Run.')\n")
+
+        mod = self.importModule()
+
+        self.assertIsNone(mod.Scope.convert._generated)
+        self.assertEqual(mod.Scope.convert[3, int](["1"]), [3])
+        with self.assertRaises(FileExistsError) :
+            generation.generate([self.module_file])
+
+    def test_module_of_another_format_is_ignored(self) :
+        generation.generate([self.module_file])
+
+        with mock.patch.object(aot, "GENERATED_FORMAT", aot.GENERATED_FORMAT + 1) :
+            mod = self.importModule()
+
+        self.assertIsNone(mod.Scope.convert._generated)
+
+    def test_recorded_instantiations(self) :
+        script = self.tmp_dir / "script.py"
+        script.write_text(_SCRIPT)
+
+        manifest = generation.record(script)
+
+        self.assertEqual(
+            manifest["aot_pkg.mod:Scope.convert"], [["7", "<builtins.float>"]]
+        )
+
+        generation.generate([self.module_file], manifest)
+        convert = self.importModule().Scope.convert
+
+        self.assertIn(("7", "<builtins.float>"), convert._generated.instantiations)
+
+    def test_identity_cached_instantiations_arent_recorded(self) :
+        script = self.tmp_dir / "script.py"
+        script.write_text(
+            "from aot_pkg.mod import lookup\n"
+            "assert lookup[{'a': 1}, 2]('a') == 2\n"
+        )
+
+        manifest = generation.record(script)
+
+        self.assertNotIn("aot_pkg.mod:lookup", manifest)
+
+    # ---- Errors :
+
+    def test_ValueError__unstable_template_argument(self) :
+        with self.assertRaises(ValueError) :
+            generation.generate(
+                [self.module_file],
+                {"aot_pkg.mod:Scope.convert": [
+                    "3, type('Local', (), {'__qualname__': 'f.<locals>.Local'})"
+                ]},
+            )
@@ -3,7 +3,16 @@ Generic tests that should work for any kind of callable template.
 """
 
 
+import asyncio
+import gc
+import linecache
+import math
+import sys
+import threading
+import traceback
 import unittest
+import weakref
+from unittest import mock
 
 from template import template
 from callable_template import CallableTemplate
@@ -24,6 +33,13 @@ def succesfullyRan(cb) :
     except Exception : return False
     else : return True
 
+def raisingFrame(cb) -> traceback.FrameSummary :
+    """Frame in which 'cb()' raised."""
+    try : cb()
+    except Exception as err :
+        return traceback.extract_tb(err.__traceback__)[-1]
+    raise AssertionError("Nothing raised.")
+
 
 # ********************************** Tests *************************************
 
@@ -72,6 +88,21 @@ class Test_CallableTemplate_Building(unittest.TestCase) :
             and isCallableTemplate(self.GLOB_SCOPE["cb"]['T': int])
         )
     
+    def test_declaration_compiled_once(self) :
+        """
+        The declaration of a callable template is compiled once, when the
+        template is created.
+        Partially built callable templates are views of the template, thus
+        they reuse its code object.
+        """
+
+        cb = self.GLOB_SCOPE["cb"]
+
+        self.assertTrue(
+            cb[5]._root is cb
+            and cb['T': int]._root is cb
+        )
+
     # ---- BONUS :
 
     def test_BONUS__building_with_nonhashable_template_argument(self) :
@@ -127,6 +158,58 @@ class Test_CallableTemplate_Building(unittest.TestCase) :
             self.GLOB_SCOPE["cb"][int, 1]
 
 
+class Test_CallableTemplate_PartialBuilding(unittest.TestCase) :
+
+    """
+    Partial builds share the instantiations of the template they come from :
+    every spelling of the same template arguments results in the same
+    instantiation.
+    """
+
+    def setUp(self) -> None:
+
+        class GlobScope :
+            with template['N': int, 'T': type, 'U': type] :
+                def cb() :
+                    return T(N), U(N)
+
+        self.GLOB_SCOPE = vars(GlobScope)
+
+    # ---- ---- ---- ----
+
+    def test_same_instantiation_whatever_the_spelling(self) :
+        cb = self.GLOB_SCOPE["cb"]
+
+        built = cb[5, int, str]
+        self.assertIs(cb[5][int][str], built)
+        self.assertIs(cb[5, int][str], built)
+        self.assertIs(cb['U': str][5, int], built)
+        self.assertIs(cb['T': int]['U': str][5], built)
+        self.assertEqual(built(), (5, "5"))
+
+    def test_partial_builds_share_the_cache(self) :
+        cb = self.GLOB_SCOPE["cb"]
+
+        cb[1][int][str]
+        cb[1, int, str]
+        cb[2][int, float]
+
+        # The 3 partial builds, and the 2 instantiations.
+        self.assertEqual(cb.cache_info().currsize, 5)
+        self.assertEqual(cb[1].cache_info(), cb.cache_info())
+
+    def test_chained_partial_builds_are_views_of_the_template(self) :
+        cb = self.GLOB_SCOPE["cb"]
+
+        self.assertIs(cb[5][int]._root, cb)
+        self.assertIs(cb[5][int], cb[5, int])
+        self.assertEqual(cb[5][int]._param_names, ("U",))
+
+    def test_TypeError__partial_build_wrong_type(self) :
+        with self.assertRaises(TypeError) :
+            self.GLOB_SCOPE["cb"][5][6]
+
+
 class Test_CallableTemplate_Calling(unittest.TestCase) :
 
     @classmethod
@@ -163,3 +246,472 @@ class Test_CallableTemplate_Calling(unittest.TestCase) :
         #Even with partially initialised function template :
         with self.assertRaises(TypeError) :
             self.GLOB_SCOPE["cb"]['T':int]()
+
+
+class Test_CallableTemplate_ExplicitInstantiation(unittest.TestCase) :
+
+    """
+    Instantiations can be built up front, like C++'s explicit instantiations :
+    >>> template class Foo<int>;
+    """
+
+    def setUp(self) -> None:
+
+        class GlobScope :
+            with template['N': int, 'T': type] :
+                def cb() :
+                    return T(N)
+
+        self.GLOB_SCOPE = vars(GlobScope)
+
+    # ---- ---- ---- ----
+
+    def test_explicit_instantiation(self) :
+        cb = self.GLOB_SCOPE["cb"]
+
+        keys = [(1, int), (slice('N', 2), slice('T', str))]
+        records = cb.instantiate(keys)
+
+        self.assertEqual([r.key for r in records], keys)
+        self.assertEqual([r.instantiation() for r in records], [1, "2"])
+        self.assertTrue(all(r.build_time >= 0 for r in records))
+
+    def test_explicit_instantiations_are_memoized(self) :
+        cb = self.GLOB_SCOPE["cb"]
+
+        records = cb.instantiate([(1, int), (2, int)])
+
+        self.assertIs(cb[1, int], records[0].instantiation)
+        self.assertIs(cb['N': 2, 'T': int], records[1].instantiation)
+        self.assertEqual(cb.cache_info().misses, 2)
+
+    def test_parallel_explicit_instantiation(self) :
+        cb = self.GLOB_SCOPE["cb"]
+
+        records = cb.instantiate(
+            [(n, int) for n in range(20)], parallel=True, max_workers=4,
+        )
+
+        self.assertEqual([r.instantiation() for r in records], list(range(20)))
+
+    def test_batch_instantiation(self) :
+        cb = self.GLOB_SCOPE["cb"]
+
+        built = cb.instantiate_batch([(1, int), (2, slice('T', str)), (1, int)])
+
+        self.assertEqual(list(built), [(1, int), (2, str)])
+        self.assertEqual(built[2, str](), "2")
+        self.assertIs(cb[1, int], built[1, int])
+
+    # ---- Errors :
+
+    def test_TypeError__explicit_instantiation_with_wrong_type(self) :
+        """
+        Every key is checked before anything is built.
+        """
+
+        cb = self.GLOB_SCOPE["cb"]
+
+        with self.assertRaises(TypeError) :
+            cb.instantiate([(1, int), (int, 1)])
+        self.assertEqual(cb.cache_info().currsize, 0)
+
+
+class Test_CallableTemplate_Globals(unittest.TestCase) :
+
+    """
+    Instantiations resolve the globals of the declaring module in its live
+    namespace : only the template arguments are specific to an instantiation.
+    """
+
+    def setUp(self) -> None:
+
+        class GlobScope :
+            with template['N': int] :
+                def cb() :
+                    return _late_global(N)
+
+        self.GLOB_SCOPE = vars(GlobScope)
+        self.addCleanup(globals().pop, "_late_global", None)
+
+    # ---- ---- ---- ----
+
+    def test_instantiations_share_module_globals(self) :
+        cb = self.GLOB_SCOPE["cb"]
+
+        self.assertIs(cb[1].__globals__, globals())
+        self.assertIs(cb[2].__globals__, globals())
+
+    def test_global_defined_after_build(self) :
+        built = self.GLOB_SCOPE["cb"][3]
+
+        globals()["_late_global"] = lambda n : -n
+        self.assertEqual(built(), -3)
+
+        # Monkeypatched
+        globals()["_late_global"] = lambda n : 2 * n
+        self.assertEqual(built(), 6)
+
+    def test_template_argument_shadows_module_global(self) :
+        globals()["_late_global"] = str
+
+        class GlobScope :
+            with template['_late_global': type] :
+                def cb() :
+                    return _late_global(1)
+
+        self.assertEqual(GlobScope.cb[float](), 1.0)
+        self.assertEqual(GlobScope.cb[float].__qualname__, "cb[_late_global=float]")
+
+
+class Test_CallableTemplate_Dispatching(unittest.TestCase) :
+
+    """
+    A dispatcher calls the instantiation matching the types of its arguments.
+    """
+
+    def setUp(self) -> None:
+
+        class GlobScope :
+            with template['T': type, 'U': type] :
+                def pair(x, y=None) :
+                    return T.__name__, U.__name__
+
+            with template['N': int, 'T': type] :
+                def repeat(x) :
+                    return [T(x)] * N
+
+        self.GLOB_SCOPE = vars(GlobScope)
+
+    # ---- ---- ---- ----
+
+    def test_type_parameters_inferred_by_default(self) :
+        dispatch = self.GLOB_SCOPE["pair"].dispatcher()
+
+        self.assertEqual(dispatch(1, "a"), ("int", "str"))
+        self.assertEqual(dispatch(1.0, []), ("float", "list"))
+
+    def test_sources(self) :
+        pair = self.GLOB_SCOPE["pair"]
+        dispatch = pair.dispatcher(T=0, U="y")
+
+        self.assertEqual(dispatch(1, y="a"), ("int", "str"))
+        self.assertEqual(pair.cache_info().currsize, 1)
+        self.assertIn((int, str), list(pair._cache))
+
+    def test_dispatcher_of_partial_build(self) :
+        dispatch = self.GLOB_SCOPE["repeat"][2].dispatcher()
+
+        self.assertEqual(dispatch(1), [1, 1])
+        self.assertEqual(dispatch("a"), ["a", "a"])
+
+    def test_instantiations_memoized_per_types(self) :
+        pair = self.GLOB_SCOPE["pair"]
+        dispatch = pair.dispatcher()
+
+        dispatch(1, 2)
+        dispatch(3, 4)
+        dispatch(1, "a")
+
+        self.assertEqual(pair.cache_info().misses, 2)
+
+    def test_untyped_parameters_inferred_by_default(self) :
+        with template['T'] :
+            def name(x) :
+                return T.__name__
+
+        self.assertEqual(name.dispatcher()(1), "int")
+
+    def test_table_emptied_with_the_cache(self) :
+        pair = self.GLOB_SCOPE["pair"]
+        dispatch = pair.dispatcher()
+        dispatch(1, 2)
+
+        pair.cache_clear()
+        dispatch(1, 2)
+
+        self.assertEqual(pair.cache_info().currsize, 1)
+
+        @pair.specialization['T': int, 'U': int]
+        def pair(x, y=None) :
+            return "specialized"
+
+        self.assertEqual(dispatch(1, 2), "specialized")
+
+    def test_table_bounded(self) :
+        pair = self.GLOB_SCOPE["pair"]
+        dispatch = pair.dispatcher()
+        classes = [type(f"C{i}", (), {}) for i in range(200)]
+
+        for cls in classes :
+            dispatch(cls(), 1)
+        class_ref = weakref.ref(classes[0])
+        del classes, cls
+        gc.collect()
+
+        # Neither held by the table nor by the cache (of 128 instantiations).
+
+        self.assertIsNone(class_ref())
+
+    # ---- Errors :
+
+    def test_TypeError__unbound_template_parameter(self) :
+        with self.assertRaises(TypeError) :
+            self.GLOB_SCOPE["repeat"].dispatcher()
+
+    def test_TypeError__missing_argument(self) :
+        dispatch = self.GLOB_SCOPE["pair"].dispatcher(T=0, U="y")
+
+        with self.assertRaises(TypeError) :
+            dispatch(1)
+
+    def test_NameError__unknown_template_parameter(self) :
+        with self.assertRaises(NameError) :
+            self.GLOB_SCOPE["pair"].dispatcher(V=0)
+
+    def test_TypeError__invalid_source(self) :
+        with self.assertRaises(TypeError) :
+            self.GLOB_SCOPE["pair"].dispatcher(T=0.0, U=1)
+        with self.assertRaises(TypeError) :
+            self.GLOB_SCOPE["pair"].dispatcher(T=True, U=1)
+
+
+class Test_CallableTemplate_ExplicitSpecialization(unittest.TestCase) :
+
+    """
+    Explicit specializations, registered like C++'s 'template<>', take
+    precedence over the declaration :
+    >>> @tmpl.specialization['T': float]
+    ... def tmpl() : ...
+    """
+
+    def setUp(self) -> None:
+
+        class GlobScope :
+            with template['N': int, 'T': type] :
+                def total(values) :
+                    return sum(T(v) for v in values[:N])
+
+        total = GlobScope.total
+
+        @total.specialization['N': 0]
+        def total(values) :
+            return T()
+
+        @total.specialization[2, float]
+        def total(values) :
+            return "full"
+
+        @total.specialization['T': float]
+        def total(values) :
+            return math.fsum(values[:N])
+
+        self.total = total
+
+    # ---- ---- ---- ----
+
+    def test_registration_returns_the_template(self) :
+        self.assertTrue(isCallableTemplate(self.total))
+
+    def test_generic_declaration_when_no_match(self) :
+        self.assertEqual(self.total[2, int]([1, 2, 3]), 3)
+
+    def test_partial_specialization(self) :
+        self.assertEqual(self.total[0, str](["a"]), "")
+        self.assertEqual(self.total[3, float]([0.1] * 10), math.fsum([0.1] * 3))
+
+    def test_full_specialization_takes_precedence(self) :
+        self.assertEqual(self.total[2, float]([1.0]), "full")
+        self.assertEqual(self.total[2][float]([1.0]), "full")
+
+
+    def test_memoized_instantiations_are_forgotten(self) :
+        total = self.total
+        self.assertEqual(total[3, int]([1, 1, 1]), 3)
+
+        @total[3].specialization[int]
+        def total(values) :
+            return -N
+
+        self.assertEqual(total[3, int]([1, 1, 1]), -3)
+
+    # ---- Errors :
+
+    def test_TypeError__not_a_definition(self) :
+        with self.assertRaises(TypeError) :
+            self.total.specialization[1, int](print)
+
+
+class Test_CallableTemplate_CodeMetadata(unittest.TestCase) :
+
+    """
+    The code of an instantiation keeps the file and the lines of its
+    declaration, and is named after its template arguments, for tracebacks
+    and profilers.
+    """
+
+    def test_file_and_lines(self) :
+        line = sys._getframe().f_lineno + 1
+        with template['N': int] :
+            def cb(x) :
+                return x / N
+
+        frame_summary = raisingFrame(lambda : cb[0](1))
+
+        self.assertEqual(frame_summary.filename, __file__)
+        self.assertEqual(frame_summary.lineno, line + 2)
+        self.assertEqual(frame_summary.name, "cb[N=0]")
+        self.assertEqual(frame_summary.line, "return x / N")
+        # The columns of 'x / N' in this file.
+        self.assertEqual(frame_summary.colno, 23)
+        self.assertEqual(frame_summary.end_colno, 28)
+
+    def test_specialized_file_and_lines(self) :
+        line = sys._getframe().f_lineno + 1
+        with template['N': int](specialize=True) :
+            def cb(x) :
+                if N :
+                    return x
+                raise ValueError(N)
+
+        frame_summary = raisingFrame(lambda : cb[0](1))
+
+        self.assertEqual(frame_summary.filename, __file__)
+        self.assertEqual(frame_summary.lineno, line + 4)
+
+    def test_qualified_names(self) :
+        with template['N': int, 'T': type] :
+            def cb() :
+                ...
+
+        with template['T': type] :
+            class Box :
+                def get(self) :
+                    ...
+
+        self.assertEqual(cb[5, int].__qualname__, "cb[N=5, T=int]")
+        self.assertEqual(cb[5, int].__name__, "cb")
+        self.assertEqual(Box[str].__qualname__, "Box[T=str]")
+        self.assertEqual(Box[str].get.__qualname__, "Box[T=str].get")
+        self.assertEqual(cb[5, int].__code__.co_name, "cb[N=5, T=int]")
+        self.assertEqual(cb[5, int].__code__.co_qualname, "cb[N=5, T=int]")
+        self.assertEqual(Box[str].get.__code__.co_name, "get")
+        self.assertEqual(Box[str].get.__code__.co_qualname, "Box[T=str].get")
+
+    def test_nested_qualified_names(self) :
+        with template['N': int] :
+            class K :
+                class Inner :
+                    def im(self) :
+                        ...
+
+                    class Innermost :
+                        ...
+
+                def m(self) :
+                    ...
+
+        self.assertEqual(K[3].__qualname__, "K[N=3]")
+        self.assertEqual(K[3].m.__qualname__, "K[N=3].m")
+        self.assertEqual(K[3].Inner.__qualname__, "K[N=3].Inner")
+        self.assertEqual(K[3].Inner.im.__qualname__, "K[N=3].Inner.im")
+        self.assertEqual(K[3].Inner.Innermost.__qualname__, "K[N=3].Inner.Innermost")
+
+    def test_source_registered_with_linecache(self) :
+        # Declared from a source that isn't a file.
+        cb = CallableTemplate(
+            "cb",
+            "def cb() :\n    return 1 / N\n",
+            {"N": int},
+            globals(),
+            location=("<declaring>", 10),
+        )
+        self.addCleanup(linecache.cache.pop, "<declaring>", None)
+
+        frame_summary = raisingFrame(cb[0])
+
+        self.assertEqual(frame_summary.lineno, 12)
+        self.assertEqual(frame_summary.line, "return 1 / N")
+
+
+class Test_CallableTemplate_AsyncBuilding(unittest.TestCase) :
+
+    """
+    'await tmpl.build_async(key)' builds on an executor, and shares the
+    builds and the cache of 'tmpl[key]'.
+    """
+
+    def setUp(self) -> None :
+        class GlobScope :
+            with template['N': int, 'T': type] :
+                def cb(value) :
+                    return T(value) * N
+
+        self.cb = GlobScope.cb
+
+    # ---- ---- ---- ----
+
+    def test_same_cache_as_getitem(self) :
+        built = asyncio.run(self.cb.build_async((3, int)))
+
+        self.assertEqual(built("2"), 6)
+        self.assertIs(built, self.cb[3, int])
+        self.assertIs(asyncio.run(self.cb.build_async((slice('N', 3), slice('T', int)))), built)
+
+    def test_concurrent_awaiters_share_the_build(self) :
+        async def main() :
+            return await asyncio.gather(
+                *(self.cb.build_async((2, float)) for _ in range(10))
+            )
+
+        with mock.patch.object(
+            self.cb, "_notCached_build", wraps=self.cb._notCached_build
+        ) as not_cached_build :
+            built = asyncio.run(main())
+
+        self.assertEqual(not_cached_build.call_count, 1)
+        self.assertTrue(all(b is built[0] for b in built))
+
+    def test_event_loop_not_blocked(self) :
+        loop_ran = threading.Event()
+        not_cached_build = self.cb._notCached_build
+
+        def slow_build(build_args) :
+            # Only set by the event loop while the build runs.
+            self.assertTrue(loop_ran.wait(timeout=5))
+            return not_cached_build(build_args)
+
+        async def main() :
+            build = asyncio.ensure_future(self.cb.build_async((1, int)))
+            await asyncio.sleep(0)
+            loop_ran.set()
+            return await build
+
+        with mock.patch.object(self.cb, "_notCached_build", side_effect=slow_build) :
+            self.assertEqual(asyncio.run(main())(5), 5)
+
+    def test_cancelled_awaiter(self) :
+        async def main() :
+            cancelled = asyncio.ensure_future(self.cb.build_async((4, int)))
+            awaiter = asyncio.ensure_future(self.cb.build_async((4, int)))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            return await awaiter
+
+        self.assertIs(asyncio.run(main()), self.cb[4, int])
+
+    # ---- Errors :
+
+    def test_build_error_raised_to_every_awaiter(self) :
+        async def main() :
+            return await asyncio.gather(
+                *(self.cb.build_async((5, int)) for _ in range(3)),
+                return_exceptions=True,
+            )
+
+        with mock.patch.object(self.cb, "_notCached_build", side_effect=ValueError) :
+            errors = asyncio.run(main())
+
+        self.assertTrue(all(isinstance(err, ValueError) for err in errors))
+        self.assertEqual(self.cb._in_flight, {})
+        self.assertEqual(self.cb[5, int](1), 5)
@@ -0,0 +1,130 @@
+"""
+Tests of the persistent (on disk) cache of compiled templates.
+"""
+
+
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from template import template
+from code_cache import PersistentCodeCache, definitionStamp, stableRepr
+
+
+# ********************************** Tests *************************************
+
+class Test_PersistentCodeCache(unittest.TestCase) :
+
+    def setUp(self) -> None :
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.cache = PersistentCodeCache(tmp_dir.name)
+
+    def declare(self) :
+        cache = self.cache
+
+        class GlobScope :
+            with template['N': int, 'T': type](specialize=True, persistent_cache=cache) :
+                def cb() :
+                    return T(N)
+
+        return GlobScope.cb
+
+    # ---- ---- ---- ----
+
+    def test_compiled_code_is_stored(self) :
+        self.declare()[5, int]
+
+        # The declaration, and the specialized instantiation.
+        self.assertEqual(len(os.listdir(self.cache.directory)), 2)
+
+    def test_stored_code_is_reused(self) :
+        """
+        Once stored, the declaration is neither parsed nor compiled again.
+        """
+
+        self.declare()[5, int]
+
+        with (
+            mock.patch("ast.parse", side_effect=AssertionError),
+            mock.patch("callable_template.compile", create=True,
+                       side_effect=AssertionError),
+        ) :
+            cb = self.declare()
+            self.assertEqual(cb[5, int](), 5)
+
+    def test_new_template_arguments_are_stored(self) :
+        cb = self.declare()
+        cb[5, int]; cb[5, str]
+
+        self.assertEqual(len(os.listdir(self.cache.directory)), 3)
+
+    def test_changed_class_argument_is_compiled_again(self) :
+        """
+        Specialization folds 'issubclass(T, int)' with the class itself : the
+        stored code is not reused once the module of the class changes.
+        """
+
+        cache = self.cache
+
+        def declare() :
+            class GlobScope :
+                with template['T': type](specialize=True, persistent_cache=cache) :
+                    def cb() :
+                        if issubclass(T, int) :
+                            return "int-like"
+                        return "other"
+
+            return GlobScope.cb
+
+        module_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(module_dir.cleanup)
+        module_file = os.path.join(module_dir.name, "cb_argument_module.py")
+
+        def importFoo(source: str) :
+            with open(module_file, "w") as file :
+                file.write(source)
+            spec = importlib.util.spec_from_file_location("cb_argument_module", module_file)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules["cb_argument_module"] = module
+            spec.loader.exec_module(module)
+            return module.Foo
+
+        self.addCleanup(sys.modules.pop, "cb_argument_module", None)
+
+        self.assertEqual(declare()[importFoo("class Foo(int) : pass\n")](), "int-like")
+        self.assertEqual(declare()[importFoo("class Foo : pass # Changed\n")](), "other")
+
+    def test_different_sources_dont_share_entries(self) :
+        key = self.cache.key("def f() : return 1")
+        self.assertNotEqual(key, self.cache.key("def f() : return 2"))
+
+    def test_corrupted_entry_is_ignored(self) :
+        key = self.cache.key("corrupted")
+        self.cache.store(key, "value")
+        self.cache._path(key).write_bytes(b"\xff")
+
+        self.assertIsNone(self.cache.load(key))
+
+
+class Test_StableRepr(unittest.TestCase) :
+
+    def test_literals(self) :
+        self.assertEqual(stableRepr((1, "a", None)), "(1, 'a', None,)")
+
+    def test_classes(self) :
+        self.assertEqual(stableRepr(int), "<builtins.int>")
+
+    def test_no_stable_repr(self) :
+        class Local : ...
+
+        self.assertIsNone(stableRepr(object()))
+        self.assertIsNone(stableRepr(Local))
+
+    def test_definition_stamp(self) :
+        self.assertEqual(definitionStamp((1, "a")), "")
+        self.assertEqual(definitionStamp(int), "[]")
+        self.assertIn(__name__, definitionStamp(Test_StableRepr))
@@ -0,0 +1,327 @@
+"""
+Tests of the caches memoizing the instantiations of callable templates.
+"""
+
+
+import gc
+import sys
+import unittest
+import weakref
+from unittest import mock
+
+from template import template
+from instantiation_cache import (
+    LRUCache, UnboundedCache, TTLCache, MemoryBudget, MemoryBudgetCache,
+    WeakCache, approximate_size,
+)
+
+
+# ********************************** Tests *************************************
+
+class Test_CallableTemplate_Cache(unittest.TestCase) :
+
+    def test_each_template_has_its_own_cache(self) :
+        """
+        Instantiating a callable template doesn't affect the cache of another
+        callable template.
+        """
+
+        class GlobScope :
+            with template['N': int] :
+                def f() : ...
+
+            with template['N': int] :
+                def g() : ...
+
+        f, g = GlobScope.f, GlobScope.g
+        f[1]; f[1]; f[2]
+
+        self.assertEqual(f.cache_info()[:2], (1, 2))
+        self.assertEqual(g.cache_info()[:2], (0, 0))
+
+    def test_memoized_instantiation(self) :
+        class GlobScope :
+            with template['N': int] :
+                def f() : ...
+
+        f = GlobScope.f
+
+        self.assertIs(f[1], f[1])
+        self.assertEqual(f.cache_info().currsize, 1)
+
+    def test_cache_clear(self) :
+        class GlobScope :
+            with template['N': int] :
+                def f() : ...
+
+        f = GlobScope.f
+        built = f[1]
+        f.cache_clear()
+
+        self.assertEqual(f.cache_info()[:2], (0, 0))
+        self.assertIsNot(f[1], built)
+
+    def test_configured_cache(self) :
+        class GlobScope :
+            with template['N': int](cache=LRUCache(2)) :
+                def f() : ...
+
+        f = GlobScope.f
+        f[1]; f[2]; f[3]
+
+        self.assertEqual(f.cache_info().maxsize, 2)
+        self.assertEqual(f.cache_info().currsize, 2)
+
+
+class Test_CallableTemplate_FastLookup(unittest.TestCase) :
+
+    @classmethod
+    def setUpClass(cls) -> None:
+
+        class GlobScope :
+            with template['N': int, 'T': type] :
+                def cb() : ...
+
+        cls.GLOB_SCOPE = vars(GlobScope)
+
+    def setUp(self) -> None :
+        self.GLOB_SCOPE["cb"].cache_clear()
+
+    # ---- ---- ---- ----
+
+    def test_spellings_resolve_to_same_instantiation(self) :
+        """
+        Template arguments passed by position or by name resolve to the same
+        memoized instantiation.
+        """
+
+        cb = self.GLOB_SCOPE["cb"]
+
+        built = cb[5, int]
+        self.assertIs(cb[5, 'T': int], built)
+        self.assertIs(cb['N': 5, 'T': int], built)
+        self.assertIs(cb['T': int, 'N': 5], built)
+        self.assertEqual(cb.cache_info()[:2], (3, 1))
+
+    def test_aliases_are_forgotten_with_evicted_instantiation(self) :
+        class GlobScope :
+            with template['N': int](cache=LRUCache(1)) :
+                def f() : ...
+
+        f = GlobScope.f
+        f[1]; f['N': 1]; f[2]
+
+        self.assertEqual(len(f._aliases), 1)
+
+    def test_equal_template_arguments_of_different_types(self) :
+        """
+        Template arguments that are equal but of different types ('1 == 1.0
+        == True') build different instantiations.
+        """
+
+        class GlobScope :
+            with template['N': int, 'X': object] :
+                def cb_typed() :
+                    return N, X
+
+        cb_typed = GlobScope.cb_typed
+
+        self.assertIs(type(cb_typed[1, 1]()[0]), int)
+        self.assertIs(cb_typed[True, 1]()[0], True)
+        self.assertIs(type(cb_typed[1, 1.0]()[1]), float)
+        self.assertIs(cb_typed[1, 1], cb_typed[1, 1])
+        self.assertEqual(cb_typed.cache_info().currsize, 3)
+
+    def test_TypeError__equal_template_argument_of_wrong_type(self) :
+        """
+        A template argument equal to an already used one ('1.0 == 1') is still
+        checked against the type of the template parameter.
+        """
+
+        cb = self.GLOB_SCOPE["cb"]
+        cb[1, int]
+
+        with self.assertRaises(TypeError) :
+            cb[1.0, int]
+
+
+class Test_CallableTemplate_IdentityCache(unittest.TestCase) :
+
+    """
+    With 'identity_cache', instantiations for unhashable template arguments
+    are memoized by the identity of those arguments.
+    """
+
+    def test_unhashable_argument_built_once(self) :
+        class GlobScope :
+            with template['switcher': dict](identity_cache=True) :
+                def convertTo(name: str) :
+                    return switcher[name]
+
+        convertTo = GlobScope.convertTo
+        switcher = {"int": int}
+
+        with mock.patch.object(
+            convertTo, "_notCached_build", wraps=convertTo._notCached_build
+        ) as build :
+            self.assertIs(convertTo[switcher], convertTo[switcher])
+            self.assertIs(convertTo['switcher': switcher]("int"), int)
+            self.assertEqual(build.call_count, 1)
+
+            # Equal, but not the same object.
+            self.assertIsNot(convertTo[{"int": int}], convertTo[switcher])
+            self.assertEqual(build.call_count, 2)
+
+    def test_not_memoized_by_default(self) :
+        class GlobScope :
+            with template['switcher': dict] :
+                def convertTo(name: str) :
+                    return switcher[name]
+
+        switcher = {}
+        self.assertIsNot(GlobScope.convertTo[switcher], GlobScope.convertTo[switcher])
+
+    def test_captured_argument_kept_while_memoized(self) :
+        class Config :
+            __hash__ = None
+
+        class GlobScope :
+            with template['config': object](identity_cache=True, cache=LRUCache(1)) :
+                def cb() :
+                    return config
+
+        cb = GlobScope.cb
+        config = Config()
+        config_ref = weakref.ref(config)
+        self.assertIs(cb[config](), config)
+
+        del config
+        gc.collect()
+        self.assertIs(cb[config_ref()](), config_ref())
+        self.assertEqual(cb.cache_info().currsize, 1)
+
+        # Released once evicted.
+        cb[Config()]
+        gc.collect()
+        self.assertIsNone(config_ref())
+
+    def test_memoized_lookup_doesnt_hash(self) :
+        class GlobScope :
+            with template['table': dict, 'N': int](identity_cache=True) :
+                def cb() :
+                    return table, N
+
+        cb = GlobScope.cb
+        table = {}
+        built = cb[table, 1]
+
+        with mock.patch.object(
+            cb, "_computeBuildArgs", wraps=cb._computeBuildArgs
+        ) as compute :
+            self.assertIs(cb[table, 1], built)
+            self.assertEqual(compute.call_count, 0)
+            self.assertIsNot(cb[{}, 1], built)
+
+
+class Test_Cache_Policies(unittest.TestCase) :
+
+    def test_unbounded_cache(self) :
+        cache = UnboundedCache()
+        for i in range(1000) :
+            cache.put(i, str(i))
+
+        self.assertEqual(len(cache), 1000)
+        self.assertEqual(cache.get(0), "0")
+
+    def test_lru_cache_evicts_least_recently_used(self) :
+        cache = LRUCache(2)
+        cache.put(1, "1")
+        cache.put(2, "2")
+        cache.get(1)
+        cache.put(3, "3")
+
+        self.assertEqual(cache.get(1), "1")
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.info(), (2, 1, 2, 2))
+
+    def test_ttl_cache_expires_entries(self) :
+        with mock.patch("instantiation_cache.monotonic", return_value=0.) as now :
+            cache = TTLCache(10)
+            cache.put(1, "1")
+            now.return_value = 5.
+            self.assertEqual(cache.get(1), "1")
+            now.return_value = 10.
+            self.assertIsNone(cache.get(1))
+
+    def test_memory_budget_is_shared(self) :
+        budget = MemoryBudget(1)
+        first, second = MemoryBudgetCache(budget), MemoryBudgetCache(budget)
+        first.put(1, object())
+        second.put(1, object())
+
+        # The budget is exceeded : only the most recent instantiation is kept.
+        self.assertEqual((len(first), len(second)), (0, 1))
+
+    def test_weak_cache_releases_dynamically_created_class(self) :
+        """
+        A class created at runtime and used as a template argument can be
+        garbage collected once its instantiations are released.
+        """
+
+        class GlobScope :
+            with template['T': type](cache=WeakCache()) :
+                def make(*args) :
+                    return T(*args)
+
+        make = GlobScope.make
+        Model = type("Model", (), {"__init__": lambda self, x : None})
+        model_ref = weakref.ref(Model)
+
+        instantiation = make[Model]
+        self.assertIs(make['T': Model], instantiation)
+        self.assertIsInstance(instantiation(1), Model)
+        self.assertEqual(make.cache_info().currsize, 1)
+
+        del Model, instantiation
+        gc.collect()
+
+        self.assertIsNone(model_ref())
+        self.assertEqual(make.cache_info().currsize, 0)
+
+    def test_weak_cache_drops_instantiation_when_argument_dies(self) :
+        class GlobScope :
+            with template['tenant': object, 'N': int](cache=WeakCache()) :
+                def cb() :
+                    # 'tenant' isn't captured by the instantiation.
+                    return N
+
+        class Tenant : ...
+
+        cb = GlobScope.cb
+        tenant = Tenant()
+        instantiation = cb[tenant, 1]
+        self.assertEqual(cb.cache_info().currsize, 1)
+
+        del tenant
+        gc.collect()
+        self.assertEqual(cb.cache_info().currsize, 0)
+        self.assertEqual(instantiation(), 1)
+
+    def test_approximate_size_counts_the_code(self) :
+        with template['N': int] :
+            def cb() :
+                return N
+
+        instantiation = cb[1]
+
+        # Each instantiation has its own code, named after it.
+        self.assertGreaterEqual(
+            approximate_size(instantiation),
+            sys.getsizeof(instantiation) + sys.getsizeof(instantiation.__code__),
+        )
+
+    def test_ValueError__invalid_cache_size(self) :
+        with self.assertRaises(ValueError) :
+            LRUCache(0)
+        with self.assertRaises(ValueError) :
+            TTLCache(0)
@@ -0,0 +1,157 @@
+"""
+Tests of the profiling of the calls of instantiations ('profiling').
+"""
+
+
+import cProfile
+import pstats
+import sys
+import time
+import unittest
+
+import profiling
+from template import template
+
+
+# ********************************** Tests *************************************
+
+class Test_Profiling(unittest.TestCase) :
+
+    def setUp(self) -> None :
+        profiling.enable()
+        self.addCleanup(profiling.reset)
+        self.addCleanup(profiling.disable)
+
+    def entries(self, cb_template) -> dict :
+        return {
+            entry["arguments"] : entry
+            for entry in profiling.top(None)
+            if entry["template"] == cb_template._name
+        }
+
+    # ---- ---- ---- ----
+
+    def test_calls_per_instantiation(self) :
+        with template['N': int] :
+            def cb_calls(x) :
+                return x * N
+
+        for _ in range(3) :
+            cb_calls[2](1)
+        cb_calls[5](1)
+
+        entries = self.entries(cb_calls)
+
+        self.assertEqual(entries["N=2"]["calls"], 3)
+        self.assertEqual(entries["N=5"]["calls"], 1)
+        self.assertGreater(entries["N=2"]["time"], 0)
+        self.assertEqual(entries["N=2"]["module"], __name__)
+
+    def test_instantiations_built_before_enabling(self) :
+        profiling.disable()
+
+        @template['T': type]
+        def cb_before(x) :
+            return T(x)
+
+        cb_before[int]("1")
+        profiling.enable()
+        cb_before[int]("1")
+
+        self.assertEqual(self.entries(cb_before)["T=int"]["calls"], 1)
+        # Their code is named after the template arguments once profiled.
+        self.assertEqual(cb_before[int].__code__.co_name, "cb_before[T=int]")
+
+    def test_class_instantiation(self) :
+        with template['T': type] :
+            class CbBox :
+                def __init__(self, value) :
+                    self.value = T(value)
+
+                def get(self) :
+                    return self.value
+
+        CbBox[int]("1").get()
+
+        self.assertEqual(self.entries(CbBox)["T=int"]["calls"], 2)
+
+    def test_raising_and_generator_calls(self) :
+        with template['N': int] :
+            def cb_gen() :
+                yield from range(N)
+                raise ValueError
+
+        with self.assertRaises(ValueError) :
+            list(cb_gen[3]())
+
+        self.assertEqual(self.entries(cb_gen)["N=3"]["calls"], 1)
+
+    def test_closed_and_thrown_into_generators(self) :
+        """
+        Closing (or throwing into) a generator resumes it : the time of the
+        calling frame isn't attributed to it.
+        """
+
+        with template['N': int] :
+            def cb_inner() :
+                try :
+                    yield N
+                except ValueError :
+                    yield -N
+
+        with template['N': int] :
+            def cb_outer() :
+                gen = cb_inner[N]()
+                next(gen)
+                gen.throw(ValueError)
+                gen.close()
+                cb_inner[N]().close()
+                time.sleep(0.05)
+
+        cb_outer[3]()
+
+        outer = self.entries(cb_outer)["N=3"]
+        inner = self.entries(cb_inner)["N=3"]
+        self.assertGreaterEqual(outer["time"], 0.05)
+        self.assertLess(inner["time"], 0.05)
+
+    def test_top(self) :
+        with template['N': int] :
+            def cb_top() :
+                return N
+
+        for n in range(3) :
+            for _ in range(n + 1) :
+                cb_top[n]()
+
+        top = [entry["arguments"] for entry in profiling.top(2, sort_by="calls")]
+
+        self.assertEqual(top, ["N=2", "N=1"])
+
+    def test_disabled(self) :
+        profiling.disable()
+
+        self.assertFalse(profiling.is_enabled())
+        self.assertEqual(sys.monitoring.get_tool(sys.monitoring.PROFILER_ID), None)
+
+    def test_with_cProfile(self) :
+        with template['N': int] :
+            def cb_cprofile() :
+                return N
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try :
+            cb_cprofile[1]()
+        finally :
+            profiler.disable()
+
+        self.assertEqual(self.entries(cb_cprofile)["N=1"]["calls"], 1)
+        self.assertIn(
+            "cb_cprofile[N=1]",
+            {name for _, _, name in pstats.Stats(profiler).stats},
+        )
+
+
+if __name__ == "__main__" :
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Tests of the registry of the callable templates declared ('registry').
+"""
+
+
+import gc
+import io
+import json
+import sys
+import unittest
+import weakref
+
+import registry
+from template import template
+from instantiation_cache import LRUCache
+
+
+# ********************************** Utils *************************************
+
+def _entry(cb_template) -> dict :
+    (entry,) = [
+        entry for entry in registry.report()
+        if entry["line"] == registry.templates()[cb_template].line
+        and entry["filename"] == __file__
+        and entry["name"] == cb_template._name
+    ]
+    return entry
+
+
+# ********************************** Tests *************************************
+
+class Test_Registry(unittest.TestCase) :
+
+    def test_declaration_location(self) :
+        line = sys._getframe().f_lineno + 1
+        with template['N': int] :
+            def cb() :
+                return N
+
+        declaration = registry.templates()[cb]
+
+        self.assertEqual(declaration, registry.Declaration(__name__, __file__, line))
+
+    def test_decorated_template(self) :
+        line = sys._getframe().f_lineno + 1
+        @template['N': int]
+        def cb() :
+            return N
+
+        self.assertEqual(
+            registry.templates()[cb], registry.Declaration(__name__, __file__, line)
+        )
+
+    def test_build_statistics(self) :
+        with template['N': int, 'T': type](specialize=True) :
+            def cb(x) :
+                return T(x) * N
+
+        cb[2, int], cb[2, int], cb[3, float]
+        entry = _entry(cb)
+
+        self.assertEqual(entry["instantiations"], 2)
+        self.assertEqual(entry["builds"], 2)
+        self.assertEqual((entry["hits"], entry["misses"]), (1, 2))
+        self.assertGreater(entry["memory"], 0)
+        self.assertGreater(entry["parse_time"], 0)
+        self.assertGreater(entry["compile_time"], 0)
+        self.assertGreater(entry["exec_time"], 0)
+        self.assertGreater(entry["declaration_time"], 0)
+        self.assertEqual(
+            set(entry["build_times"]),
+            {"N=2, T=int", "N=3, T=float"},
+        )
+        self.assertEqual(
+            set(entry["build_times"]["N=2, T=int"]),
+            {"parse", "compile", "exec"},
+        )
+
+    def test_evicted_instantiations_are_forgotten(self) :
+        with template['N': int](cache=LRUCache(1)) :
+            def cb() :
+                return N
+
+        cb[1], cb[2]
+
+        self.assertEqual(list(_entry(cb)["build_times"]), ["N=2"])
+
+        cb.cache_clear()
+
+        self.assertEqual(_entry(cb)["build_times"], {})
+
+    def test_json_dump(self) :
+        with template['N': int] :
+            def cb() :
+                return N
+        cb[1]
+
+        file = io.StringIO()
+        dumped = registry.dump(file, sort_by="compile_time")
+
+        self.assertEqual(file.getvalue(), dumped)
+        self.assertIn(_entry(cb), json.loads(dumped))
+
+    def test_not_kept_alive(self) :
+        def declare() :
+            with template['N': int] :
+                def cb() :
+                    return N
+            return weakref.ref(cb)
+
+        cb_ref = declare()
+        gc.collect()
+
+        self.assertIsNone(cb_ref())
+
+
+if __name__ == "__main__" :
+    unittest.main()
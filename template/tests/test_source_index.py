@@ -0,0 +1,79 @@
+"""
+Tests of the index of source files used to get the with blocks.
+"""
+
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from template import template
+from utils import source_index
+
+
+# ********************************** Tests *************************************
+
+class Test_SourceIndex(unittest.TestCase) :
+
+    def setUp(self) -> None :
+        source_index.clear()
+        self.addCleanup(source_index.clear)
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.filename = os.path.join(tmp_dir.name, "module.py")
+        self.write("a = 1\n", mtime=1_000_000)
+
+    def write(self, source: str, mtime: int) -> None :
+        with open(self.filename, "w") as file :
+            file.write(source)
+        os.utime(self.filename, (mtime, mtime))
+
+    # ---- ---- ---- ----
+
+    def test_file_read_once(self) :
+        with mock.patch.object(
+            source_index, "_read", wraps=source_index._read
+        ) as read :
+            for _ in range(3) :
+                self.assertEqual(source_index.getLines(self.filename), ["a = 1\n"])
+
+        self.assertEqual(read.call_count, 1)
+
+    def test_file_read_again_when_modified(self) :
+        source_index.getLines(self.filename)
+        self.write("a = 2\n", mtime=2_000_000)
+
+        self.assertEqual(source_index.getLines(self.filename), ["a = 2\n"])
+
+    def test_no_source(self) :
+        with self.assertRaises(OSError) :
+            source_index.getLines("<no source>")
+
+    def test_positions_of_a_code_object(self) :
+        code = compile("a = 1\nb = 2\n", self.filename, "exec")
+        positions = list(code.co_positions())
+
+        for offset in range(0, 2 * len(positions), 2) :
+            self.assertEqual(
+                source_index.getPosition(code, offset), positions[offset // 2]
+            )
+
+    def test_declarations_share_the_file(self) :
+        source_index.clear()
+        with mock.patch.object(
+            source_index, "_read", wraps=source_index._read
+        ) as read :
+            class GlobScope :
+                with template['N': int] :
+                    def cb1() :
+                        return N
+
+                with template['N': int] :
+                    def cb2() :
+                        return -N
+
+        self.assertEqual(read.call_count, 1)
+        self.assertEqual(GlobScope.cb1[5](), 5)
+        self.assertEqual(GlobScope.cb2[5](), -5)
@@ -0,0 +1,194 @@
+"""
+Tests of the specialization of template arguments into the code of the
+instantiations (opt-in : 'template[...](specialize=True)').
+"""
+
+
+import ast
+import unittest
+from unittest import mock
+
+from template import template
+from specialization import specialize
+
+
+# ********************************** Utils *************************************
+
+# Shadowed by a local variable of the template below ('test_dead_local_name').
+dead_local = "global"
+
+
+def specialized_source(source: str, **template_args) -> str :
+    return ast.unparse(specialize(ast.parse(source), template_args, {}))
+
+
+# ********************************** Tests *************************************
+
+class Test_Specialized_Instantiation(unittest.TestCase) :
+
+    @classmethod
+    def setUpClass(cls) -> None:
+
+        class GlobScope :
+            with template['N': int, 'T': type](specialize=True) :
+                def repeat(x) :
+                    acc = T()
+                    for _ in range(N) :
+                        acc += x
+                    if T is int :
+                        return -acc
+                    return acc
+
+        cls.GLOB_SCOPE = vars(GlobScope)
+
+    # ---- ---- ---- ----
+
+    def test_specialized_instantiation_result(self) :
+        repeat = self.GLOB_SCOPE["repeat"]
+
+        self.assertEqual(repeat[3, int](2), -6)
+        self.assertEqual(repeat[3, str]('a'), "aaa")
+        self.assertEqual(repeat[20, int](1), -20)
+
+    def test_template_arguments_are_constants(self) :
+        """
+        Literal template arguments aren't looked up as globals anymore and the
+        branches depending on template arguments are folded.
+        """
+
+        code = self.GLOB_SCOPE["repeat"][3, int].__code__
+
+        self.assertNotIn('N', code.co_names)
+        self.assertNotIn('T', code.co_names)
+
+    def test_partially_specialized_instantiation(self) :
+        repeat = self.GLOB_SCOPE["repeat"]
+
+        self.assertEqual(repeat[3][int](2), -6)
+        self.assertEqual(repeat['T': str][2]('a'), "aa")
+
+    def test_batch_instantiation(self) :
+        repeat = self.GLOB_SCOPE["repeat"]
+        repeat.cache_clear()
+
+        with mock.patch("callable_template.compile", wraps=compile) as compile_ :
+            built = repeat.instantiate_batch(
+                [(n, int) for n in range(10)] + [(slice('T', str), slice('N', 2))]
+            )
+
+        self.assertEqual(compile_.call_count, 1)
+        self.assertEqual(list(built), [(n, int) for n in range(10)] + [(2, str)])
+        self.assertEqual(built[4, int](2), -8)
+        self.assertEqual(built[2, str]('a'), "aa")
+        # Memoized, as built one by one.
+        self.assertIs(repeat[4, int], built[4, int])
+        self.assertIs(repeat['T': str, 'N': 2], built[2, str])
+
+    def test_batched_identical_bodies_qualified_names(self) :
+        """
+        Equal code objects of the batch are merged by the compiler, whatever
+        the factory defining them.
+        """
+
+        with template['N': int, 'T': type](specialize=True) :
+            def sp() :
+                return N
+
+        with template['N': int, 'T': type](specialize=True) :
+            class Box :
+                class Inner :
+                    ...
+
+        sp_built = sp.instantiate_batch([(1, int), (1, float)])
+        box_built = Box.instantiate_batch([(1, int), (1, float)])
+
+        for qualname, instantiation in (
+            ("sp[N=1, T=int]", sp_built[1, int]),
+            ("sp[N=1, T=float]", sp_built[1, float]),
+        ) :
+            self.assertEqual(instantiation.__qualname__, qualname)
+            self.assertEqual(instantiation.__code__.co_qualname, qualname)
+        self.assertEqual(box_built[1, float].Inner.__qualname__, "Box[N=1, T=float].Inner")
+
+    def test_dead_yield(self) :
+        """Removing the only 'yield' doesn't make a function of a generator."""
+
+        with template['N': int](specialize=True) :
+            def cb_dead_yield() :
+                for i in range(N) :
+                    yield i
+
+        self.assertEqual(list(cb_dead_yield[0]()), [])
+        self.assertEqual(list(cb_dead_yield[2]()), [0, 1])
+
+    def test_dead_local_name(self) :
+        """A name bound only in dead code is still a local variable."""
+
+        with template['N': int](specialize=True) :
+            def cb_dead_local() :
+                if N > 5 :
+                    dead_local = 1
+                return dead_local
+
+        self.assertEqual(cb_dead_local[6](), 1)
+        with self.assertRaises(UnboundLocalError) :
+            cb_dead_local[1]()
+
+
+class Test_Specialize(unittest.TestCase) :
+
+    def test_constant_folding(self) :
+        self.assertEqual(
+            specialized_source("x = N * 2 + abs(M)", N=3, M=-2),
+            "x = 8",
+        )
+
+    def test_dead_branch_removal(self) :
+        self.assertEqual(
+            specialized_source(
+                "if T is int :\n    x = 1\nelse :\n    x = 2", T=str,
+            ),
+            "x = 2",
+        )
+
+    def test_loop_unrolling(self) :
+        self.assertEqual(
+            specialized_source("for i in range(N) :\n    f(i)", N=2),
+            "i = 0\nf(i)\ni = 1\nf(i)",
+        )
+
+    def test_no_unrolling_when_breaking(self) :
+        source = "for i in range(2) :\n    if f(i) :\n        break"
+        self.assertEqual(specialized_source(source), source.replace(" :", ":"))
+
+    def test_shadowed_template_parameter(self) :
+        """
+        A template parameter shadowed by a local variable isn't substituted.
+        """
+
+        self.assertEqual(
+            specialized_source("def f(N) :\n    return N\ng = N", N=1),
+            "def f(N):\n    return N\ng = 1",
+        )
+
+    def test_dead_code_scope(self) :
+        self.assertEqual(
+            specialized_source(
+                "def f() :\n    if N :\n        global x\n        y = 1\n    x = 2",
+                N=0,
+            ),
+            "def f():\n    if False:\n        global x\n        y = None\n    x = 2",
+        )
+
+    def test_unbounded_folding(self) :
+        """Operations with results too large to be constants aren't evaluated."""
+
+        for source in ("x = '-' * N", "x = N ** N", "x = 1 << N", "x = tuple(R)") :
+            with self.subTest(source=source) :
+                self.assertEqual(
+                    specialized_source(source, N=10**9, R=range(10**12)),
+                    source.replace("N", "1000000000"),
+                )
+
+    def test_non_literal_argument_isnt_substituted(self) :
+        self.assertEqual(specialized_source("x = T", T=int), "x = T")
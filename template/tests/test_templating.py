@@ -3,10 +3,17 @@ Tests asserting that the process of templating works as intended.
 """
 
 
+import gc
+import sys
 import unittest
+import weakref
+from types import FunctionType
+from unittest import mock
 
+import template as template_module
 from template import template
 from callable_template import CallableTemplate
+from instantiation_cache import LRUCache
 
 
 # ********************************** Utils *************************************
@@ -14,6 +21,10 @@ from callable_template import CallableTemplate
 def isCallableTemplate(obj: object) -> bool :
     return isinstance(obj, CallableTemplate)
 
+def ignoring(values) :
+    # Decorator factory whose arguments are ignored.
+    return lambda func : func
+
 
 # ********************************** Tests *************************************
 
@@ -66,9 +77,9 @@ class Test_Template_ScopeInsertion(unittest.TestCase) :
     Templating a callable 'Cb' in a scope 'S' result in a callable template
     bound to the name 'Cb' in the scope 'S'.
     However, altering 'S' is sometime impossible, in funtion for example.
-    In this case, the callable template is bound to the name 'Cb'
-    in the global scope and deleted once 'S' is closed in order to simulate
-    an insertion inside 'S'.
+    In this case, the callable template is bound by the trace function
+    skipping the with block, as 'frame.f_locals' is written back to the
+    locals of the function after it returns.
     """
 
     def test_globalscope_insertion(self) :
@@ -111,10 +122,8 @@ class Test_Template_ScopeInsertion(unittest.TestCase) :
         the resulting callable template must only be accessible in the function.
         Therefore, modifying the local scope of the function at runtime
         via the frame of the call should do the trick.
-        Howerver, the locals of a function's call frame is read-only.
-
-        The solution choosen is to add the callable template to the global scope
-        and remove it once the function has returned.
+        Howerver, the locals of a function's call frame is read-only, except
+        from a trace function (until PEP 667).
         """
 
         def f() :
@@ -130,6 +139,156 @@ class Test_Template_ScopeInsertion(unittest.TestCase) :
         )
 
 
+class Test_Template_LocalDeclaration(unittest.TestCase) :
+
+    """
+    The declaration of a template declared in a function is looked up,
+    parsed and compiled on the first call of the function only.
+    """
+
+    def test_declared_once_per_location(self) :
+        def f(n) :
+            with template['N': int] :
+                def cb(x) :
+                    return x * N
+
+            return cb[n]
+
+        with mock.patch.object(
+            template_module, "_withBlock", wraps=template_module._withBlock
+        ) as with_block :
+            self.assertEqual([f(n)(2) for n in range(3)], [0, 2, 4])
+
+        self.assertEqual(with_block.call_count, 1)
+
+    def test_specialized_code_shared_by_the_calls(self) :
+        def f() :
+            with template['N': int](specialize=True) :
+                def cb() :
+                    return N
+
+            return cb
+
+        f()[1]
+        with mock.patch("callable_template.compile", create=True, wraps=compile) as compile_ :
+            self.assertEqual(f()[1](), 1)
+
+        self.assertEqual(compile_.call_count, 0)
+
+    def test_template_used_by_a_closure(self) :
+        def f() :
+            with template['N': int] :
+                def cb() :
+                    return N
+
+            return lambda n : cb[n]()
+
+        self.assertEqual(f()(5), 5)
+
+    def test_free_variables(self) :
+        """
+        The variables of the declaring function used by the declaration are
+        read when the template is declared.
+        """
+
+        def f(k, specialize) :
+            with template['N': int](specialize=specialize) :
+                class CbAdd :
+                    def add(self) :
+                        return k + N
+
+            k = None
+            return CbAdd
+
+        for specialize in (False, True) :
+            with self.subTest(specialize=specialize) :
+                self.assertEqual(f(1, specialize)[2]().add(), 3)
+                self.assertEqual(f(10, specialize)[2]().add(), 12)
+
+    def test_variables_used_before_the_definition(self) :
+        """Decorators, default arguments and base classes are read as well."""
+
+        def f(scale, lazy) :
+            def deco(func) :
+                func.decorated = True
+                return func
+
+            base = type("Base", (), {"scale": scale})
+            with template['N': int](lazy=lazy) :
+                @deco
+                def cb(x=[scale for _ in range(2)]) :
+                    return N * sum(x)
+
+            with template['N': int](lazy=lazy) :
+                class CbBox(base) :
+                    size = N
+
+            class GlobScope :
+                with template['N': int](lazy=lazy) :
+                    @deco
+                    def cb_method(self) :
+                        return N
+
+            return cb, CbBox, GlobScope.cb_method
+
+        for lazy in (False, True) :
+            with self.subTest(lazy=lazy) :
+                cb, box, cb_method = f(3, lazy)
+                self.assertEqual(cb[2](), 12)
+                self.assertTrue(cb[2].decorated)
+                self.assertEqual(box[1].scale, 3)
+                self.assertTrue(cb_method[1].decorated)
+
+    def test_declarations_dropped_with_the_declaring_code(self) :
+        def f() :
+            with template['N': int] :
+                def cb() :
+                    return N
+
+            return cb
+
+        # Another code object, for the same source.
+        code = f.__code__.replace(co_name="f_copy")
+        self.assertEqual(FunctionType(code, globals())()[1](), 1)
+        self.assertIn(code, template_module._LOCAL_DECLARATIONS)
+
+        code_ref = weakref.ref(code)
+        del code
+        gc.collect()
+
+        self.assertIsNone(code_ref())
+
+    def test_shared_specialized_codes_are_bounded(self) :
+        def f() :
+            with template['N': int](specialize=True, cache=LRUCache(2)) :
+                def cb() :
+                    return N
+
+            return cb
+
+        cb = f()
+        for n in range(5) :
+            cb[n]
+
+        self.assertEqual(len(cb._generated.instantiations), 2)
+
+    # ---- Errors :
+
+    def test_NameError__free_variable_bound_after_the_declaration(self) :
+        def f() :
+            with template['N': int] :
+                def cb() :
+                    return helper(N)
+
+            def helper(n) :
+                return n
+
+            return cb
+
+        with self.assertRaises(NameError) :
+            f()
+
+
 class Test_CallableTemplate_Declaration(unittest.TestCase) :
 
     def test_function_template_declaration(self) :
@@ -186,6 +345,25 @@ class Test_CallableTemplate_Declaration(unittest.TestCase) :
             and isCallableTemplate(C.meth)
         )
 
+    def test_recursive_class_template(self) :
+        """The body of a class template can refer to its own template."""
+
+        class GlobScope :
+            with template['N': int] :
+                class Fact :
+                    value = N * Fact[N - 1].value if N else 1
+
+            with template['N': int](specialize=True) :
+                class SpecializedFact :
+                    value = N * SpecializedFact[N - 1].value if N else 1
+
+        self.assertEqual(GlobScope.Fact[5].value, 120)
+        self.assertEqual(GlobScope.SpecializedFact[5].value, 120)
+        # Built in turn, or apart when needed before their turn.
+        batch = GlobScope.SpecializedFact.instantiate_batch([(6,), (7,), (9,), (8,)])
+        self.assertEqual(batch[(7,)].value, 5040)
+        self.assertEqual(batch[(9,)].value, 362880)
+
     # ---- BONUS :
 
     def test_BONUS__support_parameterised_decoraors(self) :
@@ -242,7 +420,258 @@ class Test_CallableTemplate_Declaration(unittest.TestCase) :
                 a = ...
 
 
-# TODO : Once `test_function_localscope_insertion` pass, removing 'GlobScope' as those features aren't specific to the global scope features.
+class Test_Template_Tracing(unittest.TestCase) :
+
+    """
+    The with block of 'template' is skipped with the help of a trace function,
+    which must not outlive the declaration.
+    """
+
+    def test_no_trace_function_left(self) :
+        previous_trace = sys.gettrace()
+        sys.settrace(None)
+        try :
+            class GlobScope :
+                with template['param'] :
+                    def cb() :
+                        ...
+
+            self.assertIsNone(sys.gettrace())
+        finally :
+            sys.settrace(previous_trace)
+
+    def test_existing_trace_function_is_restored(self) :
+        """
+        Debuggers and coverage tools keep tracing after a declaration.
+        """
+
+        events = []
+        def tracer(frame, event, arg) :
+            events.append(event)
+
+        previous_trace = sys.gettrace()
+        sys.settrace(tracer)
+        try :
+            class GlobScope :
+                with template['param'] :
+                    def cb() :
+                        ...
+
+            trace = sys.gettrace()
+        finally :
+            sys.settrace(previous_trace)
+
+        self.assertIs(trace, tracer)
+
+
+class Test_Template_Decorator(unittest.TestCase) :
+
+    """
+    Callable templates can be declared by decorating a function (or a class) :
+    >>> @template['N': int, 'T': type]
+    ... def cb() : ...
+
+    The instantiations share the code of the decorated definition, thus its
+    source isn't needed.
+    """
+
+    def test_function_template(self) :
+        @template['N': int, 'T': type]
+        def cb(value=1) :
+            return T(value) * N
+
+        self.assertTrue(isCallableTemplate(cb))
+        self.assertEqual(cb[3, str](), "111")
+        self.assertEqual(cb['T': float, 'N': 2](value=4), 8.0)
+        self.assertIs(cb[3, str].__globals__, globals())
+        self.assertEqual(
+            cb[3, str].__qualname__, cb._prototype.__qualname__ + "[N=3, T=str]"
+        )
+
+    def test_unsupported_bytecode_version(self) :
+        # The template arguments are then looked up in a namespace.
+        @template['N': int, 'T': type]
+        def cb(value=1) :
+            return T(value) * N
+
+        with mock.patch("utils.bytecode._SUPPORTED", False) :
+            instantiation = cb[3, str]
+
+        self.assertEqual(instantiation(), "111")
+        self.assertIsNot(instantiation.__globals__, globals())
+
+    def test_async_function_template(self) :
+        import asyncio
+
+        @template['N': int]
+        async def cb() :
+            return N
+
+        self.assertEqual(asyncio.run(cb[5]()), 5)
+
+    def test_class_template(self) :
+        class Base :
+            def size(self) :
+                return 1
+
+        @template['N': int]
+        class C(Base) :
+            __slots__ = ("value",)
+
+            def __init__(self) :
+                self.value = N
+
+            def size(self) :
+                return super().size() + N
+
+            @staticmethod
+            def n() :
+                return N
+
+            @property
+            def double(self) :
+                return 2 * N
+
+        C5 = C[5]
+        c = C5()
+        self.assertEqual((c.value, c.size(), C5.n(), c.double), (5, 6, 5, 10))
+        self.assertIsInstance(c, Base)
+        self.assertIsNot(C[5], C[6])
+        self.assertEqual(C[6]().size(), 7)
+
+    def test_partial_build(self) :
+        @template['N': int, 'T': type]
+        def cb() :
+            return T(N)
+
+        self.assertEqual(cb['T': str][5](), "5")
+
+    def test_no_source_needed(self) :
+        namespace = {}
+        exec("def cb() :\n    return N + 1", namespace)
+
+        cb = template['N': int](namespace["cb"])
+        self.assertEqual(cb[1](), 2)
+
+    def test_template_parameter_assigned_as_global(self) :
+        @template['N': int]
+        def cb() :
+            global N
+            N = N + 1
+            return N
+
+        counter = cb[1]
+        self.assertEqual((counter(), counter()), (2, 3))
+        self.assertEqual(cb[5](), 6)
+
+    def test_options(self) :
+        @template['N': int](cache=LRUCache(1))
+        def cb() :
+            return N
+
+        self.assertEqual((cb[1](), cb[2]()), (1, 2))
+        self.assertEqual(cb.cache_info().currsize, 1)
+
+    # ---- Errors :
+
+    def test_ValueError__specialize(self) :
+        with self.assertRaises(ValueError) :
+            @template['N': int](specialize=True)
+            def cb() :
+                return N
+
+    def test_TypeError__not_a_definition(self) :
+        with self.assertRaises(TypeError) :
+            template['N': int](print)
+
+
+class Test_Template_LazyDeclaration(unittest.TestCase) :
+
+    """
+    With 'lazy', only the location of the with block is recorded when
+    declaring the template. The with block is looked up, validated and
+    compiled on the first build.
+    """
+
+    def test_with_block_looked_up_on_first_build(self) :
+        with mock.patch.object(
+            template_module, "_withBlock", wraps=template_module._withBlock
+        ) as with_block :
+            class GlobScope :
+                with template['N': int, 'T': type](lazy=True) :
+                    def cb(value=1) :
+                        return T(value) * N
+
+            cb = GlobScope.cb
+            self.assertTrue(isCallableTemplate(cb))
+            self.assertEqual(with_block.call_count, 0)
+
+            self.assertEqual(cb[3, str](), "111")
+            self.assertEqual(cb[2][float](4), 8.0)
+            self.assertEqual(with_block.call_count, 1)
+
+    def test_specialized_lazy_declaration(self) :
+        class GlobScope :
+            with template['N': int](lazy=True, specialize=True) :
+                class C :
+                    size = N
+
+        self.assertEqual(GlobScope.C[4].size, 4)
+
+    def test_captured_lazy_declaration(self) :
+        """The name of the template is a cell variable of the function."""
+
+        def declaring() :
+            with template['N': int](lazy=True) :
+                def cb() :
+                    return N
+
+            return lambda : cb[2]()
+
+        self.assertEqual(declaring()(), 2)
+
+    def test_assignment_expressions_before_the_definition(self) :
+        class GlobScope :
+            with template['N': int](lazy=True) :
+                @(x := lambda func : func)
+                def cb(value=(y := 2)) :
+                    return N * value
+
+        self.assertEqual(GlobScope.cb[3](), 6)
+        self.assertNotIn("x", vars(GlobScope))
+
+    def test_comprehensions_before_the_definition(self) :
+        """Inlined comprehensions store their variables as fast locals."""
+
+        class GlobScope :
+            with template['N': int](lazy=True) :
+                @ignoring([i for i in range(2)])
+                def cb() :
+                    return N
+
+        def declaring() :
+            with template['N': int](lazy=True) :
+                @ignoring([(a, b) for a, b in [(1, 2)] if [c for c in (a, b)]])
+                def cb(x=[j for j in range(2)]) :
+                    return N + len(x)
+
+            return cb
+
+        self.assertEqual(GlobScope.cb[3](), 3)
+        self.assertNotIn("i", vars(GlobScope))
+        self.assertEqual(declaring()[3](), 5)
+
+    # ---- Errors :
+
+    def test_SyntaxError__raised_on_first_build(self) :
+        class GlobScope :
+            with template['N': int](lazy=True) :
+                x = N
+
+        with self.assertRaises(SyntaxError) :
+            GlobScope.x[1]
+
+
 class Test_Template_Nesting(unittest.TestCase) :
 
     def test_nesting_in_class_template(self) :
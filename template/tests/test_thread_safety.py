@@ -0,0 +1,98 @@
+"""
+Tests of callable templates used concurrently from several threads.
+"""
+
+
+import threading
+import time
+import unittest
+
+from template import template
+
+
+# ********************************** Utils *************************************
+
+BUILDS = []
+
+def count_build(cb) :
+    # Runs each time the declaration is executed, i.e. for each build.
+    BUILDS.append(cb)
+    # Widens the window in which concurrent builds could happen.
+    time.sleep(0.01)
+    return cb
+
+
+def hammer(cb, keys, nb_threads: int = 16, nb_lookups: int = 50) -> list :
+    """Looks 'keys' up from 'nb_threads' threads started at the same time."""
+
+    barrier = threading.Barrier(nb_threads)
+    results = [[] for _ in range(nb_threads)]
+
+    def lookup(results) :
+        barrier.wait()
+        for i in range(nb_lookups) :
+            results.append(cb[keys[i % len(keys)]])
+
+    threads = [
+        threading.Thread(target=lookup, args=(results[i],))
+        for i in range(nb_threads)
+    ]
+    for thread in threads : thread.start()
+    for thread in threads : thread.join()
+    return [built for thread_results in results for built in thread_results]
+
+
+# ********************************** Tests *************************************
+
+class Test_CallableTemplate_Concurrency(unittest.TestCase) :
+
+    def setUp(self) -> None :
+        BUILDS.clear()
+
+        class GlobScope :
+            with template['N': int, 'T': type] :
+                @count_build
+                def cb() :
+                    return T(N)
+
+        self.cb = GlobScope.cb
+
+    # ---- ---- ---- ----
+
+    def test_single_flight_build(self) :
+        """
+        An instantiation requested by many threads at the same time is built
+        once, and every thread gets the same callable.
+        """
+
+        results = hammer(self.cb, [(5, int)])
+
+        self.assertEqual(len(BUILDS), 1)
+        self.assertTrue(all(built is BUILDS[0] for built in results))
+
+    def test_single_flight_build_of_several_instantiations(self) :
+        keys = [(n, int) for n in range(4)] + [(slice('N', 0), slice('T', int))]
+
+        results = hammer(self.cb, keys)
+
+        self.assertEqual(len(BUILDS), 4)
+        self.assertEqual({id(built) for built in results}, set(map(id, BUILDS)))
+        self.assertEqual(self.cb.cache_info().currsize, 4)
+
+    def test_failed_build_is_reported_to_every_waiting_thread(self) :
+        class GlobScope :
+            with template['N': int] :
+                @count_build
+                def cb(x=1 // N) :
+                    ...
+
+        errors = []
+        def lookup() :
+            try : GlobScope.cb[0]
+            except ZeroDivisionError as err : errors.append(err)
+
+        threads = [threading.Thread(target=lookup) for _ in range(8)]
+        for thread in threads : thread.start()
+        for thread in threads : thread.join()
+
+        self.assertEqual(len(errors), 8)
@@ -0,0 +1,101 @@
+# Used version : CPython 3.12.1
+
+
+# ********************************* Imports ************************************
+from __future__ import annotations
+
+"Standard Library :"
+import dis
+import sys
+#To annotate :
+from types import CodeType
+from typing import Any
+
+
+# ******************************** Constants ***********************************
+
+_LOAD_GLOBAL = dis.opmap["LOAD_GLOBAL"]
+_LOAD_NAME = dis.opmap["LOAD_NAME"]
+_LOAD_CONST = dis.opmap["LOAD_CONST"]
+_PUSH_NULL = dis.opmap["PUSH_NULL"]
+_NOP = dis.opmap["NOP"]
+
+_STORING_OPS = {
+    dis.opmap[opname]
+    for opname in ("STORE_GLOBAL", "DELETE_GLOBAL", "STORE_NAME", "DELETE_NAME")
+}
+
+# The rewriting follows the layout of the bytecode of 3.12 : the other
+# versions keep the namespace holding the template arguments.
+_SUPPORTED = sys.version_info[:2] == (3, 12)
+
+
+# ******************************** Functions ***********************************
+
+def bindGlobals(code: CodeType, values: dict[str, Any]) -> CodeType | None :
+    """
+    Copy of 'code' (and of the code objects it defines) in which the globals
+    named in 'values' are loaded as constants. Thus, functions created from
+    it can keep the globals of their module, which stay live, instead of a
+    namespace holding 'values'.
+
+    Returns 'None' when 'code' can't be rewritten, for instance if it assigns
+    one of those globals, if an argument doesn't fit in a single code unit,
+    or if the bytecode of the running version isn't supported.
+    """
+
+    if not _SUPPORTED :
+        return None
+
+    consts = list(code.co_consts)
+    for i, const in enumerate(consts) :
+        if isinstance(const, CodeType) :
+            bound_const = bindGlobals(const, values)
+            if bound_const is None :
+                return None
+            consts[i] = bound_const
+
+    if values.keys().isdisjoint(code.co_names) :
+        if consts == list(code.co_consts) :
+            return code
+        return code.replace(co_consts=tuple(consts))
+
+    bytecode = bytearray(code.co_code)
+    const_indexes = {}
+    instructions = list(dis.get_instructions(code))
+    # Offset of the instruction following each one, past its inline cache.
+    next_offsets = [instr.offset for instr in instructions[1:]] + [len(bytecode)]
+    for instr, next_offset in zip(instructions, next_offsets) :
+        if instr.opcode in _STORING_OPS and instr.argval in values :
+            return None
+        if (
+            instr.opcode not in (_LOAD_GLOBAL, _LOAD_NAME)
+            or instr.argval not in values
+        ) :
+            continue
+        if instr.arg > 255 :
+            # Preceded by 'EXTENDED_ARG'.
+            return None
+
+        const_index = const_indexes.get(instr.argval)
+        if const_index is None :
+            const_index = const_indexes[instr.argval] = len(consts)
+            consts.append(values[instr.argval])
+        if const_index > 255 :
+            return None
+
+        # Same number of code units, hence jumps and positions are unchanged.
+        caches = (next_offset - instr.offset) // 2 - 1
+        if instr.opcode == _LOAD_NAME :
+            units = [(_LOAD_CONST, const_index)]
+        elif instr.arg & 1 :
+            # 'LOAD_GLOBAL' also pushes 'NULL' before the global (for a call).
+            units = [(_PUSH_NULL, 0), (_LOAD_CONST, const_index)]
+            units += [(_NOP, 0)] * (caches - 1)
+        else :
+            units = [(_LOAD_CONST, const_index)]
+            units += [(_NOP, 0)] * caches
+        for i, (opcode, arg) in enumerate(units) :
+            bytecode[instr.offset + 2*i : instr.offset + 2*i + 2] = (opcode, arg)
+
+    return code.replace(co_code=bytes(bytecode), co_consts=tuple(consts))
@@ -0,0 +1,118 @@
+# ********************************* Imports ************************************
+from __future__ import annotations
+
+"Standard Library :"
+import linecache
+import os
+import tokenize
+
+from threading import Lock
+from weakref import ref
+#To annotate :
+from types import CodeType
+from typing import Any
+
+
+# ******************************** Constants ***********************************
+
+_INDEX: dict[str, _FileIndex] = {}
+_LOCK = Lock()
+
+
+# ********************************* Classes ************************************
+
+class _FileIndex :
+
+    """Lines of a source file, and positions of the code objects it defines."""
+
+    def __init__(self, lines: list[str], stamp: tuple[float, int] | None) -> None :
+        self.lines = lines
+        # '(mtime, size)' of the file when read, 'None' if it isn't a file.
+        self.stamp = stamp
+        # 'id(code) -> (weak reference to code, positions)', the entry is
+        # dropped with the code object (whose id might then be reused).
+        self.positions: dict[int, tuple[ref[CodeType], list]] = {}
+
+    def _forgetCode(self, code_ref: ref[CodeType], code_id: int) -> None :
+        positions = self.positions
+        # Unless already replaced by the entry of a code object reusing the id.
+        if positions.get(code_id, (None,))[0] is code_ref :
+            positions.pop(code_id, None)
+
+
+# ******************************** Functions ***********************************
+
+def _stamp(filename: str) -> tuple[float, int] | None :
+    try :
+        stat = os.stat(filename)
+    except (OSError, ValueError) :
+        return None
+    return stat.st_mtime, stat.st_size
+
+def _read(filename: str, module_globals: dict[str, Any] | None) -> list[str] :
+    try :
+        # Honours the encoding declaration of the file, as the interpreter.
+        with tokenize.open(filename) as file :
+            return file.readlines()
+    except (OSError, SyntaxError) :
+        # Not a file : the source might be available through the loader of
+        # the module (zipimport, ...) or registered in 'linecache'.
+        return linecache.getlines(filename, module_globals)
+
+def _fileIndex(filename: str, module_globals: dict[str, Any] | None) -> _FileIndex :
+    stamp = _stamp(filename)
+    with _LOCK :
+        file_index = _INDEX.get(filename)
+        if file_index is not None and (
+            file_index.stamp == stamp and file_index.lines
+        ) :
+            return file_index
+
+    # Read outside of the lock, as it's the slow part.
+    file_index = _FileIndex(_read(filename, module_globals), stamp)
+    with _LOCK :
+        _INDEX[filename] = file_index
+    return file_index
+
+
+def getLines(filename: str, module_globals: dict[str, Any] | None = None) -> list[str] :
+    """
+    Lines of the source file 'filename'.
+    The file is read once, and read again only when its mtime (or its size)
+    changed.
+    """
+
+    lines = _fileIndex(filename, module_globals).lines
+    if not lines :
+        raise OSError("could not get source code")
+    return lines
+
+def indexedLines(filename: str) -> list[str] | None :
+    """Lines of 'filename' if it was already read, without reading it."""
+    file_index = _INDEX.get(filename)
+    if file_index is None or not file_index.lines :
+        return None
+    return file_index.lines
+
+def getPosition(
+    code: CodeType,
+    instruction_offset: int,
+    module_globals: dict[str, Any] | None = None,
+) -> tuple[int | None, int | None, int | None, int | None] :
+    """
+    Position '(start_line, end_line, start_col, end_col)' of the instruction
+    at 'instruction_offset' (like 'frame.f_lasti') in 'code'.
+    """
+
+    file_index = _fileIndex(code.co_filename, module_globals)
+    code_id = id(code)
+    entry = file_index.positions.get(code_id)
+    if entry is None or entry[0]() is not code :
+        code_ref = ref(code, lambda code_ref : file_index._forgetCode(code_ref, code_id))
+        entry = file_index.positions[code_id] = (code_ref, list(code.co_positions()))
+    return entry[1][instruction_offset // 2]
+
+def clear() -> None :
+    """Forgets every indexed file."""
+    with _LOCK :
+        _INDEX.clear()